@@ -0,0 +1,145 @@
+import threading
+import time
+from flask import g, jsonify, make_response, request
+from os import environ
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT
+
+# per worker process: concurrent requests, requests allowed to wait for a slot
+DEFAULT_BUDGETS = {
+    "point": (16, 32),
+    "list": (2, 2),
+    "write": (4, 8),
+    "export": (1, 1),
+}
+DEFAULT_TIMEOUT = 10
+DEFAULT_RETRY_AFTER = 2
+EXEMPT_ENDPOINTS = {"metrics", "static"}
+EXEMPT_BLUEPRINTS = ("swagger", "swagger_ui", "cache")
+EXPORT_BLUEPRINTS = ("export_blueprint", "import_blueprint")
+
+
+class Gate:
+    """
+    A concurrency budget for one class of requests: at most ``limit`` run at
+    once and at most ``queue`` wait for a slot, in arrival order. A request
+    that finds the queue full, or waits longer than ``timeout``, is refused.
+    """
+
+    def __init__(self, name, limit, queue, timeout):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiters = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        started = time.perf_counter()
+        with self.lock:
+            if self.active < self.limit and not self.waiters:
+                self.active += 1
+                self._report()
+                return True
+            if len(self.waiters) >= self.queue:
+                ADMISSION_REJECTED.labels(self.name, "queue_full").inc()
+                return False
+            turn = threading.Event()
+            self.waiters.append(turn)
+            self._report()
+        admitted = turn.wait(self.timeout)
+        with self.lock:
+            # release() may have handed the slot over just as the wait timed out
+            admitted = admitted or turn.is_set()
+            if not admitted:
+                self.waiters.remove(turn)
+                ADMISSION_REJECTED.labels(self.name, "timeout").inc()
+            self._report()
+        ADMISSION_WAIT.labels(self.name).observe(time.perf_counter() - started)
+        return admitted
+
+    def release(self):
+        with self.lock:
+            if self.waiters:
+                # the slot passes straight to the oldest waiter, so active does not change
+                self.waiters.pop(0).set()
+            else:
+                self.active -= 1
+            self._report()
+
+    def _report(self):
+        ADMISSION_IN_FLIGHT.labels(self.name).set(self.active)
+        ADMISSION_QUEUE_DEPTH.labels(self.name).set(len(self.waiters))
+
+
+def init_admission(app):
+    """
+    Admission control: every request is put in a class (point reads, list
+    scans, writes, exports) that has its own concurrency budget, so a storm
+    of scans cannot take the threads and connections point reads need.
+    Overflowing requests get 503 with Retry-After instead of queueing in the
+    worker. Budgets are set with ADMISSION_BUDGETS, e.g. "list=2/4,export=1/0",
+    and ADMISSION_ENABLED=false turns the layer off.
+    """
+    if environ.get("ADMISSION_ENABLED", "true").lower() != "true":
+        return
+    budgets = parse_budgets(environ.get("ADMISSION_BUDGETS"))
+    timeout = float(environ.get("ADMISSION_TIMEOUT", DEFAULT_TIMEOUT))
+    retry_after = int(environ.get("ADMISSION_RETRY_AFTER", DEFAULT_RETRY_AFTER))
+    gates = {name: Gate(name, limit, queue, timeout) for name, (limit, queue) in budgets.items()}
+
+    @app.before_request
+    def admit():
+        gate = gates.get(request_class())
+        if gate is None:
+            return None
+        if not gate.acquire():
+            response = make_response(jsonify({"message": "server is busy, retry later"}), 503)
+            response.headers["Retry-After"] = str(retry_after)
+            return response
+        g.admission_gate = gate
+        return None
+
+    @app.after_request
+    def hold(response):
+        # teardown runs before a streamed body is sent, so a streamed export
+        # keeps its slot until the server closes the body; any other response
+        # is done by teardown, which also runs when nothing ever closes it
+        if response.is_streamed:
+            gate = g.pop("admission_gate", None)
+            if gate is not None:
+                response.call_on_close(gate.release)
+        return response
+
+    @app.teardown_request
+    def release(exception):
+        gate = g.pop("admission_gate", None)
+        if gate is not None:
+            gate.release()
+
+
+def parse_budgets(value):
+    budgets = dict(DEFAULT_BUDGETS)
+    for item in (value or "").split(","):
+        if not item.strip():
+            continue
+        name, _, budget = item.partition("=")
+        limit, _, queue = budget.partition("/")
+        name = name.strip()
+        if name not in budgets:
+            raise ValueError(f"unknown admission class: {name}")
+        budgets[name] = (int(limit), int(queue or 0))
+    return budgets
+
+
+def request_class():
+    """The budget a request counts against, or None for requests that are never limited."""
+    if request.endpoint is None or request.endpoint in EXEMPT_ENDPOINTS or request.blueprint in EXEMPT_BLUEPRINTS:
+        return None
+    if request.blueprint in EXPORT_BLUEPRINTS:
+        return "export"
+    if request.method not in ("GET", "HEAD"):
+        return "write"
+    if request.view_args and "id" in request.view_args:
+        return "point"
+    return "list"
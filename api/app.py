@@ -5,26 +5,59 @@ from routes.orders import orders_blueprint
 from routes.payments import payments_blueprint
 from routes.employees import employees_blueprint
 from routes.schedules import schedules_blueprint
-from database import init_db, create_all
+from routes.reports import reports_blueprint
+from routes.export import export_blueprint
+from routes.importer import import_blueprint
+from database import init_db, upgrade_db, engine_options, read_binds
+from cache import cache
+from etag import init_etags
+from metrics import init_metrics
+from admission import init_admission
+from reports import init_reports
+from importer import init_importer
+from events import init_events
+from json_provider import FastJSONProvider
 from swagger import swagger_blueprint, swaggerui_blueprint, init_swagger
 from os import environ
 
 
-app = Flask(__name__)
-app.config["SQLALCHEMY_DATABASE_URI"] = environ.get("DB_URL")
-init_db(app)
-app.register_blueprint(clients_blueprint)
-app.register_blueprint(devices_blueprint)
-app.register_blueprint(orders_blueprint)
-app.register_blueprint(payments_blueprint)
-app.register_blueprint(employees_blueprint)
-app.register_blueprint(schedules_blueprint)
-init_swagger(app)
-app.register_blueprint(swaggerui_blueprint, url_prefix="/swagger")
-app.register_blueprint(swagger_blueprint)
+def create_app():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.config["SQLALCHEMY_DATABASE_URI"] = environ.get("DB_URL")
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(environ.get("DB_URL"))
+    app.config["SQLALCHEMY_BINDS"] = read_binds(environ.get("DB_READ_URLS"))
+    app.config["CACHE_URL"] = environ.get("CACHE_URL")
+    app.config["CACHE_SIZE"] = environ.get("CACHE_SIZE")
+    app.config["CACHE_TTL"] = environ.get("CACHE_TTL")
+    app.config["SWAGGER_CACHE_DIR"] = environ.get("SWAGGER_CACHE_DIR")
+    app.config["EVENTS_RETENTION"] = environ.get("EVENTS_RETENTION")
+    app.config["EVENTS_POLL_INTERVAL"] = environ.get("EVENTS_POLL_INTERVAL")
+    init_db(app)
+    cache.init_app(app)
+    init_etags(app)
+    init_metrics(app)
+    init_admission(app)
+    init_reports(app)
+    init_importer(app)
+    init_events(app)
+    app.register_blueprint(clients_blueprint)
+    app.register_blueprint(devices_blueprint)
+    app.register_blueprint(orders_blueprint)
+    app.register_blueprint(payments_blueprint)
+    app.register_blueprint(employees_blueprint)
+    app.register_blueprint(schedules_blueprint)
+    app.register_blueprint(reports_blueprint)
+    app.register_blueprint(export_blueprint)
+    app.register_blueprint(import_blueprint)
+    init_swagger(app)
+    app.register_blueprint(swaggerui_blueprint, url_prefix="/swagger")
+    app.register_blueprint(swagger_blueprint)
+    return app
 
 
 if __name__ == '__main__':
+    app = create_app()
     with app.app_context():
-        create_all()
+        upgrade_db()
     app.run(debug=True, host="0.0.0.0")
@@ -0,0 +1,235 @@
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+from os import environ
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from database import engine_options
+from models import Clients, Devices, Employees, Orders, Payments, Schedule
+from routes.clients import clients_filters
+from routes.devices import devices_filters
+from routes.employees import employees_filters
+from routes.orders import orders_filters
+from routes.payments import payments_filters
+from routes.schedules import schedules_filters
+from filtering import parse_datetime
+from pagination import InvalidQuery, keyset, page, parse_limit, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from cache import cache
+from etag import track_writes
+from reports import record_changes
+from writes import update_row, delete_row
+from events import broker, configure as configure_events, emit, parse_entities, parse_last_id, stream, track_events
+from json_provider import dump_bytes
+
+logger = logging.getLogger("asgi")
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_url(url):
+    scheme, separator, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme.split("+")[0], scheme) + separator + rest
+
+
+class WriteTrackingSession(Session):
+    pass
+
+
+# writes made here must bump table_versions just like the Flask handlers do
+track_writes(WriteTrackingSession)
+# and wake this process's /events streams when they commit events
+track_events(WriteTrackingSession)
+
+
+class JSONResponse(Response):
+    """Renders bodies byte-for-byte like Flask's ``jsonify`` (same provider, ISO dates)."""
+
+    media_type = "application/json"
+
+    def render(self, content):
+        return dump_bytes(content)
+
+
+class Resource:
+    """CRUD routes for one model, mirroring the matching Flask blueprint."""
+
+    def __init__(self, path, name, model, filters):
+        self.path = path
+        self.name = name
+        self.model = model
+        self.filters = filters
+        self.columns = [column for column in model.__table__.columns if not column.primary_key]
+
+    def routes(self):
+        return [
+            Route(f"/{self.path}", self.create, methods=["POST"]),
+            Route(f"/{self.path}", self.list, methods=["GET"]),
+            Route(f"/{self.path}/{{id:int}}", self.get, methods=["GET"]),
+            Route(f"/{self.path}/{{id:int}}", self.update, methods=["PUT", "PATCH"]),
+            Route(f"/{self.path}/{{id:int}}", self.delete, methods=["DELETE"]),
+        ]
+
+    async def create(self, request):
+        try:
+            data = await request.json()
+            values = self._values(data, required=True)
+            entity = self.model(**values)
+            async with request.app.state.sessions() as session:
+                session.add(entity)
+                await session.run_sync(self._created, entity)
+                await session.commit()
+            return JSONResponse({"message": f"{self.name} created"}, 201)
+        except KeyError as e:
+            return JSONResponse({"message": f"missing fields: {e.args[0]}"}, 400)
+        except InvalidQuery as e:
+            return JSONResponse({"message": str(e)}, 400)
+        except IntegrityError as e:
+            logger.error(e)
+            return JSONResponse({"message": f"{self.name} violates a constraint"}, 409)
+        except Exception as e:
+            logger.error(e)
+            return JSONResponse({"message": f"error creating {self.name}"}, 500)
+
+    async def list(self, request):
+        try:
+            params = request.query_params
+            limit = parse_limit(params.get("limit"), request.app.state.page_size, request.app.state.max_page_size)
+            statement, keys, descending, serialize = self.filters.select(params)
+            statement = keyset(statement, keys, params.get("after"), descending)
+            async with request.app.state.sessions() as session:
+                rows = (await session.execute(statement.limit(limit + 1))).all()
+            return JSONResponse(page(rows, limit, keys, serialize), 200)
+        except InvalidQuery as e:
+            return JSONResponse({"message": str(e)}, 400)
+        except Exception as e:
+            logger.error(e)
+            return JSONResponse({"message": f"error getting {self.path}"}, 500)
+
+    async def get(self, request):
+        try:
+            async with request.app.state.sessions() as session:
+                entity = await session.get(self.model, request.path_params["id"])
+            if entity:
+                return JSONResponse({self.name: self.filters.sparse(entity.json(), request.query_params)}, 200)
+            return JSONResponse({"message": f"{self.name} not found"}, 404)
+        except InvalidQuery as e:
+            return JSONResponse({"message": str(e)}, 400)
+        except Exception as e:
+            logger.error(e)
+            return JSONResponse({"message": f"error getting {self.name}"}, 500)
+
+    async def update(self, request):
+        try:
+            id = request.path_params["id"]
+            values = self._values(await request.json(), required=request.method == "PUT")
+            if not values:
+                return JSONResponse({"message": "nothing to update"}, 400)
+            async with request.app.state.sessions() as session:
+                # the same helpers as the Flask handlers, so report summaries stay in step
+                found = await session.run_sync(lambda sync: update_row(self.model, id, values, session=sync))
+                if not found:
+                    return JSONResponse({"message": f"{self.name} not found"}, 404)
+                await session.commit()
+            cache.invalidate(self.model, id)
+            return JSONResponse({"message": f"{self.name} updated"}, 200)
+        except KeyError as e:
+            return JSONResponse({"message": f"missing fields: {e.args[0]}"}, 400)
+        except InvalidQuery as e:
+            return JSONResponse({"message": str(e)}, 400)
+        except IntegrityError as e:
+            logger.error(e)
+            return JSONResponse({"message": f"{self.name} violates a constraint"}, 409)
+        except Exception as e:
+            logger.error(e)
+            return JSONResponse({"message": f"error updating {self.name}"}, 500)
+
+    async def delete(self, request):
+        try:
+            id = request.path_params["id"]
+            async with request.app.state.sessions() as session:
+                found = await session.run_sync(lambda sync: delete_row(self.model, id, session=sync))
+                if not found:
+                    return JSONResponse({"message": f"{self.name} not found"}, 404)
+                await session.commit()
+            cache.invalidate(self.model, id)
+            return JSONResponse({"message": f"{self.name} deleted"}, 200)
+        except Exception as e:
+            logger.error(e)
+            return JSONResponse({"message": f"error deleting {self.name}"}, 500)
+
+    def _created(self, session, entity):
+        session.flush()
+        record_changes(self.model, added=[entity], session=session)
+        emit(self.model, "created", [entity], session=session)
+
+    def _values(self, data, required):
+        values = {}
+        for column in self.columns:
+            if column.key not in data:
+                if required and not column.nullable and column.default is None:
+                    raise KeyError(column.key)
+                continue
+            value = data[column.key]
+            # async drivers do not parse date strings the way psycopg2 lets PostgreSQL do
+            if value is not None and column.type.python_type is datetime:
+                value = parse_datetime(value)
+            values[column.key] = value
+        return values
+
+
+RESOURCES = [
+    Resource("clients", "client", Clients, clients_filters),
+    Resource("devices", "device", Devices, devices_filters),
+    Resource("orders", "order", Orders, orders_filters),
+    Resource("payments", "payment", Payments, payments_filters),
+    Resource("employees", "employee", Employees, employees_filters),
+    Resource("schedules", "schedule", Schedule, schedules_filters),
+]
+
+
+async def events(request):
+    """
+    GET /events: the change feed as server-sent events, resumable with
+    Last-Event-ID or ?after=, filtered with ?entity=orders,payments. Served
+    here rather than by the Flask workers, where every open stream would
+    hold one of their few threads.
+    """
+    try:
+        entities = parse_entities(request.query_params.get("entity"))
+        last_id = parse_last_id(request.headers.get("last-event-id", request.query_params.get("after")))
+    except InvalidQuery as e:
+        return JSONResponse({"message": str(e)}, 400)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(
+        stream(request.app.state.engine, entities, last_id), 200, headers, media_type="text/event-stream"
+    )
+
+
+def create_app():
+    url = environ.get("ASYNC_DB_URL") or async_url(environ["DB_URL"])
+    engine = create_async_engine(url, **engine_options(url))
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await broker.close()
+        await engine.dispose()
+
+    cache.configure(environ)
+    configure_events(environ)
+    routes = [route for resource in RESOURCES for route in resource.routes()]
+    routes.append(Route("/events", events, methods=["GET"]))
+    app = Starlette(routes=routes, lifespan=lifespan)
+    app.state.engine = engine
+    app.state.sessions = async_sessionmaker(engine, expire_on_commit=False, sync_session_class=WriteTrackingSession)
+    app.state.page_size = int(environ.get("DEFAULT_PAGE_SIZE", DEFAULT_PAGE_SIZE))
+    app.state.max_page_size = int(environ.get("MAX_PAGE_SIZE", MAX_PAGE_SIZE))
+    return app
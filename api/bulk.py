@@ -0,0 +1,153 @@
+from flask import current_app
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError, StatementError
+from database import db
+from cache import cache
+from pagination import InvalidQuery
+from reports import record_changes
+from events import emit
+from writes import column_values, writable_columns
+
+BATCH_SIZE = 500
+MAX_BULK_ITEMS = 10000
+
+
+def bulk_create(model, items):
+    """
+    Inserts ``items`` with multi-row INSERT batches inside one transaction.
+    A failing batch is retried row by row under savepoints so that only the
+    bad rows are rejected. Returns ``(body, status)``.
+    """
+    columns = writable_columns(model)
+    required = [column.key for column in columns if not column.nullable and column.default is None]
+    _check_items(items)
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = _failed(index, 400, "expected an object")
+            continue
+        missing = [key for key in required if item.get(key) is None]
+        if missing:
+            results[index] = _failed(index, 400, "missing fields: " + ", ".join(missing))
+            continue
+        try:
+            valid.append((index, column_values(columns, item)))
+        except InvalidQuery as e:
+            results[index] = _failed(index, 400, str(e))
+
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+
+    def execute(rows):
+        ids = db.session.execute(statement, rows).scalars().all()
+        record_changes(model, added=rows)
+        emit(model, "created", [dict(row, id=id) for row, id in zip(rows, ids)])
+        return ids
+
+    for batch in _batches(valid):
+        _execute_batch(batch, results, execute, 201)
+    db.session.commit()
+    return _summary(results, 201)
+
+
+def bulk_update(model, items):
+    """
+    Updates rows by ``id`` with executemany UPDATE batches inside one
+    transaction; only the supplied columns of each item are changed.
+    Returns ``(body, status)``.
+    """
+    columns = writable_columns(model)
+    _check_items(items)
+    results = [None] * len(items)
+    candidates = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("id"), int):
+            results[index] = _failed(index, 400, "expected an object with an integer id")
+            continue
+        try:
+            row = column_values(columns, item)
+        except InvalidQuery as e:
+            results[index] = _failed(index, 400, str(e))
+            continue
+        if not row:
+            results[index] = _failed(index, 400, "nothing to update")
+            continue
+        row["id"] = item["id"]
+        candidates.append((index, row))
+
+    ids = {row["id"] for _, row in candidates}
+    existing = {}
+    for chunk in _batches(sorted(ids)):
+        rows = db.session.execute(select(*model.__table__.columns).where(model.id.in_(chunk)))
+        existing.update((row.id, row._asdict()) for row in rows)
+    valid = []
+    for index, row in candidates:
+        if row["id"] in existing:
+            valid.append((index, row))
+        else:
+            results[index] = _failed(index, 404, "not found")
+
+    # executemany needs the same parameter keys for every row in a batch
+    groups = {}
+    for index, row in valid:
+        groups.setdefault(frozenset(row), []).append((index, row))
+
+    def execute(rows):
+        db.session.execute(update(model), rows)
+        old = [existing[row["id"]] for row in rows]
+        new = [dict(existing[row["id"]], **row) for row in rows]
+        record_changes(model, removed=old, added=new)
+        emit(model, "updated", new)
+        for row in new:
+            existing[row["id"]] = row
+        return [row["id"] for row in rows]
+
+    for group in groups.values():
+        for batch in _batches(group):
+            _execute_batch(batch, results, execute, 200)
+    db.session.commit()
+    cache.invalidate(model, *[result["id"] for result in results if result["status"] == 200])
+    return _summary(results, 200)
+
+
+def _execute_batch(batch, results, execute, status):
+    try:
+        with db.session.begin_nested():
+            ids = execute([row for _, row in batch])
+    except StatementError:
+        for index, row in batch:
+            try:
+                with db.session.begin_nested():
+                    ids = execute([row])
+                results[index] = {"index": index, "status": status, "id": ids[0]}
+            except IntegrityError as e:
+                current_app.logger.error(e)
+                results[index] = _failed(index, 409, "constraint violation")
+            except StatementError as e:
+                current_app.logger.error(e)
+                results[index] = _failed(index, 400, "invalid values")
+        return
+    for (index, _), id in zip(batch, ids):
+        results[index] = {"index": index, "status": status, "id": id}
+
+
+def _check_items(items):
+    if not isinstance(items, list):
+        raise InvalidQuery("expected a JSON array")
+    if len(items) > current_app.config.get("MAX_BULK_ITEMS", MAX_BULK_ITEMS):
+        raise InvalidQuery("too many items")
+
+
+def _batches(rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        yield rows[start:start + BATCH_SIZE]
+
+
+def _failed(index, status, message):
+    return {"index": index, "status": status, "message": message}
+
+
+def _summary(results, status):
+    failed = sum(1 for result in results if result["status"] != status)
+    body = {"succeeded": len(results) - failed, "failed": failed, "results": results}
+    return body, status if failed == 0 else 207
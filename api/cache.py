@@ -0,0 +1,209 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from flask import Blueprint, jsonify
+from sqlalchemy import select
+from database import db
+from metrics import CACHE_EVENTS
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+DEFAULT_SIZE = 1024
+DEFAULT_TTL = 60
+
+cache_blueprint = Blueprint("cache", __name__)
+
+
+class LRUCache:
+    def __init__(self, name, size, ttl):
+        self.name = name
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                    self._count("eviction")
+                self._count("miss")
+                return None
+            self.entries.move_to_end(key)
+            self._count("hit")
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self._count("eviction")
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def _count(self, event):
+        if event == "hit":
+            self.hits += 1
+        elif event == "miss":
+            self.misses += 1
+        else:
+            self.evictions += 1
+        CACHE_EVENTS.labels(self.name, event).inc()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "max_size": self.size,
+            "ttl": self.ttl,
+        }
+
+
+class MemoryBackend:
+    """In-process stand-in for a shared backend, used for local runs and tests."""
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.entries.pop(key, None)
+                return None
+            return pickle.loads(entry[1])
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, pickle.dumps(value))
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+
+class RedisBackend:
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("CACHE_URL points to redis but the redis package is not installed")
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, pickle.dumps(value), ex=ttl)
+
+    def delete(self, *keys):
+        self.client.delete(*keys)
+
+
+class EntityCache:
+    """
+    Read-through cache of ``Model.json()`` results keyed by primary key.
+    Every model gets its own in-process LRU; an optional shared backend
+    (``CACHE_URL``) sits behind it so workers can share loaded entries.
+
+    Writers invalidate the keys they change, here and in the backend; the
+    LRUs of other workers keep their copy until its TTL runs out, which is
+    why the views it serves are tagged from the body (etag.tagged).
+    """
+
+    def __init__(self):
+        self.caches = {}
+        self.backend = None
+        self.size = DEFAULT_SIZE
+        self.ttl = DEFAULT_TTL
+        self.models = {}
+
+    def init_app(self, app):
+        self.configure(app.config)
+        app.register_blueprint(cache_blueprint)
+
+    def configure(self, config):
+        self.size = int(config.get("CACHE_SIZE") or DEFAULT_SIZE)
+        self.ttl = int(config.get("CACHE_TTL") or DEFAULT_TTL)
+        self.models = config.get("CACHE_MODELS", {})
+        self.backend = make_backend(config.get("CACHE_URL"))
+        self.caches = {}
+
+    def get(self, model, id):
+        """Returns ``model.json()`` for ``id`` or None when the row does not exist."""
+        local = self._local(model)
+        key = _key(model, id)
+        value = local.get(key)
+        if value is not None:
+            return value
+        if self.backend is not None:
+            value = self.backend.get(key)
+        if value is None:
+            # read from the primary: a lagging replica could put back a row that was just invalidated
+            entity = db.session.execute(select(model).filter_by(id=id), bind_arguments={"bind": db.engine}).scalar()
+            if entity is None:
+                return None
+            value = entity.json()
+            if self.backend is not None:
+                self.backend.set(key, value, local.ttl)
+        local.set(key, value)
+        return value
+
+    def invalidate(self, model, *ids):
+        local = self._local(model)
+        keys = [_key(model, id) for id in ids]
+        for key in keys:
+            local.delete(key)
+        if self.backend is not None and keys:
+            self.backend.delete(*keys)
+
+    def stats(self):
+        return {name: cache.stats() for name, cache in self.caches.items()}
+
+    def _local(self, model):
+        name = model.__tablename__
+        cache = self.caches.get(name)
+        if cache is None:
+            options = self.models.get(name, {})
+            cache = self.caches.setdefault(
+                name, LRUCache(name, options.get("size", self.size), options.get("ttl", self.ttl))
+            )
+        return cache
+
+
+def make_backend(url):
+    if not url:
+        return None
+    if url == "memory://":
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"unsupported CACHE_URL: {url}")
+
+
+def _key(model, id):
+    return f"repair_shop:{model.__tablename__}:{id}"
+
+
+cache = EntityCache()
+
+
+@cache_blueprint.route("/cache/stats")
+def get_cache_stats():
+    return jsonify(cache.stats())
@@ -1,9 +1,124 @@
+import os
+import random
+from os import environ
+from flask import has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from flask_migrate import Migrate, stamp, upgrade
+from sqlalchemy import event, inspect, text
 
-db = SQLAlchemy()
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "migrations")
+BASELINE_REVISION = "3f1c2a9d7b10"
+REPLICA_PREFIX = "replica_"
+READ_METHODS = ("GET", "HEAD")
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # search indexes and FTS tables are dialect-specific and live only in migrations
+    return not (reflected and compare_to is None and "_search" in name)
+
+
+class RoutingSession(Session):
+    """
+    Sends the reads of GET and HEAD requests to one of the read replicas
+    (the ``replica_*`` binds built from ``DB_READ_URLS``) and everything else
+    to the primary. Once a request has written, or locked rows, the rest of
+    it reads from the primary too, so it sees its own changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica(clause):
+            replicas = [key for key in self._db.engines if key and key.startswith(REPLICA_PREFIX)]
+            if replicas:
+                # one replica per request, so that its reads are consistent with each other
+                key = self.info.get("replica")
+                if key not in replicas:
+                    key = self.info["replica"] = random.choice(replicas)
+                return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        if self.info.get("wrote"):
+            return False
+        if self._flushing or (clause is not None and _writes(clause)):
+            self.info["wrote"] = True
+            return False
+        return has_request_context() and request.method in READ_METHODS
+
+
+def _writes(clause):
+    return getattr(clause, "is_dml", False) or getattr(clause, "_for_update_arg", None) is not None
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+migrate = Migrate(directory=MIGRATIONS_DIR, include_object=include_object)
 
 def init_db(app):
     db.init_app(app)
+    migrate.init_app(app, db)
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == "sqlite":
+                transactional_sqlite(engine)
+
+    @app.cli.command("upgrade-db")
+    def upgrade_db_command():
+        """Apply pending migrations (indexes are built online on PostgreSQL)."""
+        upgrade_db()
+
+def transactional_sqlite(engine):
+    """
+    pysqlite only opens a transaction before DML, so a SAVEPOINT taken first
+    starts one of its own and its RELEASE commits; BEGIN is sent here instead.
+    """
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin(connection):
+        if connection.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+            connection.exec_driver_sql("BEGIN")
+
+def engine_options(url):
+    options = {
+        "pool_pre_ping": environ.get("DB_POOL_PRE_PING", "true").lower() == "true",
+        "pool_recycle": int(environ.get("DB_POOL_RECYCLE", 1800)),
+    }
+    # the pools sqlite uses for in-memory databases take no sizing arguments
+    if url and not url.startswith("sqlite"):
+        options["pool_size"] = int(environ.get("DB_POOL_SIZE", 5))
+        options["max_overflow"] = int(environ.get("DB_MAX_OVERFLOW", 10))
+        options["pool_timeout"] = int(environ.get("DB_POOL_TIMEOUT", 30))
+    return options
+
+def read_binds(urls):
+    """``SQLALCHEMY_BINDS`` for the comma-separated replica URLs in ``DB_READ_URLS``."""
+    urls = [url.strip() for url in (urls or "").split(",") if url.strip()]
+    return {f"{REPLICA_PREFIX}{index}": {"url": url, **engine_options(url)} for index, url in enumerate(urls)}
+
+def dispose_engines(app, close=True):
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+def upgrade_db():
+    # databases created by the old create_all() already have the baseline tables
+    inspector = inspect(db.engine)
+    if inspector.has_table("clients") and not inspector.has_table("alembic_version"):
+        stamp(directory=MIGRATIONS_DIR, revision=BASELINE_REVISION)
+    summarized = _summaries_maintained(inspector)
+    upgrade(directory=MIGRATIONS_DIR)
+    if not summarized:
+        # the summary tables were created empty; fill them in batches, with writers running
+        from reports import rebuild
+        rebuild()
 
-def create_all():
-    db.create_all()
+def _summaries_maintained(inspector):
+    # databases past the revision that seeds the report versions have complete summaries
+    if not inspector.has_table("table_versions"):
+        return False
+    with db.engine.connect() as connection:
+        return connection.execute(
+            text("SELECT count(*) FROM table_versions WHERE name = 'daily_revenue'")
+        ).scalar() > 0
@@ -0,0 +1,122 @@
+import hashlib
+from functools import wraps
+from flask import g, has_app_context, make_response, request
+from sqlalchemy import event, select, update
+from database import db
+from models import TableVersions
+
+
+def init_etags(app):
+    track_writes(db.session)
+
+
+def track_writes(target):
+    # every committed write bumps the version of the tables it touched, in the
+    # same transaction, so a tag can be computed without looking at the rows;
+    # ``target`` is any Session event target (scoped session, Session class)
+    for name, listener in (
+        ("after_flush", _track_flush),
+        ("do_orm_execute", _track_execute),
+        ("before_commit", _bump_versions),
+        ("after_rollback", _forget),
+    ):
+        if not event.contains(target, name, listener):
+            event.listen(target, name, listener)
+
+
+def table_versions(tables):
+    """
+    The versions of ``tables``, read once per request and again after the
+    request writes. None for tables that have no row.
+    """
+    known = g.setdefault("table_versions", {})
+    missing = [table for table in tables if table not in known]
+    if missing:
+        rows = db.session.execute(
+            select(TableVersions.name, TableVersions.version).where(TableVersions.name.in_(missing))
+        ).all()
+        known.update({table: None for table in missing})
+        known.update(rows)
+    return {table: known[table] for table in tables}
+
+
+def current_etag(tables):
+    versions = table_versions(tables)
+    if None in versions.values():
+        return None
+    raw = ",".join(f"{table}:{versions[table]}" for table in tables) + "|" + request.full_path
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def conditional(*tables):
+    """
+    Adds a strong ETag derived from the versions of ``tables`` and answers
+    304 Not Modified when it matches If-None-Match, before the view runs.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            tag = current_etag(tables)
+            if tag is not None and tag in request.if_none_match:
+                response = make_response("", 304)
+                response.set_etag(tag)
+                return response
+            response = make_response(view(*args, **kwargs))
+            if tag is not None and response.status_code == 200:
+                response.set_etag(tag)
+            return response
+        return wrapper
+    return decorator
+
+
+def tagged(view):
+    """
+    Adds a strong ETag hashed from the response body and answers 304 Not
+    Modified when it matches If-None-Match. For views served from the entity
+    cache, whose entries can outlive the table versions by up to their TTL:
+    the tag always describes the body it goes out with.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            response.add_etag()
+            response.make_conditional(request)
+        return response
+    return wrapper
+
+
+def _touched(session):
+    return session.info.setdefault("touched_tables", set())
+
+
+def _track_flush(session, flush_context):
+    touched = _touched(session)
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        touched.add(instance.__table__.name)
+
+
+def _track_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = orm_execute_state.statement.table.name
+        if table != TableVersions.__tablename__:
+            _touched(orm_execute_state.session).add(table)
+
+
+def _bump_versions(session):
+    session.flush()
+    touched = session.info.pop("touched_tables", None)
+    if touched and has_app_context():
+        # versions read earlier in this request are stale from here on
+        g.pop("table_versions", None)
+    # one row at a time in a fixed order so concurrent writers cannot deadlock
+    for table in sorted(touched or ()):
+        session.execute(
+            update(TableVersions)
+            .where(TableVersions.name == table)
+            .values(version=TableVersions.version + 1)
+        )
+
+
+def _forget(session):
+    session.info.pop("touched_tables", None)
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import logging
+import time
+from sqlalchemy import BigInteger, Text, cast, delete, event, func, insert, select, true, tuple_
+from database import db
+from models import Events, Orders, Payments, Schedule
+from json_provider import dump_bytes
+from pagination import InvalidQuery
+
+EVENT_MODELS = {Orders: "orders", Payments: "payments", Schedule: "schedules"}
+CHANNEL = "events"
+RETENTION = 10000
+TRIM_EVERY = 100
+BATCH_SIZE = 500
+POLL_INTERVAL = 1.0
+HEARTBEAT_INTERVAL = 15.0
+RETRY_MS = 3000
+
+logger = logging.getLogger("events")
+
+
+def init_events(app):
+    configure(app.config)
+
+
+def configure(config):
+    """
+    Change feed: writes to orders, payments and schedules append events to
+    the ``events`` table in the writer's transaction, and the ASGI app
+    streams them from /events. Its streams are woken when it commits a
+    write itself; on PostgreSQL a LISTEN connection per process wakes them
+    for commits made anywhere (the Flask workers included), elsewhere
+    other processes' events are picked up by polling.
+
+    Events are delivered in commit order, so that a stream never passes an
+    event that is still to commit. On SQLite, where one writer at a time
+    takes the ids, that is id order. On PostgreSQL concurrent writers
+    commit their ids out of order: events are ordered by (tx, id), where
+    ``tx`` is the writing transaction's id, and a stream only reads up to
+    the oldest transaction still running.
+    """
+    broker.poll_interval = float(config.get("EVENTS_POLL_INTERVAL") or POLL_INTERVAL)
+    broker.retention = int(config.get("EVENTS_RETENTION") or RETENTION)
+
+
+def track_events(target):
+    """Wakes this process's streams when ``target`` (any Session event target) commits events."""
+    if not event.contains(target, "after_commit", _published):
+        event.listen(target, "after_commit", _published)
+
+
+def emit(model, action, rows, session=None):
+    """
+    Appends ``action`` ("created", "updated", "deleted" or "imported")
+    events for ``rows`` (dicts, ORM objects or Rows with an ``id``) of
+    ``model`` to the log in the caller's transaction (``session``, the
+    request session by default); models without a feed are ignored.
+    """
+    entity = EVENT_MODELS.get(model)
+    if entity is None or not rows:
+        return
+    session = session or db.session
+    postgresql = session.get_bind().dialect.name == "postgresql"
+    statement = insert(Events).returning(Events.id)
+    if postgresql:
+        statement = statement.values(tx=_xid(func.pg_current_xact_id()))
+    ids = session.execute(statement, [
+        {"entity": entity, "entity_id": _get(row, "id"), "action": action, "data": _data(model, action, row)}
+        for row in rows
+    ]).scalars().all()
+    if postgresql:
+        # delivered by PostgreSQL when, and only if, the transaction commits
+        session.execute(select(func.pg_notify(CHANNEL, entity)))
+    session.info["events_emitted"] = True
+    # whichever writer takes an id that is a multiple of TRIM_EVERY trims, in every process alike
+    if any(id % TRIM_EVERY == 0 for id in ids):
+        session.execute(delete(Events).where(Events.id <= max(ids) - broker.retention))
+
+
+class EventBroker:
+    """
+    Wakes the streams of this process when new events may be in the log.
+    Streams are coroutines on the ASGI event loop, so an open subscriber
+    costs no thread and no database connection while it waits.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.changed = None
+        self.poll_interval = POLL_INTERVAL
+        self.retention = RETENTION
+        self.listener = None
+
+    def publish(self):
+        # runs on the event loop: the LISTEN callback does, and so does
+        # after_commit, which the async session calls on the loop's thread
+        self.version += 1
+        if self.changed is not None:
+            self.changed.set()
+            self.changed = None
+
+    async def wait(self, version, timeout):
+        if self.version == version:
+            if self.changed is None:
+                self.changed = asyncio.Event()
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.version
+
+    def listen(self, engine):
+        if engine.dialect.name == "postgresql" and self.listener is None:
+            self.listener = asyncio.get_running_loop().create_task(self._listen(engine))
+
+    async def close(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            self.listener = None
+
+    async def _listen(self, engine):
+        def notified(*args):
+            self.publish()
+
+        while True:
+            try:
+                async with engine.connect() as connection:
+                    # LISTEN and the heartbeat go to the driver connection outside any
+                    # transaction: inside one, notifications wait for its end
+                    driver = (await connection.get_raw_connection()).driver_connection
+                    await driver.add_listener(CHANNEL, notified)
+                    try:
+                        while True:
+                            await asyncio.sleep(HEARTBEAT_INTERVAL)
+                            await driver.execute("SELECT 1")
+                    finally:
+                        await connection.invalidate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"event listener failed, reconnecting: {e}")
+                # events committed while it was down are found by the next read
+                self.publish()
+                await asyncio.sleep(self.poll_interval)
+
+
+broker = EventBroker()
+
+
+def parse_entities(value):
+    """Parses ``?entity=orders,payments``; None subscribes to every entity."""
+    if not value:
+        return None
+    entities = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = entities - set(EVENT_MODELS.values())
+    if unknown:
+        raise InvalidQuery(f"unknown entity: {', '.join(sorted(unknown))}")
+    return entities
+
+
+def parse_last_id(value):
+    if value is None or value == "":
+        return None
+    try:
+        last_id = int(value)
+    except ValueError:
+        raise InvalidQuery(f"invalid event id: {value}")
+    if last_id < 0:
+        raise InvalidQuery(f"invalid event id: {value}")
+    return last_id
+
+
+async def stream(engine, entities=None, last_id=None):
+    """
+    Yields the server-sent events after ``last_id`` (the newest event when
+    None), then follows the log. ``engine`` is an AsyncEngine; every read
+    uses its own short connection, so an idle stream holds none.
+    """
+    broker.listen(engine)
+    version = broker.version
+    visible = _visible(engine)
+    async with engine.connect() as connection:
+        position = None if last_id is None else (await connection.execute(
+            select(Events.tx, Events.id).where(Events.id == last_id)
+        )).one_or_none()
+        if position is None:
+            oldest = (await connection.execute(select(func.min(Events.id)))).scalar()
+            newest = (await connection.execute(
+                select(Events.tx, Events.id).where(visible).order_by(Events.tx.desc(), Events.id.desc()).limit(1)
+            )).one_or_none()
+    yield f"retry: {RETRY_MS}\n\n".encode()
+    if position is None:
+        if last_id is not None and (oldest is None or last_id + 1 == oldest):
+            # everything in the log came after last_id
+            position = (-1, 0)
+        else:
+            position = tuple(newest) if newest else (-1, 0)
+            if last_id is not None:
+                # the events after last_id were trimmed, so the client has to reload
+                yield f"id: {position[1]}\nevent: reset\ndata: {{}}\n\n".encode()
+    heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+    while True:
+        async with engine.connect() as connection:
+            after = tuple_(Events.tx, Events.id) > tuple_(*position, types=[BigInteger, BigInteger])
+            rows = (await connection.execute(
+                select(Events).where(after, visible).order_by(Events.tx, Events.id).limit(BATCH_SIZE)
+            )).all()
+        for row in rows:
+            position = (row.tx, row.id)
+            if entities is None or row.entity in entities:
+                heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+                yield _format(row)
+        if len(rows) == BATCH_SIZE:
+            continue
+        if time.monotonic() >= heartbeat:
+            heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+            yield b": keepalive\n\n"
+        version = await broker.wait(version, broker.poll_interval)
+
+
+def _visible(engine):
+    """The events whose writers have all finished: on PostgreSQL, those from before the oldest running transaction."""
+    if engine.dialect.name != "postgresql":
+        return true()
+    return Events.tx < _xid(func.pg_snapshot_xmin(func.pg_current_snapshot()))
+
+
+def _xid(xid8):
+    return cast(cast(xid8, Text), BigInteger)
+
+
+def _format(row):
+    payload = {"id": row.entity_id, "entity": row.entity, "action": row.action, "created_at": row.created_at}
+    if row.data is not None:
+        payload["data"] = json.loads(row.data)
+    return b"id: %d\ndata: %s\n\n" % (row.id, dump_bytes(payload).rstrip(b"\n"))
+
+
+def _data(model, action, row):
+    if action == "deleted":
+        return None
+    if isinstance(row, model):
+        values = {column.key: getattr(row, column.key) for column in model.__table__.columns}
+    else:
+        values = dict(row if isinstance(row, dict) else row._mapping)
+    return dump_bytes(values).decode().rstrip("\n")
+
+
+def _get(row, key):
+    return row.get(key) if isinstance(row, dict) else getattr(row, key)
+
+
+def _published(session):
+    # also called when a savepoint is released, long before the events are visible
+    if session.in_nested_transaction():
+        return
+    if session.info.pop("events_emitted", False):
+        broker.publish()
@@ -0,0 +1,66 @@
+import csv
+import enum
+import io
+import json
+import zlib
+from datetime import datetime
+from sqlalchemy import select
+from database import db
+
+EXPORT_BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def export_rows(model, filters, args, columns):
+    """
+    Yields the rows of ``model`` selected by ``filters`` (a FilterSet) as
+    dicts holding ``columns``. Rows are fetched ``EXPORT_BATCH_SIZE`` at a time
+    through a server-side cursor, so memory does not depend on the number of rows.
+    """
+    query, keys, descending = filters.apply(select(*[model.__table__.c[name] for name in columns]), args)
+    query = query.order_by(*[key.desc() if descending else key.asc() for key in keys])
+    result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for row in result:
+        yield {key: _value(value) for key, value in row._mapping.items()}
+
+
+def encode(rows, format, columns):
+    """Renders ``rows`` as CSV (with a header) or NDJSON in chunks of about ``CHUNK_SIZE`` bytes."""
+    buffer = io.StringIO()
+    if format == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=columns)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(row):
+            buffer.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+            buffer.write("\n")
+    for row in rows:
+        write(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _value(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
@@ -0,0 +1,152 @@
+import enum
+from datetime import datetime
+from flask import request
+from sqlalchemy import select
+from pagination import InvalidQuery
+
+RESERVED_PARAMS = {"limit", "after", "order_by", "fields"}
+RANGE_OPERATORS = {
+    "gt": lambda column, value: column > value,
+    "gte": lambda column, value: column >= value,
+    "lt": lambda column, value: column < value,
+    "lte": lambda column, value: column <= value,
+}
+DATETIME_FORMATS = ("%d.%m.%Y", "%d.%m.%Y %H:%M", "%d.%m.%Y %H:%M:%S")
+
+
+def parse_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        pass
+    for format in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, format)
+        except (TypeError, ValueError):
+            pass
+    raise InvalidQuery(f"invalid date: {value}")
+
+
+class FilterSet:
+    """
+    Whitelist of filterable and sortable columns for a list endpoint.
+
+    Query string syntax: ``field=value`` (equality), ``field__in=a,b``,
+    ``field__gte=...`` / ``__gt`` / ``__lte`` / ``__lt`` for dates and
+    numbers, and ``order_by=field`` or ``order_by=-field`` for descending.
+    Everything is compiled into the WHERE / ORDER BY of a single query.
+    ``fields=a,b`` limits the returned fields.
+    """
+
+    def __init__(self, model, filters, sortable, default_order):
+        self.model = model
+        self.filters = {name: getattr(model, name) for name in filters}
+        self.sortable = {name: getattr(model, name) for name in sortable}
+        self.default_order = tuple(getattr(model, name) for name in default_order)
+        self.columns = {column.key: column for column in model.__table__.columns}
+
+    def select(self, args=None):
+        """
+        Like ``apply``, but on a SELECT of plain column tuples holding only the
+        requested fields (plus the sort keys), which skips ORM entity loading.
+        Returns ``(statement, keys, descending, serialize)``; ``serialize``
+        renders a row the way ``Model.json`` renders an entity.
+        """
+        args = request.args if args is None else args
+        names = self.field_names(args) or list(self.columns)
+        statement, keys, descending = self.apply(select(*[self.columns[name] for name in names]), args)
+        missing = [key for key in keys if key.key not in names]
+        if missing:
+            statement = statement.add_columns(*missing)
+        return statement, keys, descending, row_serializer(names, [self.columns[name] for name in names])
+
+    def field_names(self, args=None, extra=()):
+        """Names listed in ``fields=``, or None when every field is wanted."""
+        args = request.args if args is None else args
+        value = args.get("fields")
+        if not value:
+            return None
+        names = [name.strip() for name in value.split(",") if name.strip()]
+        for name in names:
+            if name not in self.columns and name not in extra:
+                raise InvalidQuery(f"unknown field: {name}")
+        return names
+
+    def sparse(self, item, args=None, extra=()):
+        """Trims a serialized entity to the fields listed in ``fields=``."""
+        return project(item, self.field_names(args, extra))
+
+    def apply(self, query, args=None):
+        """Returns ``(query, keys, descending)`` ready for ``paginate``."""
+        args = request.args if args is None else args
+        for param in args:
+            if param in RESERVED_PARAMS:
+                continue
+            name, _, operator = param.partition("__")
+            column = self.filters.get(name)
+            if column is None:
+                raise InvalidQuery(f"unknown filter: {param}")
+            query = query.filter(self._condition(column, operator, args.getlist(param)))
+        keys, descending = self._order(args.get("order_by"))
+        return query, keys, descending
+
+    def _condition(self, column, operator, values):
+        if operator == "":
+            if len(values) > 1:
+                return column.in_([self._parse(column, value) for value in values])
+            return column == self._parse(column, values[0])
+        if operator == "in":
+            return column.in_([self._parse(column, value) for value in values[-1].split(",")])
+        if operator in RANGE_OPERATORS and self._is_range(column):
+            return RANGE_OPERATORS[operator](column, self._parse(column, values[-1]))
+        raise InvalidQuery(f"unsupported operator for {column.key}: {operator}")
+
+    def _order(self, order_by):
+        if not order_by:
+            return self.default_order, False
+        descending = order_by.startswith("-")
+        column = self.sortable.get(order_by.lstrip("-"))
+        if column is None:
+            raise InvalidQuery(f"cannot order by {order_by.lstrip('-')}")
+        if column is self.model.id:
+            return (column,), descending
+        return (column, self.model.id), descending
+
+    @staticmethod
+    def _is_range(column):
+        return column.type.python_type in (int, float, datetime)
+
+    @staticmethod
+    def _parse(column, value):
+        python_type = column.type.python_type
+        if python_type is datetime:
+            return parse_datetime(value)
+        if issubclass(python_type, enum.Enum):
+            for state in python_type:
+                if value in (state.name, state.value):
+                    return state
+            raise InvalidQuery(f"invalid {column.key}: {value}")
+        try:
+            return python_type(value)
+        except ValueError:
+            raise InvalidQuery(f"invalid {column.key}: {value}")
+
+
+def project(item, names):
+    if names is None:
+        return item
+    return {name: item[name] for name in names}
+
+
+def row_serializer(names, columns):
+    enums = [name for name, column in zip(names, columns) if issubclass(column.type.python_type, enum.Enum)]
+
+    def serialize(row):
+        item = dict(zip(names, row))
+        for name in enums:
+            if item[name] is not None:
+                item[name] = item[name].value
+        return item
+    return serialize
@@ -0,0 +1,47 @@
+import multiprocessing
+import os
+import shutil
+from os import environ
+
+wsgi_app = "app:create_app()"
+bind = environ.get("BIND", "0.0.0.0:5000")
+workers = int(environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(environ.get("THREADS", 4))
+timeout = int(environ.get("TIMEOUT", 60))
+graceful_timeout = int(environ.get("GRACEFUL_TIMEOUT", 30))
+keepalive = int(environ.get("KEEPALIVE", 5))
+max_requests = int(environ.get("MAX_REQUESTS", 10000))
+max_requests_jitter = int(environ.get("MAX_REQUESTS_JITTER", 1000))
+preload_app = environ.get("PRELOAD_APP", "true").lower() == "true"
+accesslog = "-"
+
+
+def on_starting(server):
+    # metric files left by a previous run would be summed into the new one
+    directory = environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+def post_fork(server, worker):
+    from database import dispose_engines
+
+    # connections opened by the master while preloading must not be shared
+    # with the children; close=False leaves them open for the parent only
+    if server.cfg.preload_app:
+        dispose_engines(server.app.wsgi(), close=False)
+
+
+def worker_exit(server, worker):
+    from database import dispose_engines
+
+    dispose_engines(server.app.wsgi())
+
+
+def child_exit(server, worker):
+    if environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,344 @@
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+import click
+from sqlalchemy import Column, Enum, Index, Integer, MetaData, String, Table, cast, delete, exists, func, insert, or_, select, text, update
+from database import db
+from models import Clients, Devices, Employees, Orders, Payments, Schedule
+from filtering import parse_datetime
+from pagination import InvalidQuery
+from cache import cache
+from reports import record_changes, SUMMARIZED_MODELS
+from events import emit
+
+IMPORT_BATCH_SIZE = 10000
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ("csv", "ndjson")
+CONFLICT_RULES = ("error", "skip", "update")
+
+MODELS = {
+    "clients": Clients,
+    "devices": Devices,
+    "orders": Orders,
+    "payments": Payments,
+    "employees": Employees,
+    "schedules": Schedule,
+}
+
+
+def init_importer(app):
+    @app.cli.command("import-data")
+    @click.argument("entity", type=click.Choice(sorted(MODELS)))
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "format", type=click.Choice(FORMATS), help="Defaults to the file extension.")
+    @click.option("--on-conflict", type=click.Choice(CONFLICT_RULES), default="error", show_default=True)
+    @click.option("--key", help="Unique column that matches rows to update.")
+    def import_data_command(entity, path, format, on_conflict, key):
+        """Load a CSV or NDJSON file into a table and print the report."""
+        format = format or ("ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv")
+        with open(path, encoding="utf-8-sig", newline="") as file:
+            report = import_rows(MODELS[entity], read_rows(file, format), on_conflict, key)
+        click.echo(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+def read_rows(file, format):
+    """Yields ``(line, row)`` pairs from a text stream without reading it whole."""
+    if format == "csv":
+        reader = csv.reader(file)
+        header = next(reader, [])
+        for fields in reader:
+            row = dict(zip(header, fields))
+            if len(fields) > len(header):
+                row[None] = fields[len(header):]
+            yield reader.line_num, row
+        return
+    for line, raw in enumerate(file, 1):
+        if raw.strip():
+            try:
+                yield line, json.loads(raw)
+            except ValueError:
+                yield line, None
+
+
+def import_rows(model, rows, on_conflict="error", key=None):
+    """
+    Loads ``rows`` into ``model``'s table in one transaction and returns a
+    report. Rows are validated in a streaming pass and bulk-loaded into a
+    temporary staging table (COPY on PostgreSQL), where duplicates, unknown
+    references and conflicts with existing rows are resolved with set-based
+    statements before a single INSERT ... SELECT.
+
+    ``on_conflict`` decides what happens to rows whose unique columns are
+    already taken: ``error`` reports them, ``skip`` drops them silently and
+    ``update`` overwrites the existing row matched by the unique ``key``.
+    """
+    table = model.__table__
+    unique = [column.key for column in table.columns if column.unique or column.primary_key]
+    if on_conflict not in CONFLICT_RULES:
+        raise InvalidQuery(f"invalid on_conflict: {on_conflict}")
+    key = key or next((name for name in unique if name != "id"), "id")
+    if key not in unique:
+        raise InvalidQuery(f"key must be one of: {', '.join(unique)}")
+
+    report = {"received": 0, "inserted": 0, "updated": 0, "skipped": 0, "failed": 0, "errors": []}
+    columns = {column.key: column for column in table.columns}
+    staging = _staging_table(table)
+    connection = db.session.connection()
+    staging.drop(connection, checkfirst=True)
+    staging.create(connection)
+
+    clean = _cleaner(columns)
+    present = set()
+    batch = []
+    for line, row in rows:
+        report["received"] += 1
+        try:
+            values = clean(row)
+        except ValueError as e:
+            _fail(report, line, str(e))
+            continue
+        present.update(row)
+        values["line"] = line
+        batch.append(values)
+        if len(batch) == IMPORT_BATCH_SIZE:
+            _load(staging, batch)
+            batch = []
+    if batch:
+        _load(staging, batch)
+
+    for name in unique:
+        ranked = (
+            select(staging.c.line, func.row_number().over(
+                partition_by=staging.c[name], order_by=staging.c.line.desc()
+            ).label("rank"))
+            .where(staging.c[name].isnot(None))
+            .subquery()
+        )
+        duplicates = select(ranked.c.line).where(ranked.c.rank > 1)
+        _reject(staging, staging.c.line.in_(duplicates), report, f"duplicate {name} in the file, a later row wins")
+    for foreign_key in table.foreign_keys:
+        value = staging.c[foreign_key.parent.key]
+        missing = ~exists().where(foreign_key.column == value)
+        _reject(staging, value.isnot(None) & missing, report, f"unknown {foreign_key.parent.key}")
+
+    for name in unique:
+        if on_conflict == "update" and name == key:
+            continue
+        taken = exists().where(table.c[name] == staging.c[name])
+        if on_conflict == "update":
+            # the value belongs to a row other than the one being updated
+            taken = taken.where(or_(staging.c[key].is_(None), table.c[key] != staging.c[key]))
+        _reject(staging, taken, report, f"{name} already exists", skip=on_conflict == "skip")
+    if model is Schedule:
+        _reject_overlaps(staging, report, replaced=on_conflict == "update")
+
+    updated_ids = []
+    if on_conflict == "update":
+        updated_ids = _update(model, staging, key, [name for name in columns if name in present and name not in ("id", key)])
+        report["updated"] = len(_delete(staging, exists().where(table.c[key] == staging.c[key])))
+    report["inserted"] = _insert(model, staging, [name for name in columns if name != "id"])
+
+    staging.drop(connection)
+    if report["inserted"] or report["updated"]:
+        # one summary event instead of one per row; subscribers reload the entity
+        emit(model, "imported", [{"inserted": report["inserted"], "updated": report["updated"]}])
+    db.session.commit()
+    cache.invalidate(model, *updated_ids)
+    report["errors"].sort(key=lambda error: error["line"])
+    return report
+
+
+def _staging_table(table):
+    columns = [Column("line", Integer, primary_key=True)]
+    for column in table.columns:
+        # enums are staged by name and cast on the way out, so that no type has to be created
+        columns.append(Column(column.key, String(64) if isinstance(column.type, Enum) else column.type))
+    staging = Table(f"{table.name}_import", MetaData(), *columns, prefixes=["TEMPORARY"])
+    if table is Schedule.__table__:
+        # the overlap checks look up one employee's entries by start
+        Index(f"{staging.name}_employee_date", staging.c.employee_id, staging.c.date)
+    return staging
+
+
+def _reject_overlaps(staging, report, replaced):
+    """
+    Rejects schedule rows that would book an employee twice, which the
+    exclusion constraint (the triggers on SQLite) would otherwise turn into
+    a failure of the whole import. Of overlapping rows in the file the
+    later one wins, like duplicates; rows being replaced by the file
+    (``replaced``, with on_conflict=update) do not block it.
+    """
+    other = staging.alias("other")
+    _reject(staging, exists().where(
+        other.c.employee_id == staging.c.employee_id,
+        other.c.line > staging.c.line,
+        *_overlapping(other.c, staging.c),
+    ), report, "overlaps a later row for the same employee")
+    table = Schedule.__table__
+    taken = exists().where(table.c.employee_id == staging.c.employee_id, *_overlapping(table.c, staging.c))
+    if replaced:
+        other = staging.alias("replacing")
+        taken = taken.where(~exists().where(other.c.id == table.c.id))
+    _reject(staging, taken, report, "employee is busy at this time")
+
+
+def _overlapping(first, second):
+    # empty entries overlap nothing, as with tsrange
+    return [
+        first.date < second.end_date, first.end_date > second.date,
+        first.end_date > first.date, second.end_date > second.date,
+    ]
+
+
+def _cleaner(columns):
+    """Builds the per-row validator once, so that the streaming pass does no per-value type dispatch."""
+    converters = {name: _converter(column) for name, column in columns.items()}
+    required = [
+        (name, column.default) for name, column in columns.items()
+        if not column.nullable and not column.primary_key
+    ]
+
+    def clean(row):
+        if not isinstance(row, dict):
+            raise ValueError("expected an object")
+        values = dict.fromkeys(columns)
+        for name, value in row.items():
+            convert = converters.get(name)
+            if convert is None:
+                raise ValueError("too many fields" if name is None else f"unknown column: {name}")
+            if value is not None and value != "":
+                values[name] = convert(value)
+        for name, default in required:
+            if values[name] is None:
+                if default is None:
+                    raise ValueError(f"missing {name}")
+                values[name] = default.arg(_Context(values)) if default.is_callable else default.arg
+        return values
+
+    return clean
+
+
+def _converter(column):
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return parse_datetime
+    if issubclass(python_type, enum.Enum):
+        names = {key: member.name for member in python_type for key in (member.name, member.value)}
+
+        def convert(value):
+            if value not in names:
+                raise ValueError(f"invalid {column.key}: {value}")
+            return names[value]
+        return convert
+    length = getattr(column.type, "length", None)
+
+    def convert(value):
+        try:
+            value = python_type(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid {column.key}: {value}")
+        if length and len(value) > length:
+            raise ValueError(f"{column.key} is longer than {length} characters")
+        return value
+    return convert
+
+
+class _Context:
+    """Stands in for the execution context that callable column defaults receive."""
+
+    def __init__(self, values):
+        self.values = values
+
+    def get_current_parameters(self):
+        return self.values
+
+
+def _load(staging, batch):
+    connection = db.session.connection()
+    if connection.dialect.name != "postgresql":
+        db.session.execute(insert(staging), batch)
+        return
+    names = [column.key for column in staging.columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in batch:
+        writer.writerow([_copy_value(row[name]) for name in names])
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    cursor.copy_expert(
+        f"COPY {staging.name} ({', '.join(names)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+    )
+    cursor.close()
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    return value.isoformat(sep=" ") if isinstance(value, datetime) else value
+
+
+def _delete(staging, condition):
+    return db.session.execute(delete(staging).where(condition).returning(staging.c.line)).scalars().all()
+
+
+def _reject(staging, condition, report, message, skip=False):
+    for line in _delete(staging, condition):
+        if skip:
+            report["skipped"] += 1
+        else:
+            _fail(report, line, message)
+
+
+def _fail(report, line, message):
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"line": line, "message": message})
+
+
+def _update(model, staging, key, names):
+    table = model.__table__
+    matched = table.c[key] == staging.c[key]
+    if model in SUMMARIZED_MODELS:
+        _record(model, select(table).where(exists().where(matched)), removed=True)
+    ids = []
+    if names:
+        statement = update(table).where(matched).values({name: _cast(staging.c[name], table.c[name]) for name in names})
+        ids = db.session.execute(statement.returning(table.c.id)).scalars().all()
+    if model in SUMMARIZED_MODELS:
+        _record(model, select(table).where(exists().where(matched)), removed=False)
+    return ids
+
+
+def _insert(model, staging, names):
+    table = model.__table__
+    inserted = 0
+    # rows that carry their own id keep it, the rest get one from the sequence
+    for with_id in (True, False):
+        selected = staging.c.id.isnot(None) if with_id else staging.c.id.is_(None)
+        targets = ["id", *names] if with_id else names
+        if model in SUMMARIZED_MODELS:
+            _record(model, select(staging).where(selected), removed=False)
+        rows = select(*[_cast(staging.c[name], table.c[name]) for name in targets]).where(selected)
+        result = db.session.execute(insert(table).from_select(targets, rows.order_by(staging.c.line)))
+        inserted += result.rowcount
+        if with_id and result.rowcount and db.session.get_bind().dialect.name == "postgresql":
+            db.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT max(id) FROM {table.name}))"
+            ))
+    return inserted
+
+
+def _record(model, query, removed):
+    result = db.session.execute(query.execution_options(yield_per=IMPORT_BATCH_SIZE))
+    for rows in result.mappings().partitions():
+        rows = [dict(row) for row in rows]
+        if removed:
+            record_changes(model, removed=rows)
+        else:
+            record_changes(model, added=rows)
+
+
+def _cast(source, target):
+    return cast(source, target.type) if isinstance(target.type, Enum) else source
@@ -0,0 +1,61 @@
+import dataclasses
+import decimal
+import enum
+import json
+from datetime import date, datetime
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value):
+    # orjson encodes datetime, date and enums itself; the stdlib fallback ends up here for them too
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_bytes(obj):
+    """
+    Encodes ``obj`` as compact UTF-8 JSON with sorted keys and a trailing
+    newline. Datetimes are ISO 8601 and enums are their values.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=OPTIONS | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, default=_default, sort_keys=True, ensure_ascii=False, separators=(",", ":")) + "\n").encode()
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    Flask JSON provider built on orjson (the stdlib ``json`` when it is not
+    installed), used by ``jsonify`` and ``request.get_json``. ``response``
+    hands orjson's bytes to the response without a round trip through str.
+    """
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return dump_bytes(obj)[:-1].decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dump_bytes(obj), mimetype=self.mimetype)
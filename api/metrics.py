@@ -0,0 +1,108 @@
+import time
+from flask import Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+from os import environ
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by endpoint, method and status", ["endpoint", "method", "status"]
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds", "Time spent handling a request", ["endpoint", "method"]
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of the response body",
+    ["endpoint"],
+    buckets=(100, 1000, 10000, 100000, 1000000, 10000000),
+)
+SQL_STATEMENTS = Histogram(
+    "db_statements_per_request",
+    "SQL statements executed while handling a request",
+    ["endpoint"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500),
+)
+SQL_STATEMENTS_TOTAL = Counter("db_statements_total", "SQL statements executed", ["endpoint"])
+SQL_TIME = Histogram("db_time_per_request_seconds", "Time spent in the database per request", ["endpoint"])
+CACHE_EVENTS = Counter("entity_cache_events_total", "Entity cache hits, misses and evictions", ["model", "event"])
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight", "Admitted requests being handled", ["class"], multiprocess_mode="livesum"
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth", "Requests waiting for an admission slot", ["class"], multiprocess_mode="livesum"
+)
+ADMISSION_WAIT = Histogram(
+    "admission_wait_seconds",
+    "Time queued requests waited for a slot",
+    ["class"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10),
+)
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Requests refused with 503", ["class", "reason"])
+
+
+def init_metrics(app):
+    """
+    Records per-endpoint request metrics and SQL counts and serves them on
+    /metrics. With PROMETHEUS_MULTIPROC_DIR set every worker writes its own
+    files and /metrics aggregates all of them.
+    """
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    app.add_url_rule("/metrics", "metrics", get_metrics)
+
+
+def get_metrics():
+    if environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.sql_statements = 0
+    g.sql_time = 0.0
+
+
+def _record_request(response):
+    started = g.pop("metrics_started", None)
+    if started is None or request.endpoint == "metrics":
+        return response
+    endpoint = request.endpoint or "unmatched"
+    REQUESTS.labels(endpoint, request.method, response.status_code).inc()
+    LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+    if response.content_length is not None:
+        RESPONSE_SIZE.labels(endpoint).observe(response.content_length)
+    SQL_STATEMENTS.labels(endpoint).observe(g.sql_statements)
+    SQL_STATEMENTS_TOTAL.labels(endpoint).inc(g.sql_statements)
+    SQL_TIME.labels(endpoint).observe(g.sql_time)
+    return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # kept on the execution context, which is dropped with the statement even
+    # when it fails (after_cursor_execute is not called then)
+    if context is not None:
+        context.query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "query_started", None)
+    if started is not None and has_request_context() and "sql_statements" in g:
+        g.sql_statements += 1
+        g.sql_time += time.perf_counter() - started
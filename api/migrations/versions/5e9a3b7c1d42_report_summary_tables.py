@@ -0,0 +1,38 @@
+"""report summary tables
+
+Revision ID: 5e9a3b7c1d42
+Revises: c7d2f0e4a918
+Create Date: 2026-10-18 03:12:26.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e9a3b7c1d42'
+down_revision = 'c7d2f0e4a918'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_revenue',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('payments_count', sa.Integer(), nullable=False),
+    sa.Column('amount_total', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('daily_orders',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('state', sa.String(length=32), nullable=False),
+    sa.Column('orders_count', sa.Integer(), nullable=False),
+    sa.Column('cost_total', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'state')
+    )
+    # existing rows are summarized by `flask rebuild-reports`
+
+
+def downgrade():
+    op.drop_table('daily_orders')
+    op.drop_table('daily_revenue')
@@ -0,0 +1,47 @@
+"""access path indexes
+
+Revision ID: 8b4e6d21c5a3
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-18 02:20:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4e6d21c5a3'
+down_revision = '3f1c2a9d7b10'
+branch_labels = None
+depends_on = None
+
+OPEN_ORDERS = sa.text("state <> 'completed'")
+
+INDEXES = [
+    ('ix_devices_client_id', 'devices', ['client_id'], {}),
+    ('ix_orders_device_id', 'orders', ['device_id'], {}),
+    ('ix_orders_order_date_id', 'orders', ['order_date', 'id'], {}),
+    ('ix_orders_open_state', 'orders', ['state', 'order_date'],
+     {'postgresql_where': OPEN_ORDERS, 'sqlite_where': OPEN_ORDERS}),
+    ('ix_payments_order_id', 'payments', ['order_id'], {}),
+    ('ix_payments_payment_date_id', 'payments', ['payment_date', 'id'], {}),
+    ('ix_schedule_employee_id_date', 'schedule', ['employee_id', 'date'], {}),
+    ('ix_schedule_order_id', 'schedule', ['order_id'], {}),
+    ('ix_schedule_date_id', 'schedule', ['date', 'id'], {}),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block, and
+    # it does not lock the tables against writes while the index is built
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True,
+                            postgresql_concurrently=True, **kwargs)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True,
+                          postgresql_concurrently=True)
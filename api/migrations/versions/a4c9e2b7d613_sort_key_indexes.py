@@ -0,0 +1,39 @@
+"""sort key indexes
+
+Revision ID: a4c9e2b7d613
+Revises: f3b8d1c6a295
+Create Date: 2026-10-18 07:12:35.604118
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c9e2b7d613'
+down_revision = 'f3b8d1c6a295'
+branch_labels = None
+depends_on = None
+
+# one (key, id) index per sortable column, so that keyset pages are index range scans
+INDEXES = [
+    ('ix_clients_name_id', 'clients', ['name', 'id']),
+    ('ix_clients_surname_id', 'clients', ['surname', 'id']),
+    ('ix_devices_release_date_id', 'devices', ['release_date', 'id']),
+    ('ix_employees_surname_id', 'employees', ['surname', 'id']),
+    ('ix_orders_cost_id', 'orders', ['cost', 'id']),
+    ('ix_payments_amount_id', 'payments', ['amount', 'id']),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True,
+                            postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True,
+                          postgresql_concurrently=True)
@@ -0,0 +1,31 @@
+"""report versions
+
+Revision ID: b7e1f4c8d052
+Revises: a4c9e2b7d613
+Create Date: 2026-10-18 07:48:02.331790
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e1f4c8d052'
+down_revision = 'a4c9e2b7d613'
+branch_labels = None
+depends_on = None
+
+# the report ETags are built from the versions of the summary tables
+TABLES = ['daily_orders', 'daily_revenue']
+
+
+def upgrade():
+    table_versions = sa.table('table_versions', sa.column('name', sa.String), sa.column('version', sa.BigInteger))
+    op.bulk_insert(table_versions, [{'name': name, 'version': 0} for name in TABLES])
+
+
+def downgrade():
+    op.execute(
+        sa.text('DELETE FROM table_versions WHERE name IN :names')
+        .bindparams(sa.bindparam('names', TABLES, expanding=True))
+    )
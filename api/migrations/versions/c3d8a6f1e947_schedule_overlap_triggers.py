@@ -0,0 +1,57 @@
+"""schedule overlap triggers
+
+Revision ID: c3d8a6f1e947
+Revises: b7e1f4c8d052
+Create Date: 2026-10-18 08:21:44.907215
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d8a6f1e947'
+down_revision = 'b7e1f4c8d052'
+branch_labels = None
+depends_on = None
+
+# SQLite has no exclusion constraints; these triggers stand in for
+# ex_schedule_employee_overlap, so that no write path (bulk, import, ASGI)
+# can book an employee twice and scheduling.busy() can rely on it.
+# Empty entries overlap nothing, as with tsrange on PostgreSQL.
+OVERLAP = """
+    SELECT RAISE(ABORT, 'ex_schedule_employee_overlap')
+    WHERE NEW.end_date > NEW.date AND EXISTS (
+        SELECT 1 FROM schedule
+        WHERE employee_id = NEW.employee_id AND date < NEW.end_date AND end_date > NEW.date
+            AND end_date > date AND id IS NOT NEW.id
+    );
+"""
+
+# entries booked over each other before the triggers existed are cut short
+# where the employee's next entry starts, like the end_date backfill did
+TRIM = """
+UPDATE schedule SET end_date = following.next_date
+FROM (
+    SELECT id, lead(date) OVER (PARTITION BY employee_id ORDER BY date, id) AS next_date
+    FROM schedule
+) AS following
+WHERE following.id = schedule.id AND following.next_date < schedule.end_date
+"""
+
+
+def upgrade():
+    if op.get_context().dialect.name != 'sqlite':
+        return
+    op.execute(TRIM)
+    op.execute(f'CREATE TRIGGER tr_schedule_overlap_insert BEFORE INSERT ON schedule BEGIN {OVERLAP} END')
+    op.execute(
+        'CREATE TRIGGER tr_schedule_overlap_update BEFORE UPDATE OF date, end_date, employee_id ON schedule '
+        f'BEGIN {OVERLAP} END'
+    )
+
+
+def downgrade():
+    if op.get_context().dialect.name != 'sqlite':
+        return
+    op.execute('DROP TRIGGER IF EXISTS tr_schedule_overlap_update')
+    op.execute('DROP TRIGGER IF EXISTS tr_schedule_overlap_insert')
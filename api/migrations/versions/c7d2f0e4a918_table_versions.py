@@ -0,0 +1,31 @@
+"""table versions for etags
+
+Revision ID: c7d2f0e4a918
+Revises: 8b4e6d21c5a3
+Create Date: 2026-10-18 02:41:07.552930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2f0e4a918'
+down_revision = '8b4e6d21c5a3'
+branch_labels = None
+depends_on = None
+
+TABLES = ['clients', 'devices', 'employees', 'orders', 'payments', 'schedule']
+
+
+def upgrade():
+    table_versions = op.create_table('table_versions',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(table_versions, [{'name': name, 'version': 0} for name in TABLES])
+
+
+def downgrade():
+    op.drop_table('table_versions')
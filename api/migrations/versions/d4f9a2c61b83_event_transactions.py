@@ -0,0 +1,29 @@
+"""event transactions
+
+Revision ID: d4f9a2c61b83
+Revises: c3d8a6f1e947
+Create Date: 2026-10-18 11:02:17.530614
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f9a2c61b83'
+down_revision = 'c3d8a6f1e947'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the events already in the log keep tx 0 and so stay before every new one
+    with op.batch_alter_table('events') as batch_op:
+        batch_op.add_column(sa.Column('tx', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_index('ix_events_tx_id', 'events', ['tx', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_events_tx_id', table_name='events')
+    with op.batch_alter_table('events') as batch_op:
+        batch_op.drop_column('tx')
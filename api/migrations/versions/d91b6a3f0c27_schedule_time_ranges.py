@@ -0,0 +1,58 @@
+"""schedule time ranges
+
+Revision ID: d91b6a3f0c27
+Revises: 5e9a3b7c1d42
+Create Date: 2026-10-18 04:05:13.552190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd91b6a3f0c27'
+down_revision = '5e9a3b7c1d42'
+branch_labels = None
+depends_on = None
+
+# existing entries get an hour, cut short where the employee's next entry
+# starts, so that the history never violates the overlap constraint
+BACKFILL = """
+UPDATE schedule SET end_date = CASE
+    WHEN following.next_date IS NOT NULL AND following.next_date < {one_hour_later}
+    THEN following.next_date ELSE {one_hour_later} END
+FROM (
+    SELECT id, lead(date) OVER (PARTITION BY employee_id ORDER BY date, id) AS next_date
+    FROM schedule
+) AS following
+WHERE following.id = schedule.id
+"""
+
+
+def upgrade():
+    dialect = op.get_context().dialect.name
+    op.add_column('schedule', sa.Column('end_date', sa.DateTime(), nullable=True))
+    if dialect == 'postgresql':
+        op.execute(BACKFILL.format(one_hour_later="schedule.date + interval '1 hour'"))
+    else:
+        # keep the fractional seconds in the format SQLAlchemy stores
+        op.execute(BACKFILL.format(
+            one_hour_later="strftime('%Y-%m-%d %H:%M:%S', schedule.date, '+1 hour') || substr(schedule.date, 20)"
+        ))
+    with op.batch_alter_table('schedule') as batch_op:
+        batch_op.alter_column('end_date', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_check_constraint('ck_schedule_end_date', 'end_date >= date')
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        op.execute(
+            'ALTER TABLE schedule ADD CONSTRAINT ex_schedule_employee_overlap '
+            'EXCLUDE USING gist (employee_id WITH =, tsrange(date, end_date) WITH &&)'
+        )
+
+
+def downgrade():
+    if op.get_context().dialect.name == 'postgresql':
+        op.execute('ALTER TABLE schedule DROP CONSTRAINT ex_schedule_employee_overlap')
+    with op.batch_alter_table('schedule') as batch_op:
+        batch_op.drop_constraint('ck_schedule_end_date', type_='check')
+        batch_op.drop_column('end_date')
@@ -0,0 +1,77 @@
+"""search indexes
+
+Revision ID: e2a7c5b94d18
+Revises: d91b6a3f0c27
+Create Date: 2026-10-18 04:47:38.160942
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a7c5b94d18'
+down_revision = 'd91b6a3f0c27'
+branch_labels = None
+depends_on = None
+
+# must match the documents built by search.SearchIndex
+SEARCHES = {
+    'clients': ('name', 'surname', 'phone', 'email'),
+    'devices': ('manufacturer', 'model', 'sn'),
+}
+
+
+def upgrade():
+    if op.get_context().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        with op.get_context().autocommit_block():
+            for table, columns in SEARCHES.items():
+                op.execute(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_search ON {table} '
+                    f"USING gin (({_document(columns)}) gin_trgm_ops)"
+                )
+    elif op.get_context().dialect.name == 'sqlite':
+        for table, columns in SEARCHES.items():
+            _create_fts(table, columns)
+
+
+def downgrade():
+    if op.get_context().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for table in SEARCHES:
+                op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_search')
+    elif op.get_context().dialect.name == 'sqlite':
+        for table in SEARCHES:
+            for trigger in ('insert', 'delete', 'update'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_search_{trigger}')
+            op.execute(f'DROP TABLE IF EXISTS {table}_search')
+
+
+def _document(columns):
+    return " || ' ' || ".join(columns)
+
+
+def _create_fts(table, columns):
+    # external content table: the text stays in the base table and the
+    # triggers keep the trigram index in step with it
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    op.execute(
+        f"CREATE VIRTUAL TABLE {table}_search USING fts5({names}, "
+        f"content='{table}', content_rowid='id', tokenize='trigram')"
+    )
+    op.execute(f"INSERT INTO {table}_search({table}_search) VALUES ('rebuild')")
+    op.execute(
+        f'CREATE TRIGGER {table}_search_insert AFTER INSERT ON {table} BEGIN '
+        f'INSERT INTO {table}_search(rowid, {names}) VALUES (new.id, {new}); END'
+    )
+    op.execute(
+        f'CREATE TRIGGER {table}_search_delete AFTER DELETE ON {table} BEGIN '
+        f"INSERT INTO {table}_search({table}_search, rowid, {names}) VALUES ('delete', old.id, {old}); END"
+    )
+    op.execute(
+        f'CREATE TRIGGER {table}_search_update AFTER UPDATE ON {table} BEGIN '
+        f"INSERT INTO {table}_search({table}_search, rowid, {names}) VALUES ('delete', old.id, {old}); "
+        f'INSERT INTO {table}_search(rowid, {names}) VALUES (new.id, {new}); END'
+    )
@@ -1,9 +1,21 @@
 import enum
+from datetime import timedelta
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 from database import db
 
+SCHEDULE_DURATION = timedelta(hours=1)
+
+
+def default_end_date(context):
+    return context.get_current_parameters()["date"] + SCHEDULE_DURATION
+
 
 class Clients(db.Model):
     __tablename__ = "clients"
+    __table_args__ = (
+        db.Index("ix_clients_name_id", "name", "id"),
+        db.Index("ix_clients_surname_id", "surname", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
@@ -12,6 +24,8 @@ class Clients(db.Model):
     phone = db.Column(db.String(255), unique=True, nullable=False)
     email = db.Column(db.String(255), unique=True, nullable=False)
 
+    devices = db.relationship("Devices", back_populates="client", passive_deletes=True)
+
     def json(self):
         return {
             "id": self.id,
@@ -25,6 +39,9 @@ class Clients(db.Model):
 
 class Devices(db.Model):
     __tablename__ = "devices"
+    __table_args__ = (
+        db.Index("ix_devices_release_date_id", "release_date", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     manufacturer = db.Column(db.String(255), nullable=False)
@@ -32,7 +49,10 @@ class Devices(db.Model):
     sn = db.Column(db.String(255), unique=True, nullable=False)
     release_date = db.Column(db.DateTime, nullable=False)
     purchase_date = db.Column(db.DateTime)
-    client_id = db.Column(db.Integer, db.ForeignKey("clients.id"), nullable=False)
+    client_id = db.Column(db.Integer, db.ForeignKey("clients.id"), nullable=False, index=True)
+
+    client = db.relationship("Clients", back_populates="devices")
+    orders = db.relationship("Orders", back_populates="device", passive_deletes=True)
 
     def json(self):
         return {
@@ -48,12 +68,17 @@ class Devices(db.Model):
 
 class Employees(db.Model):
     __tablename__ = "employees"
+    __table_args__ = (
+        db.Index("ix_employees_surname_id", "surname", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
     surname = db.Column(db.String(255), nullable=False)
     post = db.Column(db.String(255), nullable=False)
 
+    schedules = db.relationship("Schedule", back_populates="employee", passive_deletes=True)
+
     def json(self):
         return {
             "id": self.id,
@@ -65,6 +90,17 @@ class Employees(db.Model):
 
 class Orders(db.Model):
     __tablename__ = "orders"
+    __table_args__ = (
+        db.Index("ix_orders_order_date_id", "order_date", "id"),
+        db.Index("ix_orders_cost_id", "cost", "id"),
+        db.Index(
+            "ix_orders_open_state",
+            "state",
+            "order_date",
+            postgresql_where=db.text("state <> 'completed'"),
+            sqlite_where=db.text("state <> 'completed'"),
+        ),
+    )
 
     class States(enum.Enum):
         pending = "ожидание"
@@ -73,11 +109,15 @@ class Orders(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     order_date = db.Column(db.DateTime, nullable=False)
-    device_id = db.Column(db.Integer, db.ForeignKey("devices.id"), nullable=False)
+    device_id = db.Column(db.Integer, db.ForeignKey("devices.id"), nullable=False, index=True)
     description = db.Column(db.String(255), nullable=False)
     cost = db.Column(db.Float, nullable=False)
     state = db.Column(db.Enum(States), nullable=False)
 
+    device = db.relationship("Devices", back_populates="orders")
+    payments = db.relationship("Payments", back_populates="order", passive_deletes=True)
+    schedules = db.relationship("Schedule", back_populates="order", passive_deletes=True)
+
     def json(self):
         return {
             "id": self.id,
@@ -88,15 +128,29 @@ class Orders(db.Model):
             "state": self.state.value,
         }
 
+    def json_full(self):
+        order = self.json()
+        order["device"] = self.device.json()
+        order["device"]["client"] = self.device.client.json()
+        order["payments"] = [payment.json() for payment in self.payments]
+        order["schedules"] = [schedule.json() for schedule in self.schedules]
+        return order
+
 
 class Payments(db.Model):
     __tablename__ = "payments"
+    __table_args__ = (
+        db.Index("ix_payments_payment_date_id", "payment_date", "id"),
+        db.Index("ix_payments_amount_id", "amount", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     payment_date = db.Column(db.DateTime, unique=True, nullable=False)
-    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False, index=True)
     amount = db.Column(db.Float, nullable=False)
 
+    order = db.relationship("Orders", back_populates="payments")
+
     def json(self):
         return {
             "id": self.id,
@@ -108,16 +162,74 @@ class Payments(db.Model):
 
 class Schedule(db.Model):
     __tablename__ = "schedule"
+    __table_args__ = (
+        db.Index("ix_schedule_employee_id_date", "employee_id", "date"),
+        db.Index("ix_schedule_date_id", "date", "id"),
+        db.CheckConstraint("end_date >= date", name="ck_schedule_end_date"),
+        # an employee cannot be booked twice at the same time; needs btree_gist
+        # (on SQLite the tr_schedule_overlap_* triggers do the same)
+        ExcludeConstraint(
+            ("employee_id", "="),
+            (db.text("tsrange(date, end_date)"), "&&"),
+            name="ex_schedule_employee_overlap",
+            using="gist",
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.DateTime, nullable=False)
+    end_date = db.Column(db.DateTime, nullable=False, default=default_end_date)
     employee_id = db.Column(db.Integer, db.ForeignKey("employees.id"), nullable=False)
-    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False, index=True)
+
+    employee = db.relationship("Employees", back_populates="schedules")
+    order = db.relationship("Orders", back_populates="schedules")
 
     def json(self):
         return {
             "id": self.id,
             "date": self.date,
+            "end_date": self.end_date,
             "employee_id": self.employee_id,
             "order_id": self.order_id,
         }
+
+
+class TableVersions(db.Model):
+    __tablename__ = "table_versions"
+
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class DailyRevenue(db.Model):
+    __tablename__ = "daily_revenue"
+
+    day = db.Column(db.Date, primary_key=True)
+    payments_count = db.Column(db.Integer, nullable=False, default=0)
+    amount_total = db.Column(db.Float, nullable=False, default=0)
+
+
+class DailyOrders(db.Model):
+    __tablename__ = "daily_orders"
+
+    day = db.Column(db.Date, primary_key=True)
+    state = db.Column(db.String(32), primary_key=True)
+    orders_count = db.Column(db.Integer, nullable=False, default=0)
+    cost_total = db.Column(db.Float, nullable=False, default=0)
+
+
+class Events(db.Model):
+    __tablename__ = "events"
+    __table_args__ = (
+        db.Index("ix_events_tx_id", "tx", "id"),
+    )
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    # the writing transaction's id on PostgreSQL, 0 elsewhere
+    tx = db.Column(db.BigInteger, nullable=False, server_default="0")
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    entity = db.Column(db.String(32), nullable=False)
+    entity_id = db.Column(db.Integer)
+    action = db.Column(db.String(16), nullable=False)
+    data = db.Column(db.Text)
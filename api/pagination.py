@@ -0,0 +1,100 @@
+import base64
+import json
+from datetime import datetime
+from flask import current_app, request
+from sqlalchemy import Select, tuple_
+from database import db
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, keys):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise InvalidQuery("invalid cursor")
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise InvalidQuery("invalid cursor")
+    try:
+        return [
+            datetime.fromisoformat(value) if _is_datetime(key) and value is not None else value
+            for key, value in zip(keys, values)
+        ]
+    except (TypeError, ValueError):
+        raise InvalidQuery("invalid cursor")
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    if value is None:
+        return min(default, maximum)
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidQuery("invalid limit")
+    if limit < 1:
+        raise InvalidQuery("invalid limit")
+    return min(limit, maximum)
+
+
+def page_size():
+    return parse_limit(
+        request.args.get("limit"),
+        current_app.config.get("DEFAULT_PAGE_SIZE", DEFAULT_PAGE_SIZE),
+        current_app.config.get("MAX_PAGE_SIZE", MAX_PAGE_SIZE),
+    )
+
+
+def keyset(query, keys, after, descending=False):
+    """Orders ``query`` (a Query or a Select) by ``keys`` and skips past the ``after`` cursor."""
+    if after:
+        values = decode_cursor(after, keys)
+        if len(keys) == 1:
+            condition = keys[0] < values[0] if descending else keys[0] > values[0]
+        else:
+            condition = tuple_(*keys) < tuple_(*values) if descending else tuple_(*keys) > tuple_(*values)
+        query = query.filter(condition)
+    return query.order_by(*[key.desc() if descending else key.asc() for key in keys])
+
+
+def page(rows, limit, keys, serialize):
+    """Builds the response body from up to ``limit + 1`` rows fetched through ``keyset``."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([_key_value(rows[-1], key) for key in keys])
+    return {"items": [serialize(row) for row in rows], "next": next_cursor}
+
+
+def paginate(query, keys, serialize, descending=False):
+    """
+    Keyset pagination over ``keys`` (the last key must be unique, normally ``id``)
+    of an ORM Query or a Select. Reads ``limit`` and ``after`` from the query
+    string and returns ``{"items": [...], "next": cursor or None}``.
+    """
+    limit = page_size()
+    query = keyset(query, keys, request.args.get("after"), descending).limit(limit + 1)
+    rows = db.session.execute(query).all() if isinstance(query, Select) else query.all()
+    return page(rows, limit, keys, serialize)
+
+
+def _key_value(row, key):
+    return getattr(row, key.key)
+
+
+def _is_datetime(key):
+    try:
+        return key.type.python_type is datetime
+    except NotImplementedError:
+        return False
@@ -0,0 +1,231 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from database import db
+from models import Orders, Payments, DailyOrders, DailyRevenue
+from filtering import parse_datetime
+
+# models whose writes have to go through record_changes
+SUMMARIZED_MODELS = (Orders, Payments)
+# days of summaries rebuilt per transaction
+REBUILD_DAYS = 31
+
+
+def init_reports(app):
+    @app.cli.command("rebuild-reports")
+    def rebuild_reports_command():
+        """Recompute the report summary tables from orders and payments (safe while serving)."""
+        rebuild()
+
+
+def record_changes(model, removed=(), added=(), session=None):
+    """
+    Keeps the daily summary tables in step with a write to ``model``, in the
+    caller's transaction (``session``, the request session by default).
+    ``removed`` and ``added`` hold the old and new versions of the affected
+    rows (ORM objects or dicts); models without summaries are ignored.
+    """
+    session = session or db.session
+    if model is Payments:
+        deltas = defaultdict(lambda: [0, 0.0])
+        for sign, rows in ((-1, removed), (1, added)):
+            for row in rows:
+                bucket = deltas[_day(_get(row, "payment_date"))]
+                bucket[0] += sign
+                bucket[1] += sign * float(_get(row, "amount"))
+        for day, (count, amount) in deltas.items():
+            _add(session, DailyRevenue, {"day": day}, {"payments_count": count, "amount_total": amount})
+    elif model is Orders:
+        deltas = defaultdict(lambda: [0, 0.0])
+        for sign, rows in ((-1, removed), (1, added)):
+            for row in rows:
+                bucket = deltas[(_day(_get(row, "order_date")), _state(_get(row, "state")))]
+                bucket[0] += sign
+                bucket[1] += sign * float(_get(row, "cost"))
+        for (day, state), (count, cost) in deltas.items():
+            _add(session, DailyOrders, {"day": day, "state": state}, {"orders_count": count, "cost_total": cost})
+
+
+def rebuild(days=REBUILD_DAYS):
+    """
+    Recomputes the summary tables from orders and payments, ``days`` days
+    per transaction and without locking writers out. A batch first makes
+    sure each of its summary rows exists and locks them, then counts: a
+    write that was in flight either committed before the count or adds its
+    change to the recomputed row once the batch commits.
+    """
+    session = db.session
+    payment_day = func.date(Payments.payment_date)
+    _rebuild(session, DailyRevenue, Payments.payment_date, days, lambda start, end: {
+        (_day(day),): {"payments_count": count, "amount_total": amount}
+        for day, count, amount in session.execute(
+            select(payment_day, func.count(), func.sum(Payments.amount))
+            .where(Payments.payment_date >= start, Payments.payment_date < end)
+            .group_by(payment_day)
+        )
+    })
+    order_day = func.date(Orders.order_date)
+    _rebuild(session, DailyOrders, Orders.order_date, days, lambda start, end: {
+        (_day(day), _state(state)): {"orders_count": count, "cost_total": cost}
+        for day, state, count, cost in session.execute(
+            select(order_day, Orders.state, func.count(), func.sum(Orders.cost))
+            .where(Orders.order_date >= start, Orders.order_date < end)
+            .group_by(order_day, Orders.state)
+        )
+    })
+
+
+def _rebuild(session, model, source, days, totals):
+    keys = [column.key for column in model.__table__.primary_key]
+    bounds = [
+        _day(value)
+        for value in (*session.execute(select(func.min(source), func.max(source))).one(),
+                      *session.execute(select(func.min(model.day), func.max(model.day))).one())
+        if value is not None
+    ]
+    session.commit()
+    if not bounds:
+        return
+    start, last = min(bounds), max(bounds)
+    while start <= last:
+        end = start + timedelta(days=days)
+        since, until = datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time())
+        # concurrent writers now have to update these rows, which the lock below makes them wait for
+        _seed(session, model, [dict(zip(keys, key)) for key in totals(since, until)])
+        locked = session.execute(
+            select(*model.__table__.primary_key).where(model.day >= start, model.day < end).with_for_update()
+        ).all()
+        counted = totals(since, until)
+        updated = [dict(zip(keys, row), **counted[tuple(row)]) for row in locked if tuple(row) in counted]
+        if updated:
+            # by primary key, as one executemany
+            session.execute(update(model), updated)
+        for row in locked:
+            if tuple(row) not in counted:
+                session.execute(delete(model).where(*[getattr(model, key) == value for key, value in zip(keys, row)]))
+        session.commit()
+        start = end
+
+
+def revenue(period, start=None, end=None):
+    query = select(DailyRevenue.day, DailyRevenue.payments_count, DailyRevenue.amount_total)
+    buckets = defaultdict(lambda: {"payments": 0, "amount": 0.0})
+    for day, count, amount in db.session.execute(_between(query, DailyRevenue.day, start, end)):
+        bucket = buckets[bucket_start(_day(day), period)]
+        bucket["payments"] += count
+        bucket["amount"] += amount
+    return [{"period": key.isoformat(), **_rounded(value)} for key, value in sorted(buckets.items())]
+
+
+def orders_by_state(start=None, end=None):
+    query = select(
+        DailyOrders.state, func.sum(DailyOrders.orders_count), func.sum(DailyOrders.cost_total)
+    ).group_by(DailyOrders.state)
+    items = []
+    for state, count, cost in db.session.execute(_between(query, DailyOrders.day, start, end)):
+        if not count:
+            continue
+        items.append({
+            "state": Orders.States[state].value,
+            "orders": count,
+            "cost_total": round(cost, 2),
+            "cost_average": round(cost / count, 2),
+        })
+    return items
+
+
+def billing(period, start=None, end=None):
+    buckets = defaultdict(lambda: {"billed": 0.0, "paid": 0.0})
+    billed = select(DailyOrders.day, func.sum(DailyOrders.cost_total)).group_by(DailyOrders.day)
+    for day, cost in db.session.execute(_between(billed, DailyOrders.day, start, end)):
+        buckets[bucket_start(_day(day), period)]["billed"] += cost
+    paid = select(DailyRevenue.day, DailyRevenue.amount_total)
+    for day, amount in db.session.execute(_between(paid, DailyRevenue.day, start, end)):
+        buckets[bucket_start(_day(day), period)]["paid"] += amount
+    return [
+        {"period": key.isoformat(), **_rounded(value), "outstanding": round(value["billed"] - value["paid"], 2)}
+        for key, value in sorted(buckets.items())
+    ]
+
+
+def bucket_start(day, period):
+    if period == "day":
+        return day
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    raise ValueError(period)
+
+
+def parse_day(value):
+    return None if value is None else parse_datetime(value).date()
+
+
+def _between(query, column, start, end):
+    if start is not None:
+        query = query.where(column >= start)
+    if end is not None:
+        query = query.where(column <= end)
+    return query
+
+
+def _add(session, model, key, deltas):
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert_ = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert_(model).values(**key, **deltas)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(key),
+            set_={column: getattr(model, column) + statement.excluded[column] for column in deltas},
+        )
+        session.execute(statement)
+        return
+    conditions = [getattr(model, column) == value for column, value in key.items()]
+    result = session.execute(
+        update(model).where(*conditions).values(
+            {column: getattr(model, column) + value for column, value in deltas.items()}
+        )
+    )
+    if result.rowcount == 0:
+        session.execute(insert(model).values(**key, **deltas))
+
+
+def _seed(session, model, keys):
+    """Inserts the summary rows for ``keys`` that do not exist yet, with zero totals."""
+    if not keys:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert_ = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        session.execute(insert_(model).on_conflict_do_nothing(), keys)
+        return
+    values = [column.key for column in model.__table__.columns if not column.primary_key]
+    for key in keys:
+        _add(session, model, key, {column: 0 for column in values})
+
+
+def _get(row, key):
+    return row[key] if isinstance(row, dict) else getattr(row, key)
+
+
+def _day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return parse_datetime(value).date()
+
+
+def _state(value):
+    if isinstance(value, Orders.States):
+        return value.name
+    for state in Orders.States:
+        if value in (state.name, state.value):
+            return state.name
+    raise ValueError(f"invalid state: {value}")
+
+
+def _rounded(values):
+    return {key: round(value, 2) if isinstance(value, float) else value for key, value in values.items()}
@@ -4,9 +4,25 @@ import sys
 parent_dir_name = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.append(parent_dir_name)
 from models import db, Clients
+from pagination import paginate, parse_limit, InvalidQuery
+from filtering import FilterSet, project
+from search import SearchIndex, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from bulk import bulk_create, bulk_update
+from writes import item_values, update_row, delete_row
+from cache import cache
+from etag import conditional, tagged
 
 clients_blueprint = Blueprint("clients_blueprint", __name__)
 
+clients_filters = FilterSet(
+    Clients,
+    filters=("name", "surname", "phone", "email"),
+    sortable=("id", "name", "surname"),
+    default_order=("id",),
+)
+
+clients_search = SearchIndex(Clients, ("name", "surname", "phone", "email"))
+
 
 @clients_blueprint.route("/clients", methods=["POST"])
 def create_client():
@@ -49,26 +65,170 @@ def create_client():
         return make_response(jsonify({"message": "error creating client"}), 500)
 
 
+@clients_blueprint.route("/clients/bulk", methods=["POST"])
+def create_clients_bulk():
+    """
+    Пакетное создание клиентов
+    ---
+    tags:
+        - Clients
+    produces:
+        - application/json
+    parameters:
+        - in: body
+          name: JSON
+          required: True
+          example: [{
+              name: Василий,
+              surname: Пупкин,
+              address: "г.Витебск, пр-т. Московский 123",
+              phone: "+375 33 333-33-33",
+              email: vasiliy.pupkin@gmail.com
+          }]
+    responses:
+        201:
+            description: '{ "succeeded": 1, "failed": 0, "results": [{ "index": 0, "status": 201, "id": 1 }] }'
+        207:
+            description: Часть записей не создана, причина указана в "results"
+    """
+    try:
+        body, status = bulk_create(Clients, request.get_json())
+        return make_response(jsonify(body), status)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error creating clients"}), 500)
+
+
+@clients_blueprint.route("/clients/bulk", methods=["PUT"])
+def update_clients_bulk():
+    """
+    Пакетное редактирование клиентов
+    ---
+    tags:
+        - Clients
+    produces:
+        - application/json
+    parameters:
+        - in: body
+          name: JSON
+          required: True
+          example: [{
+              id: 1,
+              name: Василий,
+              surname: Пупкин,
+              address: "г.Витебск, пр-т. Московский 123",
+              phone: "+375 33 333-33-33",
+              email: vasiliy.pupkin@gmail.com
+          }]
+    responses:
+        200:
+            description: '{ "succeeded": 1, "failed": 0, "results": [{ "index": 0, "status": 200, "id": 1 }] }'
+        207:
+            description: Часть записей не обновлена, причина указана в "results"
+    """
+    try:
+        body, status = bulk_update(Clients, request.get_json())
+        return make_response(jsonify(body), status)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error updating clients"}), 500)
+
+
 @clients_blueprint.route("/clients", methods=["GET"])
+@conditional("clients")
 def get_clients():
     """
     Получение всех клиентов
     ---
     tags:
         - Clients
+    parameters:
+        - in: query
+          name: limit
+          type: integer
+          example: 100
+          description: Размер страницы (не больше 1000)
+        - in: query
+          name: after
+          type: string
+          description: Курсор следующей страницы из поля "next" предыдущего ответа
+        - in: query
+          name: surname
+          type: string
+          example: Пупкин
+          description: Фамилия
+        - in: query
+          name: phone
+          type: string
+          example: +375 33 333-33-33
+          description: Телефон
+        - in: query
+          name: order_by
+          type: string
+          example: -surname
+          description: Поле сортировки, "-" для убывания
+        - in: query
+          name: fields
+          type: string
+          example: id,name,surname,phone
+          description: Поля через запятую (по умолчанию все)
     responses:
         200:
-            description: Пример успешного ответа
+            description: '{ "items": [...], "next": "курсор или null" }'
     """
     try:
-        clients = Clients.query.all()
-        return make_response(jsonify([client.json() for client in clients]), 200)
+        query, keys, descending, serialize = clients_filters.select()
+        page = paginate(query, keys, serialize, descending)
+        return make_response(jsonify(page), 200)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error getting clients"}), 500)
 
 
+@clients_blueprint.route("/clients/search", methods=["GET"])
+@conditional("clients")
+def search_clients():
+    """
+    Поиск клиентов по имени, фамилии, телефону или email (подстрока или похожее написание)
+    ---
+    tags:
+        - Clients
+    parameters:
+        - in: query
+          name: q
+          type: string
+          example: Иванов
+          required: True
+          description: Строка поиска, не короче 3 символов
+        - in: query
+          name: limit
+          type: integer
+          example: 20
+          description: Количество результатов (не больше 100)
+    responses:
+        200:
+            description: '{ "items": [...] }, лучшие совпадения первыми'
+    """
+    try:
+        limit = parse_limit(request.args.get("limit"), DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT)
+        names = clients_filters.field_names()
+        found = clients_search.search(request.args.get("q"), limit)
+        return make_response(jsonify({"items": [project(entity.json(), names) for entity in found]}), 200)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error searching clients"}), 500)
+
+
 @clients_blueprint.route("/clients/<int:id>", methods=["GET"])
+@tagged
 def get_client(id):
     """
     Получение конкретного клиента
@@ -81,15 +241,22 @@ def get_client(id):
           type: integer
           example: 1
           required: True
+        - in: query
+          name: fields
+          type: string
+          example: id,name,surname,phone
+          description: Поля через запятую (по умолчанию все)
     responses:
         200:
             description: Пример успешного ответа
     """
     try:
-        client = Clients.query.filter_by(id=id).first()
+        client = cache.get(Clients, id)
         if client:
-            return make_response(jsonify({"client": client.json()}), 200)
+            return make_response(jsonify({"client": clients_filters.sparse(client)}), 200)
         return make_response(jsonify({"message": "client not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error getting client"}), 500)
@@ -123,17 +290,49 @@ def update_client(id):
             description: Пример успешного ответа
     """
     try:
-        client = Clients.query.filter_by(id=id).first()
-        if client:
-            data = request.get_json()
-            client.name = data["name"] if "name" in data else client.name
-            client.surname = data["surname"] if "surname" in data else client.name
-            client.address = data["address"] if "address" in data else client.name
-            client.phone = data["phone"] if "phone" in data else client.name
-            client.email = data["email"] if "email" in data else client.name
+        if update_row(Clients, id, item_values(Clients, request.get_json())):
+            db.session.commit()
+            cache.invalidate(Clients, id)
+            return make_response(jsonify({"message": "client updated"}), 202)
+        return make_response(jsonify({"message": "client not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error updating client"}), 500)
+
+
+@clients_blueprint.route("/clients/<int:id>", methods=["PATCH"])
+def patch_client(id):
+    """
+    Частичное редактирование конкретного клиента (меняются только переданные поля)
+    ---
+    tags:
+        - Clients
+    parameters:
+        - in: path
+          name: id
+          type: integer
+          example: 1
+          required: True
+        - in: body
+          name: JSON
+          required: True
+          example: {
+              phone: "+375 33 333-33-34"
+          }
+    responses:
+        200:
+            description: Пример успешного ответа
+    """
+    try:
+        if update_row(Clients, id, item_values(Clients, request.get_json(), partial=True)):
             db.session.commit()
+            cache.invalidate(Clients, id)
             return make_response(jsonify({"message": "client updated"}), 202)
         return make_response(jsonify({"message": "client not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error updating client"}), 500)
@@ -157,10 +356,9 @@ def delete_client(id):
             description: Пример успешного ответа
     """
     try:
-        client = Clients.query.filter_by(id=id).first()
-        if client:
-            db.session.delete(client)
+        if delete_row(Clients, id):
             db.session.commit()
+            cache.invalidate(Clients, id)
             return make_response(jsonify({"message": "client deleted"}), 200)
         return make_response(jsonify({"message": "client not found"}), 204)
     except Exception as e:
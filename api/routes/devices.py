@@ -4,9 +4,25 @@ import sys
 parent_dir_name = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.append(parent_dir_name)
 from models import db, Devices
+from pagination import paginate, parse_limit, InvalidQuery
+from filtering import FilterSet, project
+from search import SearchIndex, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from bulk import bulk_create, bulk_update
+from writes import item_values, update_row, delete_row
+from cache import cache
+from etag import conditional, tagged
 
 devices_blueprint = Blueprint("devices_blueprint", __name__)
 
+devices_filters = FilterSet(
+    Devices,
+    filters=("client_id", "manufacturer", "model", "sn", "release_date", "purchase_date"),
+    sortable=("id", "release_date"),
+    default_order=("id",),
+)
+
+devices_search = SearchIndex(Devices, ("manufacturer", "model", "sn"))
+
 
 @devices_blueprint.route("/devices", methods=["POST"])
 def create_device():
@@ -51,26 +67,172 @@ def create_device():
         return make_response(jsonify({"message": "error creating device"}), 500)
 
 
+@devices_blueprint.route("/devices/bulk", methods=["POST"])
+def create_devices_bulk():
+    """
+    Пакетное создание устройств
+    ---
+    tags:
+        - Devices
+    produces:
+        - application/json
+    parameters:
+        - in: body
+          name: JSON
+          required: True
+          example: [{
+              manufacturer: HP,
+              model: 620,
+              sn: CSD8762SDF,
+              release_date: "01.10.2010",
+              purchase_date: "03.12.2010",
+              client_id: 1
+          }]
+    responses:
+        201:
+            description: '{ "succeeded": 1, "failed": 0, "results": [{ "index": 0, "status": 201, "id": 1 }] }'
+        207:
+            description: Часть записей не создана, причина указана в "results"
+    """
+    try:
+        body, status = bulk_create(Devices, request.get_json())
+        return make_response(jsonify(body), status)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error creating devices"}), 500)
+
+
+@devices_blueprint.route("/devices/bulk", methods=["PUT"])
+def update_devices_bulk():
+    """
+    Пакетное редактирование устройств
+    ---
+    tags:
+        - Devices
+    produces:
+        - application/json
+    parameters:
+        - in: body
+          name: JSON
+          required: True
+          example: [{
+              id: 1,
+              manufacturer: HP,
+              model: 620,
+              sn: CSD8762SDF,
+              release_date: "01.10.2010",
+              purchase_date: "03.12.2010",
+              client_id: 1
+          }]
+    responses:
+        200:
+            description: '{ "succeeded": 1, "failed": 0, "results": [{ "index": 0, "status": 200, "id": 1 }] }'
+        207:
+            description: Часть записей не обновлена, причина указана в "results"
+    """
+    try:
+        body, status = bulk_update(Devices, request.get_json())
+        return make_response(jsonify(body), status)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error updating devices"}), 500)
+
+
 @devices_blueprint.route("/devices", methods=["GET"])
+@conditional("devices")
 def get_devices():
     """
     Получение всех устройств
     ---
     tags:
         - Devices
+    parameters:
+        - in: query
+          name: limit
+          type: integer
+          example: 100
+          description: Размер страницы (не больше 1000)
+        - in: query
+          name: after
+          type: string
+          description: Курсор следующей страницы из поля "next" предыдущего ответа
+        - in: query
+          name: client_id
+          type: integer
+          example: 1
+          description: Клиент
+        - in: query
+          name: manufacturer
+          type: string
+          example: HP
+          description: Производитель
+        - in: query
+          name: order_by
+          type: string
+          example: -release_date
+          description: Поле сортировки, "-" для убывания
+        - in: query
+          name: fields
+          type: string
+          example: id,model,sn
+          description: Поля через запятую (по умолчанию все)
     responses:
         200:
-            description: Пример успешного ответа
+            description: '{ "items": [...], "next": "курсор или null" }'
     """
     try:
-        devices = Devices.query.all()
-        return make_response(jsonify([device.json() for device in devices]), 200)
+        query, keys, descending, serialize = devices_filters.select()
+        page = paginate(query, keys, serialize, descending)
+        return make_response(jsonify(page), 200)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error getting devices"}), 500)
 
 
+@devices_blueprint.route("/devices/search", methods=["GET"])
+@conditional("devices")
+def search_devices():
+    """
+    Поиск устройств по производителю, модели или серийному номеру (подстрока или похожее написание)
+    ---
+    tags:
+        - Devices
+    parameters:
+        - in: query
+          name: q
+          type: string
+          example: ProBook
+          required: True
+          description: Строка поиска, не короче 3 символов
+        - in: query
+          name: limit
+          type: integer
+          example: 20
+          description: Количество результатов (не больше 100)
+    responses:
+        200:
+            description: '{ "items": [...] }, лучшие совпадения первыми'
+    """
+    try:
+        limit = parse_limit(request.args.get("limit"), DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT)
+        names = devices_filters.field_names()
+        found = devices_search.search(request.args.get("q"), limit)
+        return make_response(jsonify({"items": [project(entity.json(), names) for entity in found]}), 200)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error searching devices"}), 500)
+
+
 @devices_blueprint.route("/devices/<int:id>", methods=["GET"])
+@tagged
 def get_device(id):
     """
     Получение конкретного устройства
@@ -83,15 +245,22 @@ def get_device(id):
           type: integer
           example: 1
           required: True
+        - in: query
+          name: fields
+          type: string
+          example: id,model,sn
+          description: Поля через запятую (по умолчанию все)
     responses:
         200:
             description: Пример успешного ответа
     """
     try:
-        device = Devices.query.filter_by(id=id).first()
+        device = cache.get(Devices, id)
         if device:
-            return make_response(jsonify({"device": device.json()}), 200)
+            return make_response(jsonify({"device": devices_filters.sparse(device)}), 200)
         return make_response(jsonify({"message": "device not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error getting device"}), 500)
@@ -126,18 +295,49 @@ def update_device(id):
             description: Пример успешного ответа
     """
     try:
-        device = Devices.query.filter_by(id=id).first()
-        if device:
-            data = request.get_json()
-            device.manufacturer = data["manufacturer"]
-            device.model = data["model"]
-            device.sn = data["sn"]
-            device.release_date = data["release_date"]
-            device.purchase_date = data["purchase_date"]
-            device.client_id = data["client_id"]
+        if update_row(Devices, id, item_values(Devices, request.get_json())):
+            db.session.commit()
+            cache.invalidate(Devices, id)
+            return make_response(jsonify({"message": "device updated"}), 200)
+        return make_response(jsonify({"message": "device not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error updating device"}), 500)
+
+
+@devices_blueprint.route("/devices/<int:id>", methods=["PATCH"])
+def patch_device(id):
+    """
+    Частичное редактирование конкретного устройства (меняются только переданные поля)
+    ---
+    tags:
+        - Devices
+    parameters:
+        - in: path
+          name: id
+          type: integer
+          example: 1
+          required: True
+        - in: body
+          name: JSON
+          required: True
+          example: {
+              purchase_date: 05.12.2010
+          }
+    responses:
+        200:
+            description: Пример успешного ответа
+    """
+    try:
+        if update_row(Devices, id, item_values(Devices, request.get_json(), partial=True)):
             db.session.commit()
+            cache.invalidate(Devices, id)
             return make_response(jsonify({"message": "device updated"}), 200)
         return make_response(jsonify({"message": "device not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error updating device"}), 500)
@@ -161,10 +361,9 @@ def delete_device(id):
             description: Пример успешного ответа
     """
     try:
-        device = Devices.query.filter_by(id=id).first()
-        if device:
-            db.session.delete(device)
+        if delete_row(Devices, id):
             db.session.commit()
+            cache.invalidate(Devices, id)
             return make_response(jsonify({"message": "device deleted"}), 200)
         return make_response(jsonify({"message": "device not found"}), 404)
     except Exception as e:
@@ -4,9 +4,23 @@ import sys
 parent_dir_name = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.append(parent_dir_name)
 from models import db, Employees
+from pagination import paginate, InvalidQuery
+from filtering import FilterSet, project
+from scheduling import free_employees, parse_window
+from bulk import bulk_create, bulk_update
+from writes import item_values, update_row, delete_row
+from cache import cache
+from etag import conditional, tagged
 
 employees_blueprint = Blueprint("employees_blueprint", __name__)
 
+employees_filters = FilterSet(
+    Employees,
+    filters=("name", "surname", "post"),
+    sortable=("id", "surname"),
+    default_order=("id",),
+)
+
 
 @employees_blueprint.route("/employees", methods=["POST"])
 def create_employee():
@@ -45,26 +59,176 @@ def create_employee():
         return make_response(jsonify({"message": "error creating employee"}), 500)
 
 
+@employees_blueprint.route("/employees/bulk", methods=["POST"])
+def create_employees_bulk():
+    """
+    Пакетное создание сотрудников
+    ---
+    tags:
+        - Employees
+    produces:
+        - application/json
+    parameters:
+        - in: body
+          name: JSON
+          required: True
+          example: [{
+              name: Иван,
+              surname: Иванов,
+              post: Мастер
+          }]
+    responses:
+        201:
+            description: '{ "succeeded": 1, "failed": 0, "results": [{ "index": 0, "status": 201, "id": 1 }] }'
+        207:
+            description: Часть записей не создана, причина указана в "results"
+    """
+    try:
+        body, status = bulk_create(Employees, request.get_json())
+        return make_response(jsonify(body), status)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error creating employees"}), 500)
+
+
+@employees_blueprint.route("/employees/bulk", methods=["PUT"])
+def update_employees_bulk():
+    """
+    Пакетное редактирование сотрудников
+    ---
+    tags:
+        - Employees
+    produces:
+        - application/json
+    parameters:
+        - in: body
+          name: JSON
+          required: True
+          example: [{
+              id: 1,
+              name: Иван,
+              surname: Иванов,
+              post: Мастер
+          }]
+    responses:
+        200:
+            description: '{ "succeeded": 1, "failed": 0, "results": [{ "index": 0, "status": 200, "id": 1 }] }'
+        207:
+            description: Часть записей не обновлена, причина указана в "results"
+    """
+    try:
+        body, status = bulk_update(Employees, request.get_json())
+        return make_response(jsonify(body), status)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error updating employees"}), 500)
+
+
 @employees_blueprint.route("/employees", methods=["GET"])
+@conditional("employees")
 def get_employees():
     """
     Получение всех сотрудников
     ---
     tags:
         - Employees
+    parameters:
+        - in: query
+          name: limit
+          type: integer
+          example: 100
+          description: Размер страницы (не больше 1000)
+        - in: query
+          name: after
+          type: string
+          description: Курсор следующей страницы из поля "next" предыдущего ответа
+        - in: query
+          name: post
+          type: string
+          example: Мастер
+          description: Должность
+        - in: query
+          name: order_by
+          type: string
+          example: -surname
+          description: Поле сортировки, "-" для убывания
+        - in: query
+          name: fields
+          type: string
+          example: id,surname,post
+          description: Поля через запятую (по умолчанию все)
     responses:
         200:
-            description: Пример успешного ответа
+            description: '{ "items": [...], "next": "курсор или null" }'
     """
     try:
-        employees = Employees.query.all()
-        return make_response(jsonify([employee.json() for employee in employees]), 200)
+        query, keys, descending, serialize = employees_filters.select()
+        page = paginate(query, keys, serialize, descending)
+        return make_response(jsonify(page), 200)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error getting employees"}), 500)
+
+
+@employees_blueprint.route("/employees/available", methods=["GET"])
+@conditional("employees", "schedule")
+def get_available_employees():
+    """
+    Получение сотрудников, свободных в заданный промежуток времени
+    ---
+    tags:
+        - Employees
+    parameters:
+        - in: query
+          name: start
+          type: string
+          example: 06.04.2023 09:00
+          required: True
+          description: Начало промежутка
+        - in: query
+          name: end
+          type: string
+          example: 06.04.2023 18:00
+          description: Конец промежутка (по умолчанию через час после начала)
+        - in: query
+          name: post
+          type: string
+          example: Мастер
+          description: Должность
+        - in: query
+          name: limit
+          type: integer
+          example: 100
+          description: Размер страницы (не больше 1000)
+        - in: query
+          name: after
+          type: string
+          description: Курсор следующей страницы из поля "next" предыдущего ответа
+    responses:
+        200:
+            description: '{ "items": [...], "next": "курсор или null" }'
+    """
+    try:
+        start, end = parse_window(request.args.get("start"), request.args.get("end"))
+        names = employees_filters.field_names()
+        query = free_employees(start, end, request.args.get("post"))
+        page = paginate(query, [Employees.id], lambda employee: project(employee.json(), names))
+        return make_response(jsonify(page), 200)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error getting employees"}), 500)
 
 
 @employees_blueprint.route("/employees/<int:id>", methods=["GET"])
+@tagged
 def get_employee(id):
     """
     Получение конкретного сотрудника
@@ -77,15 +241,22 @@ def get_employee(id):
           type: integer
           example: 1
           required: True
+        - in: query
+          name: fields
+          type: string
+          example: id,surname,post
+          description: Поля через запятую (по умолчанию все)
     responses:
         200:
             description: Пример успешного ответа
     """
     try:
-        employee = Employees.query.filter_by(id=id).first()
+        employee = cache.get(Employees, id)
         if employee:
-            return make_response(jsonify({"employee": employee.json()}), 200)
+            return make_response(jsonify({"employee": employees_filters.sparse(employee)}), 200)
         return make_response(jsonify({"message": "employee not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error getting employee"}), 500)
@@ -119,15 +290,51 @@ def update_employee(id):
             description: Пример успешного ответа
     """
     try:
-        employee = Employees.query.filter_by(id=id).first()
-        if employee:
-            data = request.get_json()
-            employee.name = data["name"]
-            employee.surname = data["surname"]
-            employee.post = data["post"]
+        if update_row(Employees, id, item_values(Employees, request.get_json())):
             db.session.commit()
+            cache.invalidate(Employees, id)
             return make_response(jsonify({"message": "employee updated"}), 200)
         return make_response(jsonify({"message": "employee not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error updating employee"}), 500)
+
+
+@employees_blueprint.route("/employees/<int:id>", methods=["PATCH"])
+def patch_employee(id):
+    """
+    Частичное редактирование конкретного сотрудника (меняются только переданные поля)
+    ---
+    tags:
+        - Employees
+    produces:
+        - application/json
+    parameters:
+        - in: path
+          name: id
+          type: integer
+          example: 1
+          required: True
+        - in: body
+          name: JSON
+          required: True
+          example: {
+              post: Старший мастер
+          }
+    responses:
+        200:
+            description: Пример успешного ответа
+    """
+    try:
+        if update_row(Employees, id, item_values(Employees, request.get_json(), partial=True)):
+            db.session.commit()
+            cache.invalidate(Employees, id)
+            return make_response(jsonify({"message": "employee updated"}), 200)
+        return make_response(jsonify({"message": "employee not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error updating employee"}), 500)
@@ -151,10 +358,9 @@ def delete_employee(id):
             description: Пример успешного ответа
     """
     try:
-        employee = Employees.query.filter_by(id=id).first()
-        if employee:
-            db.session.delete(employee)
+        if delete_row(Employees, id):
             db.session.commit()
+            cache.invalidate(Employees, id)
             return make_response(jsonify({"message": "employee deleted"}), 200)
         return make_response(jsonify({"message": "employee not found"}), 404)
     except Exception as e:
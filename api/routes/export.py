@@ -0,0 +1,93 @@
+from flask import Blueprint, Response, current_app, jsonify, request, make_response, stream_with_context
+import os
+import sys
+parent_dir_name = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.append(parent_dir_name)
+from models import Clients, Devices, Employees, Orders, Payments, Schedule
+from pagination import InvalidQuery
+from routes.clients import clients_filters
+from routes.devices import devices_filters
+from routes.employees import employees_filters
+from routes.orders import orders_filters
+from routes.payments import payments_filters
+from routes.schedules import schedules_filters
+from export import export_rows, encode, gzipped, FORMATS
+
+export_blueprint = Blueprint("export_blueprint", __name__)
+
+ENTITIES = {
+    "clients": (Clients, clients_filters),
+    "devices": (Devices, devices_filters),
+    "orders": (Orders, orders_filters),
+    "payments": (Payments, payments_filters),
+    "employees": (Employees, employees_filters),
+    "schedules": (Schedule, schedules_filters),
+}
+
+
+@export_blueprint.route("/export/<entity>", methods=["GET"])
+def export(entity):
+    """
+    Выгрузка всех записей в CSV или NDJSON потоком (сжимается gzip при Accept-Encoding: gzip)
+    ---
+    tags:
+        - Export
+    parameters:
+        - in: path
+          name: entity
+          type: string
+          enum: [clients, devices, orders, payments, employees, schedules]
+          example: payments
+          required: True
+        - in: query
+          name: format
+          type: string
+          enum: [csv, ndjson]
+          example: csv
+        - in: query
+          name: payment_date__gte
+          type: string
+          example: 01.04.2023
+          description: Те же фильтры и order_by, что и у списка записей
+        - in: query
+          name: payment_date__lt
+          type: string
+          example: 01.05.2023
+        - in: query
+          name: fields
+          type: string
+          example: id,amount,payment_date
+          description: Выгружаемые поля через запятую (по умолчанию все)
+    responses:
+        200:
+            description: Файл с записями
+    """
+    try:
+        if entity not in ENTITIES:
+            return make_response(jsonify({"message": "unknown entity"}), 404)
+        model, filters = ENTITIES[entity]
+        args = request.args.copy()
+        format = args.pop("format", "csv")
+        if format not in FORMATS:
+            raise InvalidQuery(f"invalid format: {format}")
+        columns = filters.field_names(args) or [column.key for column in model.__table__.columns]
+        rows = export_rows(model, filters, args, columns)
+        # the first row is fetched here so that invalid filters still get a 400
+        first = next(rows, None)
+        chunks = encode(_chain(first, rows), format, columns)
+        headers = {"Content-Disposition": f"attachment; filename={entity}.{format}", "Vary": "Accept-Encoding"}
+        if "gzip" in request.accept_encodings:
+            chunks = gzipped(chunks)
+            headers["Content-Encoding"] = "gzip"
+        return Response(stream_with_context(chunks), 200, headers, content_type=FORMATS[format])
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": f"error exporting {entity}"}), 500)
+
+
+def _chain(first, rows):
+    if first is not None:
+        yield first
+        yield from rows
@@ -0,0 +1,74 @@
+from flask import Blueprint, current_app, jsonify, request, make_response
+from sqlalchemy.exc import IntegrityError
+import io
+import os
+import sys
+parent_dir_name = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.append(parent_dir_name)
+from pagination import InvalidQuery
+from importer import import_rows, read_rows, MODELS, FORMATS
+
+import_blueprint = Blueprint("import_blueprint", __name__)
+
+
+@import_blueprint.route("/import/<entity>", methods=["POST"])
+def import_entity(entity):
+    """
+    Загрузка записей из CSV или NDJSON (тело запроса - содержимое файла)
+    ---
+    tags:
+        - Import
+    consumes:
+        - text/csv
+        - application/x-ndjson
+    parameters:
+        - in: path
+          name: entity
+          type: string
+          enum: [clients, devices, orders, payments, employees, schedules]
+          example: clients
+          required: True
+        - in: query
+          name: format
+          type: string
+          enum: [csv, ndjson]
+          description: По умолчанию определяется по Content-Type, иначе csv
+        - in: query
+          name: on_conflict
+          type: string
+          enum: [error, skip, update]
+          example: skip
+          description: Что делать с записями, уникальные поля которых уже заняты
+        - in: query
+          name: key
+          type: string
+          example: phone
+          description: Уникальное поле, по которому обновляются записи при on_conflict=update
+    responses:
+        200:
+            description: '{ "received": 2, "inserted": 2, "updated": 0, "skipped": 0, "failed": 0, "errors": [] }'
+        207:
+            description: '{ ..., "failed": 1, "errors": [{ "line": 3, "message": "email already exists" }] }'
+    """
+    try:
+        if entity not in MODELS:
+            return make_response(jsonify({"message": "unknown entity"}), 404)
+        format = request.args.get("format") or ("ndjson" if request.mimetype == "application/x-ndjson" else "csv")
+        if format not in FORMATS:
+            raise InvalidQuery(f"invalid format: {format}")
+        body = io.TextIOWrapper(request.stream, encoding="utf-8-sig", newline="")
+        report = import_rows(
+            MODELS[entity],
+            read_rows(body, format),
+            request.args.get("on_conflict", "error"),
+            request.args.get("key"),
+        )
+        return make_response(jsonify(report), 200 if report["failed"] == 0 else 207)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except IntegrityError as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "import rejected by a database constraint, nothing was saved"}), 409)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": f"error importing {entity}"}), 500)
@@ -1,12 +1,75 @@
 from flask import Blueprint, current_app, jsonify, request, make_response
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, selectinload
 import os
 import sys
 parent_dir_name = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.append(parent_dir_name)
-from models import db, Orders
+from models import db, Orders, Devices, Clients, Payments
+from pagination import paginate, keyset, page_size, encode_cursor, InvalidQuery
+from filtering import FilterSet, parse_datetime, project
+from bulk import bulk_create, bulk_update
+from writes import item_values, update_row, delete_row
+from cache import cache
+from etag import conditional, tagged
+from reports import record_changes
+from events import emit
 
 orders_blueprint = Blueprint("orders_blueprint", __name__)
 
+orders_filters = FilterSet(
+    Orders,
+    filters=("state", "device_id", "order_date", "cost"),
+    sortable=("id", "order_date", "cost"),
+    default_order=("order_date", "id"),
+)
+FULL_FIELDS = ("device", "payments", "schedules")
+# clients whose orders are read per statement while a debtors page fills up
+DEBTORS_SCAN = 1000
+
+
+def full_orders_query():
+    # device and client are joined, payments and schedules take one SELECT ... IN each
+    return Orders.query.options(
+        joinedload(Orders.device).joinedload(Devices.client),
+        selectinload(Orders.payments),
+        selectinload(Orders.schedules),
+    )
+
+
+def order_balances(*conditions):
+    """
+    Cost and paid amount of the orders matching ``conditions`` (on orders
+    or devices). paid is one GROUP BY payments.order_id over the payments
+    of those orders only, joined back to them.
+    """
+    order_ids = select(Orders.id).join(Devices, Devices.id == Orders.device_id).where(*conditions)
+    paid = (
+        select(Payments.order_id, func.sum(Payments.amount).label("paid"))
+        .where(Payments.order_id.in_(order_ids))
+        .group_by(Payments.order_id)
+        .subquery("paid")
+    )
+    return (
+        select(Orders.id.label("order_id"), Devices.client_id, Orders.cost, func.coalesce(paid.c.paid, 0.0).label("paid"))
+        .join(Devices, Devices.id == Orders.device_id)
+        .outerjoin(paid, paid.c.order_id == Orders.id)
+        .where(*conditions)
+    )
+
+
+def parse_min_balance(value):
+    if value is None:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        raise InvalidQuery(f"invalid min_balance: {value}")
+
+
+def balance_json(order_id, cost, paid):
+    return {"order_id": order_id, "cost": cost, "paid": round(paid, 2), "balance": round(cost - paid, 2)}
+
 
 @orders_blueprint.route("/orders", methods=["POST"])
 def create_order():
@@ -35,44 +98,261 @@ def create_order():
     try:
         data = request.get_json()
         new_order = Orders(
-            order_date=data["order_date"],
+            order_date=parse_datetime(data["order_date"]),
             device_id=data["device_id"],
             description=data["description"],
             cost=data["cost"],
             state=data["state"],
         )
         db.session.add(new_order)
+        record_changes(Orders, added=[new_order])
+        db.session.flush()
+        emit(Orders, "created", [new_order])
         db.session.commit()
         return make_response(jsonify({"message": "order created"}), 201)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error creating order"}), 500)
 
 
+@orders_blueprint.route("/orders/bulk", methods=["POST"])
+def create_orders_bulk():
+    """
+    Пакетное создание заявок
+    ---
+    tags:
+        - Orders
+    produces:
+        - application/json
+    parameters:
+        - in: body
+          name: JSON
+          required: True
+          example: [{
+              order_date: 01.04.2023,
+              device_id: 1,
+              description: "Замена АКБ",
+              cost: 70.99,
+              state: pending
+          }]
+    responses:
+        201:
+            description: '{ "succeeded": 1, "failed": 0, "results": [{ "index": 0, "status": 201, "id": 1 }] }'
+        207:
+            description: Часть записей не создана, причина указана в "results"
+    """
+    try:
+        body, status = bulk_create(Orders, request.get_json())
+        return make_response(jsonify(body), status)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error creating orders"}), 500)
+
+
+@orders_blueprint.route("/orders/bulk", methods=["PUT"])
+def update_orders_bulk():
+    """
+    Пакетное редактирование заявок
+    ---
+    tags:
+        - Orders
+    produces:
+        - application/json
+    parameters:
+        - in: body
+          name: JSON
+          required: True
+          example: [{
+              id: 1,
+              order_date: 01.04.2023,
+              device_id: 1,
+              description: "Замена АКБ",
+              cost: 70.99,
+              state: pending
+          }]
+    responses:
+        200:
+            description: '{ "succeeded": 1, "failed": 0, "results": [{ "index": 0, "status": 200, "id": 1 }] }'
+        207:
+            description: Часть записей не обновлена, причина указана в "results"
+    """
+    try:
+        body, status = bulk_update(Orders, request.get_json())
+        return make_response(jsonify(body), status)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error updating orders"}), 500)
+
+
 @orders_blueprint.route("/orders", methods=["GET"])
+@conditional("orders")
 def get_orders():
     """
     Получение всех заявок
     ---
     tags:
         - Orders
+    parameters:
+        - in: query
+          name: limit
+          type: integer
+          example: 100
+          description: Размер страницы (не больше 1000)
+        - in: query
+          name: after
+          type: string
+          description: Курсор следующей страницы из поля "next" предыдущего ответа
+        - in: query
+          name: state
+          type: string
+          example: pending
+          description: Статус заявки; несколько значений через state__in=pending,in_progress
+        - in: query
+          name: order_date__gte
+          type: string
+          example: 01.04.2023
+          description: Заявки начиная с даты (также __gt, __lt, __lte)
+        - in: query
+          name: cost__lte
+          type: number
+          example: 100
+          description: Стоимость не больше (также __gt, __gte, __lt)
+        - in: query
+          name: device_id
+          type: integer
+          example: 1
+          description: Устройство
+        - in: query
+          name: order_by
+          type: string
+          example: -order_date
+          description: Поле сортировки, "-" для убывания
+        - in: query
+          name: fields
+          type: string
+          example: id,state,order_date
+          description: Поля через запятую (по умолчанию все)
     responses:
         200:
-            description: Пример успешного ответа
+            description: '{ "items": [...], "next": "курсор или null" }'
     """
     try:
-        orders = Orders.query.all()
-        return make_response(jsonify([order.json() for order in orders]), 200)
+        query, keys, descending, serialize = orders_filters.select()
+        page = paginate(query, keys, serialize, descending)
+        return make_response(jsonify(page), 200)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error getting orders"}), 500)
 
 
 @orders_blueprint.route("/orders/<int:id>", methods=["GET"])
+@tagged
 def get_order(id):
     """
     Получение конкретной заявки
     ---
+    tags:
+        - Orders
+    parameters:
+        - in: path
+          name: id
+          type: integer
+          example: 1
+          required: True
+        - in: query
+          name: fields
+          type: string
+          example: id,state,order_date
+          description: Поля через запятую (по умолчанию все)
+    responses:
+        200:
+            description: Пример успешного ответа
+    """
+    try:
+        order = cache.get(Orders, id)
+        if order:
+            return make_response(jsonify({"order": orders_filters.sparse(order)}), 200)
+        return make_response(jsonify({"message": "order not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error getting order"}), 500)
+
+
+@orders_blueprint.route("/orders/full", methods=["GET"])
+@conditional("orders", "devices", "clients", "payments", "schedule")
+def get_orders_full():
+    """
+    Получение заявок вместе с устройством, клиентом, платежами и расписанием
+    ---
+    tags:
+        - Orders
+    parameters:
+        - in: query
+          name: limit
+          type: integer
+          example: 100
+          description: Размер страницы (не больше 1000)
+        - in: query
+          name: after
+          type: string
+          description: Курсор следующей страницы из поля "next" предыдущего ответа
+        - in: query
+          name: state
+          type: string
+          example: pending
+          description: Статус заявки; несколько значений через state__in=pending,in_progress
+        - in: query
+          name: order_date__gte
+          type: string
+          example: 01.04.2023
+          description: Заявки начиная с даты (также __gt, __lt, __lte)
+        - in: query
+          name: cost__lte
+          type: number
+          example: 100
+          description: Стоимость не больше (также __gt, __gte, __lt)
+        - in: query
+          name: device_id
+          type: integer
+          example: 1
+          description: Устройство
+        - in: query
+          name: order_by
+          type: string
+          example: -order_date
+          description: Поле сортировки, "-" для убывания
+    responses:
+        200:
+            description: '{ "items": [...], "next": "курсор или null" }'
+    """
+    try:
+        names = orders_filters.field_names(extra=FULL_FIELDS)
+        query, keys, descending = orders_filters.apply(full_orders_query())
+        page = paginate(query, keys, lambda order: project(order.json_full(), names), descending)
+        return make_response(jsonify(page), 200)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error getting orders"}), 500)
+
+
+@orders_blueprint.route("/orders/<int:id>/full", methods=["GET"])
+@conditional("orders", "devices", "clients", "payments", "schedule")
+def get_order_full(id):
+    """
+    Получение конкретной заявки вместе с устройством, клиентом, платежами и расписанием
+    ---
     tags:
         - Orders
     parameters:
@@ -86,15 +366,108 @@ def get_order(id):
             description: Пример успешного ответа
     """
     try:
-        order = Orders.query.filter_by(id=id).first()
+        names = orders_filters.field_names(extra=FULL_FIELDS)
+        order = full_orders_query().filter_by(id=id).first()
         if order:
-            return make_response(jsonify({"order": order.json()}), 200)
+            return make_response(jsonify({"order": project(order.json_full(), names)}), 200)
         return make_response(jsonify({"message": "order not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error getting order"}), 500)
 
 
+@orders_blueprint.route("/orders/<int:id>/balance", methods=["GET"])
+@conditional("orders", "payments")
+def get_order_balance(id):
+    """
+    Получение задолженности по конкретной заявке
+    ---
+    tags:
+        - Orders
+    parameters:
+        - in: path
+          name: id
+          type: integer
+          example: 1
+          required: True
+    responses:
+        200:
+            description: '{ "balance": { "order_id": 1, "cost": 70.99, "paid": 50.0, "balance": 20.99 } }'
+    """
+    try:
+        row = db.session.execute(order_balances(Orders.id == id)).first()
+        if row:
+            return make_response(jsonify({"balance": balance_json(row.order_id, row.cost, row.paid)}), 200)
+        return make_response(jsonify({"message": "order not found"}), 404)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error getting order balance"}), 500)
+
+
+@orders_blueprint.route("/orders/debtors", methods=["GET"])
+@conditional("orders", "payments", "devices", "clients")
+def get_debtors():
+    """
+    Получение клиентов с неоплаченными заявками
+    ---
+    tags:
+        - Orders
+    parameters:
+        - in: query
+          name: min_balance
+          type: number
+          example: 0
+          description: Учитываются заявки с задолженностью больше этой суммы
+        - in: query
+          name: limit
+          type: integer
+          example: 100
+          description: Количество клиентов на странице (не больше 1000)
+        - in: query
+          name: after
+          type: string
+          description: Курсор следующей страницы из поля "next" предыдущего ответа
+    responses:
+        200:
+            description: '{ "items": [{ "client": {...}, "orders": [...], "balance": 20.99 }], "next": "курсор или null" }'
+    """
+    try:
+        min_balance = parse_min_balance(request.args.get("min_balance"))
+        limit = page_size()
+        # clients are walked in id order, in windows that grow up to DEBTORS_SCAN, until the page is full
+        window_query = keyset(select(Clients.id), [Clients.id], request.args.get("after"))
+        window_size = limit + 1
+        orders, balances = {}, {}
+        while len(orders) <= limit:
+            window = db.session.execute(window_query.limit(window_size)).scalars().all()
+            if not window:
+                break
+            query = order_balances(Devices.client_id.between(window[0], window[-1]))
+            outstanding = Orders.cost - query.selected_columns.paid
+            for row in db.session.execute(query.where(outstanding > min_balance).order_by(Devices.client_id, Orders.id)):
+                orders.setdefault(row.client_id, []).append(balance_json(row.order_id, row.cost, row.paid))
+                balances[row.client_id] = balances.get(row.client_id, 0.0) + row.cost - row.paid
+            window_query = select(Clients.id).where(Clients.id > window[-1]).order_by(Clients.id)
+            window_size = min(window_size * 2, max(DEBTORS_SCAN, limit + 1))
+        client_ids = sorted(orders)[:limit]
+        clients = {client.id: client for client in Clients.query.filter(Clients.id.in_(client_ids))}
+        body = {
+            "items": [
+                {"client": clients[id].json(), "orders": orders[id], "balance": round(balances[id], 2)}
+                for id in client_ids
+            ],
+            "next": encode_cursor(client_ids[-1:]) if len(orders) > limit else None,
+        }
+        return make_response(jsonify(body), 200)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error getting debtors"}), 500)
+
+
 @orders_blueprint.route("/orders/<int:id>", methods=["PUT"])
 def update_order(id):
     """
@@ -123,17 +496,49 @@ def update_order(id):
             description: Пример успешного ответа
     """
     try:
-        order = Orders.query.filter_by(id=id).first()
-        if order:
-            data = request.get_json()
-            order.order_date = data["order_date"]
-            order.device_id = data["device_id"]
-            order.description = data["description"]
-            order.cost = data["cost"]
-            order.state = data["state"]
+        if update_row(Orders, id, item_values(Orders, request.get_json())):
             db.session.commit()
+            cache.invalidate(Orders, id)
             return make_response(jsonify({"message": "order updated"}), 200)
         return make_response(jsonify({"message": "order not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error updating order"}), 500)
+
+
+@orders_blueprint.route("/orders/<int:id>", methods=["PATCH"])
+def patch_order(id):
+    """
+    Частичное редактирование конкретной заявки (меняются только переданные поля)
+    ---
+    tags:
+        - Orders
+    parameters:
+        - in: path
+          name: id
+          type: integer
+          example: 1
+          required: True
+        - in: body
+          name: JSON
+          required: True
+          example: {
+              state: completed
+          }
+    responses:
+        200:
+            description: Пример успешного ответа
+    """
+    try:
+        if update_row(Orders, id, item_values(Orders, request.get_json(), partial=True)):
+            db.session.commit()
+            cache.invalidate(Orders, id)
+            return make_response(jsonify({"message": "order updated"}), 200)
+        return make_response(jsonify({"message": "order not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error updating order"}), 500)
@@ -157,10 +562,9 @@ def delete_order(id):
             description: Пример успешного ответа
     """
     try:
-        order = Orders.query.filter_by(id=id).first()
-        if order:
-            db.session.delete(order)
+        if delete_row(Orders, id):
             db.session.commit()
+            cache.invalidate(Orders, id)
             return make_response(jsonify({"message": "order deleted"}), 200)
         return make_response(jsonify({"message": "order not found"}), 404)
     except Exception as e:
@@ -4,9 +4,24 @@ import sys
 parent_dir_name = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.append(parent_dir_name)
 from models import db, Payments
+from pagination import paginate, InvalidQuery
+from filtering import FilterSet, parse_datetime
+from bulk import bulk_create, bulk_update
+from writes import item_values, update_row, delete_row
+from cache import cache
+from etag import conditional, tagged
+from reports import record_changes
+from events import emit
 
 payments_blueprint = Blueprint("payments_blueprint", __name__)
 
+payments_filters = FilterSet(
+    Payments,
+    filters=("order_id", "payment_date", "amount"),
+    sortable=("id", "payment_date", "amount"),
+    default_order=("payment_date", "id"),
+)
+
 
 @payments_blueprint.route("/payments", methods=["POST"])
 def create_payment():
@@ -33,38 +48,152 @@ def create_payment():
     try:
         data = request.get_json()
         new_payment = Payments(
-            payment_date=data["payment_date"],
+            payment_date=parse_datetime(data["payment_date"]),
             order_id=data["order_id"],
             amount=data["amount"],
         )
         db.session.add(new_payment)
+        record_changes(Payments, added=[new_payment])
+        db.session.flush()
+        emit(Payments, "created", [new_payment])
         db.session.commit()
         return make_response(jsonify({"message": "payment created"}), 201)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error creating payment"}), 500)
 
 
+@payments_blueprint.route("/payments/bulk", methods=["POST"])
+def create_payments_bulk():
+    """
+    Пакетное создание платежей
+    ---
+    tags:
+        - Payments
+    produces:
+        - application/json
+    parameters:
+        - in: body
+          name: JSON
+          required: True
+          example: [{
+              payment_date: 02.04.2023,
+              order_id: 1,
+              amount: 99.99
+          }]
+    responses:
+        201:
+            description: '{ "succeeded": 1, "failed": 0, "results": [{ "index": 0, "status": 201, "id": 1 }] }'
+        207:
+            description: Часть записей не создана, причина указана в "results"
+    """
+    try:
+        body, status = bulk_create(Payments, request.get_json())
+        return make_response(jsonify(body), status)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error creating payments"}), 500)
+
+
+@payments_blueprint.route("/payments/bulk", methods=["PUT"])
+def update_payments_bulk():
+    """
+    Пакетное редактирование платежей
+    ---
+    tags:
+        - Payments
+    produces:
+        - application/json
+    parameters:
+        - in: body
+          name: JSON
+          required: True
+          example: [{
+              id: 1,
+              payment_date: 02.04.2023,
+              order_id: 1,
+              amount: 99.99
+          }]
+    responses:
+        200:
+            description: '{ "succeeded": 1, "failed": 0, "results": [{ "index": 0, "status": 200, "id": 1 }] }'
+        207:
+            description: Часть записей не обновлена, причина указана в "results"
+    """
+    try:
+        body, status = bulk_update(Payments, request.get_json())
+        return make_response(jsonify(body), status)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error updating payments"}), 500)
+
+
 @payments_blueprint.route("/payments", methods=["GET"])
+@conditional("payments")
 def get_payments():
     """
     Получение всех платежей
     ---
     tags:
         - Payments
+    parameters:
+        - in: query
+          name: limit
+          type: integer
+          example: 100
+          description: Размер страницы (не больше 1000)
+        - in: query
+          name: after
+          type: string
+          description: Курсор следующей страницы из поля "next" предыдущего ответа
+        - in: query
+          name: order_id
+          type: integer
+          example: 1
+          description: Заявка
+        - in: query
+          name: payment_date__gte
+          type: string
+          example: 01.04.2023
+          description: Платежи начиная с даты (также __gt, __lt, __lte)
+        - in: query
+          name: amount__gte
+          type: number
+          example: 50
+          description: Сумма не меньше (также __gt, __lt, __lte)
+        - in: query
+          name: order_by
+          type: string
+          example: -payment_date
+          description: Поле сортировки, "-" для убывания
+        - in: query
+          name: fields
+          type: string
+          example: id,amount,payment_date
+          description: Поля через запятую (по умолчанию все)
     responses:
         200:
-            description: Пример успешного ответа
+            description: '{ "items": [...], "next": "курсор или null" }'
     """
     try:
-        payments = Payments.query.all()
-        return make_response(jsonify([payment.json() for payment in payments]), 200)
+        query, keys, descending, serialize = payments_filters.select()
+        page = paginate(query, keys, serialize, descending)
+        return make_response(jsonify(page), 200)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error getting payments"}), 500)
 
 
 @payments_blueprint.route("/payments/<int:id>", methods=["GET"])
+@tagged
 def get_payment(id):
     """
     Получение конкретного платежа
@@ -77,15 +206,22 @@ def get_payment(id):
           type: integer
           example: 1
           required: True
+        - in: query
+          name: fields
+          type: string
+          example: id,amount,payment_date
+          description: Поля через запятую (по умолчанию все)
     responses:
         200:
             description: Пример успешного ответа
     """
     try:
-        payment = Payments.query.filter_by(id=id).first()
+        payment = cache.get(Payments, id)
         if payment:
-            return make_response(jsonify({"payment": payment.json()}), 200)
+            return make_response(jsonify({"payment": payments_filters.sparse(payment)}), 200)
         return make_response(jsonify({"message": "payment not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error getting payment"}), 500)
@@ -117,15 +253,49 @@ def update_payment(id):
             description: Пример успешного ответа
     """
     try:
-        payment = Payments.query.filter_by(id=id).first()
-        if payment:
-            data = request.get_json()
-            payment.payment_date = data["payment_date"]
-            payment.order_id = data["order_id"]
-            payment.amount = data["amount"]
+        if update_row(Payments, id, item_values(Payments, request.get_json())):
             db.session.commit()
+            cache.invalidate(Payments, id)
             return make_response(jsonify({"message": "payment updated"}), 200)
         return make_response(jsonify({"message": "payment not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error updating payment"}), 500)
+
+
+@payments_blueprint.route("/payments/<int:id>", methods=["PATCH"])
+def patch_payment(id):
+    """
+    Частичное редактирование конкретного платежа (меняются только переданные поля)
+    ---
+    tags:
+        - Payments
+    parameters:
+        - in: path
+          name: id
+          type: integer
+          example: 1
+          required: True
+        - in: body
+          name: JSON
+          required: True
+          example: {
+              amount: 99.99
+          }
+    responses:
+        200:
+            description: Пример успешного ответа
+    """
+    try:
+        if update_row(Payments, id, item_values(Payments, request.get_json(), partial=True)):
+            db.session.commit()
+            cache.invalidate(Payments, id)
+            return make_response(jsonify({"message": "payment updated"}), 200)
+        return make_response(jsonify({"message": "payment not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error updating payment"}), 500)
@@ -149,10 +319,9 @@ def delete_payment(id):
             description: Пример успешного ответа
     """
     try:
-        payment = Payments.query.filter_by(id=id).first()
-        if payment:
-            db.session.delete(payment)
+        if delete_row(Payments, id):
             db.session.commit()
+            cache.invalidate(Payments, id)
             return make_response(jsonify({"message": "payment deleted"}), 200)
         return make_response(jsonify({"message": "payment not found"}), 404)
     except Exception as e:
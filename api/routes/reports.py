@@ -0,0 +1,126 @@
+from flask import Blueprint, current_app, jsonify, request, make_response
+import os
+import sys
+parent_dir_name = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.append(parent_dir_name)
+from pagination import InvalidQuery
+from etag import conditional
+from reports import revenue, orders_by_state, billing, parse_day
+
+reports_blueprint = Blueprint("reports_blueprint", __name__)
+
+PERIODS = ("day", "week", "month")
+
+
+def report_range():
+    return parse_day(request.args.get("from")), parse_day(request.args.get("to"))
+
+
+def report_period():
+    period = request.args.get("period", "day")
+    if period not in PERIODS:
+        raise InvalidQuery(f"invalid period: {period}")
+    return period
+
+
+@reports_blueprint.route("/reports/revenue", methods=["GET"])
+@conditional("daily_revenue")
+def get_revenue_report():
+    """
+    Выручка по дням, неделям или месяцам
+    ---
+    tags:
+        - Reports
+    parameters:
+        - in: query
+          name: period
+          type: string
+          enum: [day, week, month]
+          example: month
+        - in: query
+          name: from
+          type: string
+          example: 01.01.2023
+        - in: query
+          name: to
+          type: string
+          example: 31.12.2023
+    responses:
+        200:
+            description: '{ "items": [{ "period": "2023-04-01", "payments": 120, "amount": 8450.5 }] }'
+    """
+    try:
+        start, end = report_range()
+        return make_response(jsonify({"items": revenue(report_period(), start, end)}), 200)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error getting revenue report"}), 500)
+
+
+@reports_blueprint.route("/reports/orders/by-state", methods=["GET"])
+@conditional("daily_orders")
+def get_orders_by_state_report():
+    """
+    Количество, сумма и средняя стоимость заявок по статусам
+    ---
+    tags:
+        - Reports
+    parameters:
+        - in: query
+          name: from
+          type: string
+          example: 01.01.2023
+        - in: query
+          name: to
+          type: string
+          example: 31.12.2023
+    responses:
+        200:
+            description: '{ "items": [{ "state": "завершен", "orders": 310, "cost_total": 30120.4, "cost_average": 97.16 }] }'
+    """
+    try:
+        start, end = report_range()
+        return make_response(jsonify({"items": orders_by_state(start, end)}), 200)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error getting orders report"}), 500)
+
+
+@reports_blueprint.route("/reports/billing", methods=["GET"])
+@conditional("daily_orders", "daily_revenue")
+def get_billing_report():
+    """
+    Выставлено и оплачено по дням, неделям или месяцам
+    ---
+    tags:
+        - Reports
+    parameters:
+        - in: query
+          name: period
+          type: string
+          enum: [day, week, month]
+          example: month
+        - in: query
+          name: from
+          type: string
+          example: 01.01.2023
+        - in: query
+          name: to
+          type: string
+          example: 31.12.2023
+    responses:
+        200:
+            description: '{ "items": [{ "period": "2023-04-01", "billed": 9100.0, "paid": 8450.5, "outstanding": 649.5 }] }'
+    """
+    try:
+        start, end = report_range()
+        return make_response(jsonify({"items": billing(report_period(), start, end)}), 200)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error getting billing report"}), 500)
@@ -1,12 +1,29 @@
 from flask import Blueprint, current_app, jsonify, request, make_response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 import os
 import sys
 parent_dir_name = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.append(parent_dir_name)
 from models import db, Schedule
+from pagination import paginate, InvalidQuery
+from filtering import FilterSet
+from scheduling import constraint_error, has_conflict, parse_window
+from bulk import bulk_create, bulk_update
+from writes import item_values, update_row, delete_row
+from cache import cache
+from etag import conditional, tagged
+from events import emit
 
 schedules_blueprint = Blueprint("schedules_blueprint", __name__)
 
+schedules_filters = FilterSet(
+    Schedule,
+    filters=("employee_id", "order_id", "date", "end_date"),
+    sortable=("id", "date"),
+    default_order=("date", "id"),
+)
+
 
 @schedules_blueprint.route("/schedules", methods=["POST"])
 def create_schedule():
@@ -22,49 +39,176 @@ def create_schedule():
           name: JSON
           required: True
           example: {
-              date: 01.04.2023,
+              date: 01.04.2023 10:00,
+              end_date: 01.04.2023 12:00,
               employee_id: 1,
               order_id: 1
           }
     responses:
         201:
             description: '{ "message": "schedule created" }'
+        404:
+            description: '{ "message": "employee not found" }'
+        409:
+            description: '{ "message": "employee is busy at this time" }'
     """
     try:
         data = request.get_json()
+        date, end_date = parse_window(data["date"], data.get("end_date"))
+        if has_conflict(data["employee_id"], date, end_date):
+            return make_response(jsonify({"message": "employee is busy at this time"}), 409)
         new_schedule = Schedule(
-            date=data["date"],
+            date=date,
+            end_date=end_date,
             employee_id=data["employee_id"],
             order_id=data["order_id"],
         )
         db.session.add(new_schedule)
+        db.session.flush()
+        emit(Schedule, "created", [new_schedule])
         db.session.commit()
         return make_response(jsonify({"message": "schedule created"}), 201)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except IntegrityError as e:
+        current_app.logger.error(e)
+        db.session.rollback()
+        message, status = constraint_error(e)
+        return make_response(jsonify({"message": message}), status)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error creating schedule"}), 500)
 
 
+@schedules_blueprint.route("/schedules/bulk", methods=["POST"])
+def create_schedules_bulk():
+    """
+    Пакетное создание задач в расписании
+    ---
+    tags:
+        - Schedule
+    produces:
+        - application/json
+    parameters:
+        - in: body
+          name: JSON
+          required: True
+          example: [{
+              date: 01.04.2023,
+              employee_id: 1,
+              order_id: 1
+          }]
+    responses:
+        201:
+            description: '{ "succeeded": 1, "failed": 0, "results": [{ "index": 0, "status": 201, "id": 1 }] }'
+        207:
+            description: Часть записей не создана, причина указана в "results"
+    """
+    try:
+        body, status = bulk_create(Schedule, request.get_json())
+        return make_response(jsonify(body), status)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error creating schedules"}), 500)
+
+
+@schedules_blueprint.route("/schedules/bulk", methods=["PUT"])
+def update_schedules_bulk():
+    """
+    Пакетное редактирование задач в расписании
+    ---
+    tags:
+        - Schedule
+    produces:
+        - application/json
+    parameters:
+        - in: body
+          name: JSON
+          required: True
+          example: [{
+              id: 1,
+              date: 01.04.2023,
+              employee_id: 1,
+              order_id: 1
+          }]
+    responses:
+        200:
+            description: '{ "succeeded": 1, "failed": 0, "results": [{ "index": 0, "status": 200, "id": 1 }] }'
+        207:
+            description: Часть записей не обновлена, причина указана в "results"
+    """
+    try:
+        body, status = bulk_update(Schedule, request.get_json())
+        return make_response(jsonify(body), status)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error updating schedules"}), 500)
+
+
 @schedules_blueprint.route("/schedules", methods=["GET"])
+@conditional("schedule")
 def get_schedules():
     """
     Получение всех задач в расписании
     ---
     tags:
         - Schedule
+    parameters:
+        - in: query
+          name: limit
+          type: integer
+          example: 100
+          description: Размер страницы (не больше 1000)
+        - in: query
+          name: after
+          type: string
+          description: Курсор следующей страницы из поля "next" предыдущего ответа
+        - in: query
+          name: employee_id
+          type: integer
+          example: 7
+          description: Сотрудник
+        - in: query
+          name: order_id
+          type: integer
+          example: 1
+          description: Заявка
+        - in: query
+          name: date__gte
+          type: string
+          example: 01.04.2023
+          description: Задачи начиная с даты (также __gt, __lt, __lte)
+        - in: query
+          name: order_by
+          type: string
+          example: -date
+          description: Поле сортировки, "-" для убывания
+        - in: query
+          name: fields
+          type: string
+          example: id,date,employee_id
+          description: Поля через запятую (по умолчанию все)
     responses:
         200:
-            description: Пример успешного ответа
+            description: '{ "items": [...], "next": "курсор или null" }'
     """
     try:
-        schedules = Schedule.query.all()
-        return make_response(jsonify([schedule.json() for schedule in schedules]), 200)
+        query, keys, descending, serialize = schedules_filters.select()
+        page = paginate(query, keys, serialize, descending)
+        return make_response(jsonify(page), 200)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error getting schedules"}), 500)
 
 
 @schedules_blueprint.route("/schedules/<int:id>", methods=["GET"])
+@tagged
 def get_schedule(id):
     """
     Получение конкретной задачи в расписании
@@ -77,15 +221,22 @@ def get_schedule(id):
           type: integer
           example: 1
           required: True
+        - in: query
+          name: fields
+          type: string
+          example: id,date,employee_id
+          description: Поля через запятую (по умолчанию все)
     responses:
         200:
             description: Пример успешного ответа
     """
     try:
-        schedule = Schedule.query.filter_by(id=id).first()
+        schedule = cache.get(Schedule, id)
         if schedule:
-            return make_response(jsonify({"schedule": schedule.json()}), 200)
+            return make_response(jsonify({"schedule": schedules_filters.sparse(schedule)}), 200)
         return make_response(jsonify({"message": "schedule not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error getting schedule"}), 500)
@@ -108,24 +259,90 @@ def update_schedule(id):
           name: JSON
           required: True
           example: {
-              date: 02.04.2023,
+              date: 02.04.2023 10:00,
+              end_date: 02.04.2023 12:00,
               employee_id: 1,
               order_id: 1
           }
     responses:
         200:
             description: Пример успешного ответа
+        409:
+            description: '{ "message": "employee is busy at this time" }'
     """
     try:
-        schedule = Schedule.query.filter_by(id=id).first()
-        if schedule:
-            data = request.get_json()
-            schedule.date = data["date"]
-            schedule.employee_id = data["employee_id"]
-            schedule.order_id = data["order_id"]
+        values = item_values(Schedule, request.get_json())
+        values["date"], values["end_date"] = parse_window(values["date"], values.get("end_date"))
+        if has_conflict(values["employee_id"], values["date"], values["end_date"], exclude_id=id):
+            return make_response(jsonify({"message": "employee is busy at this time"}), 409)
+        if update_row(Schedule, id, values):
             db.session.commit()
+            cache.invalidate(Schedule, id)
             return make_response(jsonify({"message": "schedule updated"}), 200)
         return make_response(jsonify({"message": "schedule not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except IntegrityError as e:
+        current_app.logger.error(e)
+        db.session.rollback()
+        message, status = constraint_error(e)
+        return make_response(jsonify({"message": message}), status)
+    except Exception as e:
+        current_app.logger.error(e)
+        return make_response(jsonify({"message": "error updating schedule"}), 500)
+
+
+@schedules_blueprint.route("/schedules/<int:id>", methods=["PATCH"])
+def patch_schedule(id):
+    """
+    Частичное редактирование конкретной задачи в расписании (меняются только переданные поля)
+    ---
+    tags:
+        - Schedule
+    parameters:
+        - in: path
+          name: id
+          type: integer
+          example: 1
+          required: True
+        - in: body
+          name: JSON
+          required: True
+          example: {
+              employee_id: 2
+          }
+    responses:
+        200:
+            description: Пример успешного ответа
+        409:
+            description: '{ "message": "employee is busy at this time" }'
+    """
+    try:
+        values = item_values(Schedule, request.get_json(), partial=True)
+        if values.keys() & {"date", "end_date", "employee_id"}:
+            # the overlap check needs the whole new window, so the rest comes from the current row
+            current = db.session.execute(
+                select(Schedule.date, Schedule.end_date, Schedule.employee_id).where(Schedule.id == id)
+            ).first()
+            if current is None:
+                return make_response(jsonify({"message": "schedule not found"}), 404)
+            end_date = values.get("end_date", None if "date" in values else current.end_date)
+            values["date"], values["end_date"] = parse_window(values.get("date", current.date), end_date)
+            employee_id = values.get("employee_id", current.employee_id)
+            if has_conflict(employee_id, values["date"], values["end_date"], exclude_id=id):
+                return make_response(jsonify({"message": "employee is busy at this time"}), 409)
+        if update_row(Schedule, id, values):
+            db.session.commit()
+            cache.invalidate(Schedule, id)
+            return make_response(jsonify({"message": "schedule updated"}), 200)
+        return make_response(jsonify({"message": "schedule not found"}), 404)
+    except InvalidQuery as e:
+        return make_response(jsonify({"message": str(e)}), 400)
+    except IntegrityError as e:
+        current_app.logger.error(e)
+        db.session.rollback()
+        message, status = constraint_error(e)
+        return make_response(jsonify({"message": message}), status)
     except Exception as e:
         current_app.logger.error(e)
         return make_response(jsonify({"message": "error updating schedule"}), 500)
@@ -149,10 +366,9 @@ def delete_schedule(id):
             description: Пример успешного ответа
     """
     try:
-        schedule = Schedule.query.filter_by(id=id).first()
-        if schedule:
-            db.session.delete(schedule)
+        if delete_row(Schedule, id):
             db.session.commit()
+            cache.invalidate(Schedule, id)
             return make_response(jsonify({"message": "schedule deleted"}), 200)
         return make_response(jsonify({"message": "schedule not found"}), 404)
     except Exception as e:
@@ -0,0 +1,84 @@
+from sqlalchemy import and_, exists, func, or_, select
+from database import db
+from models import Employees, Schedule, SCHEDULE_DURATION
+from filtering import parse_datetime
+from pagination import InvalidQuery
+
+# the exclusion constraint on PostgreSQL; on SQLite the message of the triggers standing in for it
+OVERLAP_CONSTRAINT = "ex_schedule_employee_overlap"
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+def parse_window(start, end=None):
+    """Parses a ``[start, end)`` range; ``end`` defaults to one default-length slot."""
+    if start is None:
+        raise InvalidQuery("start is required")
+    start = parse_datetime(start)
+    end = start + SCHEDULE_DURATION if end is None else parse_datetime(end)
+    if end <= start:
+        raise InvalidQuery("end must be after start")
+    return start, end
+
+
+def busy(employee_id, start, end, exclude_id=None):
+    """
+    Condition that is true when ``employee_id`` (a value or a column) has a
+    schedule entry overlapping ``[start, end)``.
+    """
+    if db.session.get_bind().dialect.name == "postgresql":
+        # same expression as ex_schedule_employee_overlap, so its GiST index is used
+        overlap = func.tsrange(Schedule.date, Schedule.end_date).op("&&")(func.tsrange(start, end))
+        return exists().where(Schedule.employee_id == employee_id, overlap, *_excluding(exclude_id))
+    # entries of one employee never overlap (the tr_schedule_overlap_* triggers
+    # enforce it for every writer), so besides the entries starting inside the
+    # window only the last one starting before it can reach into it; both are
+    # range lookups on ix_schedule_employee_id_date
+    starts_inside = exists().where(
+        Schedule.employee_id == employee_id,
+        Schedule.date >= start,
+        Schedule.date < end,
+        Schedule.end_date > Schedule.date,
+        *_excluding(exclude_id),
+    )
+    previous_end = (
+        select(Schedule.end_date)
+        .where(Schedule.employee_id == employee_id, Schedule.date < start, *_excluding(exclude_id))
+        .order_by(Schedule.date.desc(), Schedule.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    return or_(starts_inside, and_(previous_end.isnot(None), previous_end > start))
+
+
+def has_conflict(employee_id, start, end, exclude_id=None):
+    return db.session.execute(select(busy(employee_id, start, end, exclude_id))).scalar()
+
+
+def constraint_error(error):
+    """
+    Message and status for an IntegrityError from a schedule write: 409
+    when the entry overlaps another one of the employee, 404 when the
+    employee or the order does not exist, 400 for any other constraint.
+    """
+    orig = error.orig
+    diag = getattr(orig, "diag", None)
+    name = getattr(diag, "constraint_name", None)
+    if name == OVERLAP_CONSTRAINT or (name is None and OVERLAP_CONSTRAINT in str(orig)):
+        return "employee is busy at this time", 409
+    if getattr(orig, "pgcode", None) == FOREIGN_KEY_VIOLATION or "FOREIGN KEY constraint failed" in str(orig):
+        for foreign_key in Schedule.__table__.foreign_keys:
+            if name and foreign_key.parent.name in name:
+                return f"{foreign_key.parent.name.removesuffix('_id')} not found", 404
+        return "employee or order not found", 404
+    return "invalid schedule", 400
+
+
+def free_employees(start, end, post=None):
+    query = Employees.query.filter(~busy(Employees.id, start, end))
+    if post is not None:
+        query = query.filter(Employees.post == post)
+    return query
+
+
+def _excluding(id):
+    return [] if id is None else [Schedule.id != id]
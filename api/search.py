@@ -0,0 +1,77 @@
+from sqlalchemy import column, func, literal, literal_column, or_, select, table
+from database import db
+from pagination import InvalidQuery
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+MIN_QUERY_LENGTH = 3
+
+
+class SearchIndex:
+    """
+    Ranked substring and fuzzy search over text ``columns`` of ``model``.
+
+    PostgreSQL matches ``ILIKE '%q%'`` and pg_trgm word similarity against a
+    GIN trigram index on the concatenated columns (``ix_<table>_search``).
+    SQLite uses the FTS5 trigram table ``<table>_search``: the exact substring
+    first and, when that finds too little, any of the query's trigrams ranked
+    by bm25. Both are created by migrations; other databases fall back to an
+    unindexed LIKE.
+    """
+
+    def __init__(self, model, columns):
+        self.model = model
+        self.columns = columns
+        self.document = literal_column("(" + " || ' ' || ".join(columns) + ")")
+        name = f"{model.__tablename__}_search"
+        self.fts = table(name, column("rowid"), column("rank"), column(name))
+
+    def search(self, q, limit=DEFAULT_SEARCH_LIMIT):
+        q = (q or "").strip()
+        if len(q) < MIN_QUERY_LENGTH:
+            raise InvalidQuery(f"q must be at least {MIN_QUERY_LENGTH} characters")
+        dialect = db.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            return self._trigram(q, limit)
+        if dialect == "sqlite":
+            found = self._fts(_phrase(q), limit)
+            if len(found) < limit:
+                ids = {entity.id for entity in found}
+                fuzzy = " OR ".join(_phrase(q[i:i + 3]) for i in range(len(q) - 2))
+                found += [entity for entity in self._fts(fuzzy, limit) if entity.id not in ids][:limit - len(found)]
+            return found
+        return self._like(q, limit)
+
+    def _trigram(self, q, limit):
+        contains = self.document.ilike(literal(_contains(q)), escape="\\")
+        similar = literal(q).op("<%")(self.document)
+        query = (
+            select(self.model)
+            .where(or_(contains, similar))
+            .order_by(func.word_similarity(q, self.document).desc(), self.model.id)
+            .limit(limit)
+        )
+        return db.session.execute(query).scalars().all()
+
+    def _fts(self, match, limit):
+        query = (
+            select(self.model)
+            .join(self.fts, self.fts.c.rowid == self.model.id)
+            .where(self.fts.c[self.fts.name].op("MATCH")(match))
+            .order_by(self.fts.c.rank, self.model.id)
+            .limit(limit)
+        )
+        return db.session.execute(query).scalars().all()
+
+    def _like(self, q, limit):
+        conditions = [getattr(self.model, name).ilike(_contains(q), escape="\\") for name in self.columns]
+        query = select(self.model).where(or_(*conditions)).order_by(self.model.id).limit(limit)
+        return db.session.execute(query).scalars().all()
+
+
+def _contains(q):
+    return "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _phrase(text):
+    return '"' + text.replace('"', '""') + '"'
@@ -1,28 +1,129 @@
-from flask import Blueprint, jsonify
-from flask_swagger import swagger
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from flask import Blueprint, Response, current_app, request
 from flask_swagger_ui import get_swaggerui_blueprint
 
 swagger_blueprint = Blueprint("swagger", __name__)
 
+INFO = {"version": "1.0", "title": "Repair Shop API"}
+TAGS = [
+    {"name": "Clients", "description": "API для работы с клиентами"},
+    {"name": "Devices", "description": "API для работы с устройствами"},
+    {"name": "Employees", "description": "API для работы с сотрудниками"},
+    {"name": "Orders", "description": "API для работы с заявками"},
+    {"name": "Payments", "description": "API для работы с платежами"},
+    {"name": "Schedule", "description": "API для работы с расписанием"},
+    {"name": "Reports", "description": "API для отчетов"},
+    {"name": "Export", "description": "API для выгрузки данных"},
+    {"name": "Import", "description": "API для загрузки данных"},
+]
+
+
+class SwaggerSpec:
+    """
+    The OpenAPI document, built on first use instead of at startup. Parsing
+    the YAML docstrings is the slow part, so the result is kept as gzipped
+    bytes in memory and in ``SWAGGER_CACHE_DIR`` (the temp directory by
+    default) under a hash of the routes and their docstrings; a worker
+    started from the same source only reads that file.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.etag = None
+        self.compressed = None
+        self.body = None
+
+    def load(self, app):
+        if self.compressed is None:
+            with self.lock:
+                if self.compressed is None:
+                    self._load(app)
+        return self
+
+    def _load(self, app):
+        etag = source_hash(app)
+        path = os.path.join(app.config.get("SWAGGER_CACHE_DIR") or tempfile.gettempdir(), f"swagger-{etag}.json.gz")
+        compressed = _read(path)
+        try:
+            body = gzip.decompress(compressed) if compressed is not None else None
+        except (OSError, EOFError):
+            body = None
+        if body is None:
+            body = build(app)
+            compressed = gzip.compress(body, mtime=0)
+            _write(app, path, compressed)
+        self.etag, self.body, self.compressed = etag, body, compressed
+
 
 def init_swagger(app):
-    global swag
+    app.extensions["swagger"] = SwaggerSpec()
+
+    @app.cli.command("build-swagger")
+    def build_swagger_command():
+        """Writes the cached swagger.json, so that no worker has to build it."""
+        app.extensions["swagger"].load(app)
+
+
+def source_hash(app):
+    """Hash of everything the spec is built from; cheap, as no docstring is parsed."""
+    digest = hashlib.sha1(json.dumps([INFO, TAGS], ensure_ascii=False).encode())
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: (rule.rule, rule.endpoint)):
+        view = app.view_functions[rule.endpoint]
+        methods = ",".join(sorted(rule.methods or ()))
+        digest.update(f"{rule.rule}|{rule.endpoint}|{methods}|{view.__doc__ or ''}".encode())
+    return digest.hexdigest()
+
+
+def build(app):
+    from flask_swagger import swagger
+
     swag = swagger(app)
+    swag["info"] = dict(swag.get("info", {}), **INFO)
+    swag["tags"] = TAGS
+    return json.dumps(swag, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode()
 
 
 @swagger_blueprint.route("/swagger.json")
 def get_swagger():
-    swag["info"]["version"] = "1.0"
-    swag["info"]["title"] = "Repair Shop API"
-    swag["tags"] = [
-        {"name": "Clients", "description": "API для работы с клиентами"},
-        {"name": "Devices", "description": "API для работы с устройствами"},
-        {"name": "Employees", "description": "API для работы с сотрудниками"},
-        {"name": "Orders", "description": "API для работы с заявками"},
-        {"name": "Payments", "description": "API для работы с платежами"},
-        {"name": "Schedule", "description": "API для работы с расписанием"},
-    ]
-    return jsonify(swag)
+    loaded = current_app.extensions["swagger"].load(current_app)
+    gzipped = "gzip" in request.accept_encodings
+    response = Response(loaded.compressed if gzipped else loaded.body, content_type="application/json")
+    if gzipped:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    # the two encodings are different bytes, so they must not share a strong tag
+    response.set_etag(f"{loaded.etag}-gzip" if gzipped else loaded.etag)
+    return response.make_conditional(request)
+
+
+def _read(path):
+    try:
+        with open(path, "rb") as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def _write(app, path, data):
+    # written under a unique name and renamed, so that a worker never reads half a file
+    try:
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".swagger-")
+    except OSError as e:
+        app.logger.warning(f"swagger cache not written: {e}")
+        return
+    try:
+        with os.fdopen(handle, "wb") as file:
+            file.write(data)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except OSError as e:
+        os.unlink(temporary)
+        app.logger.warning(f"swagger cache not written: {e}")
 
 
 swaggerui_blueprint = get_swaggerui_blueprint(
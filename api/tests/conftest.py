@@ -0,0 +1,127 @@
+import os
+import shutil
+import sys
+from datetime import datetime
+import pytest
+from sqlalchemy import event
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, API_DIR)
+
+from app import create_app
+from database import db, dispose_engines, upgrade_db
+from models import Clients, Devices, Employees, Orders, Payments, Schedule
+
+
+@pytest.fixture(scope="session")
+def migrated_db(tmp_path_factory):
+    """A SQLite database with every migration applied, copied by each test."""
+    path = tmp_path_factory.mktemp("template") / "repair_shop.db"
+    environ = {"DB_URL": f"sqlite:///{path}", "ADMISSION_ENABLED": "false"}
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        for key, value in environ.items():
+            monkeypatch.setenv(key, value)
+        app = create_app()
+        with app.app_context():
+            upgrade_db()
+        dispose_engines(app)
+    return path
+
+
+@pytest.fixture
+def db_path(migrated_db, tmp_path):
+    path = tmp_path / "repair_shop.db"
+    shutil.copy(migrated_db, path)
+    return path
+
+
+@pytest.fixture
+def app(db_path, tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_URL", f"sqlite:///{db_path}")
+    monkeypatch.setenv("ADMISSION_ENABLED", "false")
+    (tmp_path / "swagger").mkdir()
+    monkeypatch.setenv("SWAGGER_CACHE_DIR", str(tmp_path / "swagger"))
+    app = create_app()
+    app.config["TESTING"] = True
+    yield app
+    dispose_engines(app)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def statements(app):
+    """The SQL statements sent to the primary, collected while the test runs."""
+    executed = []
+
+    def collect(connection, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", collect)
+    yield executed
+    event.remove(engine, "before_cursor_execute", collect)
+
+
+@pytest.fixture
+def shop(app):
+    """Inserts rows straight through the ORM and returns their ids."""
+    return Shop(app)
+
+
+class Shop:
+    def __init__(self, app):
+        self.app = app
+        self.count = 0
+
+    def add(self, model, /, **values):
+        with self.app.app_context():
+            row = model(**values)
+            db.session.add(row)
+            db.session.commit()
+            return row.id
+
+    def client(self, **values):
+        self.count += 1
+        return self.add(Clients, **{
+            "name": "Иван", "surname": f"Петров{self.count}", "address": "Москва",
+            "phone": f"+7900000{self.count:04d}", "email": f"client{self.count}@example.com",
+            **values,
+        })
+
+    def device(self, **values):
+        self.count += 1
+        if "client_id" not in values:
+            values["client_id"] = self.client()
+        return self.add(Devices, **{
+            "manufacturer": "Apple", "model": "iPhone", "sn": f"SN{self.count:06d}",
+            "release_date": datetime(2020, 1, 1), **values,
+        })
+
+    def employee(self, **values):
+        return self.add(Employees, **{"name": "Анна", "surname": "Смирнова", "post": "мастер", **values})
+
+    def order(self, **values):
+        if "device_id" not in values:
+            values["device_id"] = self.device()
+        return self.add(Orders, **{
+            "order_date": datetime(2023, 4, 1), "description": "Замена АКБ", "cost": 100.0,
+            "state": Orders.States.pending, **values,
+        })
+
+    def payment(self, **values):
+        self.count += 1
+        if "order_id" not in values:
+            values["order_id"] = self.order()
+        return self.add(Payments, **{"payment_date": datetime(2023, 4, 2, 0, 0, self.count), "amount": 10.0, **values})
+
+    def schedule(self, **values):
+        if "employee_id" not in values:
+            values["employee_id"] = self.employee()
+        if "order_id" not in values:
+            values["order_id"] = self.order()
+        return self.add(Schedule, **{"date": datetime(2023, 4, 3, 10), **values})
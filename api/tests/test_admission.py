@@ -0,0 +1,88 @@
+import threading
+import pytest
+from admission import Gate, parse_budgets, request_class
+from app import create_app
+from database import dispose_engines
+
+
+@pytest.fixture
+def admitted(db_path, tmp_path, monkeypatch):
+    """Builds the app with admission control on and the given ADMISSION_BUDGETS."""
+    apps = []
+
+    def build(budgets):
+        monkeypatch.setenv("DB_URL", f"sqlite:///{db_path}")
+        monkeypatch.setenv("ADMISSION_ENABLED", "true")
+        monkeypatch.setenv("ADMISSION_BUDGETS", budgets)
+        monkeypatch.setenv("SWAGGER_CACHE_DIR", str(tmp_path))
+        apps.append(create_app())
+        return apps[-1].test_client()
+
+    yield build
+    for app in apps:
+        dispose_engines(app)
+
+
+def test_gate_queues_in_order_and_refuses_overflow():
+    gate = Gate("test", limit=1, queue=1, timeout=5)
+    assert gate.acquire()
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(gate.acquire()))
+    waiter.start()
+    while not gate.waiters:
+        pass
+
+    # the queue is full
+    assert not gate.acquire()
+    gate.release()
+    waiter.join()
+    # the slot went straight to the waiter
+    assert (admitted, gate.active, gate.waiters) == ([True], 1, [])
+
+
+def test_gate_wait_times_out():
+    gate = Gate("test", limit=1, queue=1, timeout=0.01)
+    assert gate.acquire()
+    assert not gate.acquire()
+    assert (gate.active, gate.waiters) == (1, [])
+
+
+def test_budgets_parse():
+    budgets = parse_budgets("list=3/6, export=2")
+    assert (budgets["list"], budgets["export"], budgets["point"]) == ((3, 6), (2, 0), (16, 32))
+    with pytest.raises(ValueError):
+        parse_budgets("search=1/1")
+
+
+@pytest.mark.parametrize("method, path, expected", [
+    ("GET", "/orders/1", "point"),
+    ("GET", "/orders", "list"),
+    ("PATCH", "/orders/1", "write"),
+    ("GET", "/export/orders", "export"),
+    ("POST", "/import/clients", "export"),
+    ("GET", "/metrics", None),
+])
+def test_requests_are_classed(app, method, path, expected):
+    with app.test_request_context(path, method=method):
+        assert request_class() == expected
+
+
+def test_full_class_answers_503_and_others_still_run(admitted, shop):
+    client = admitted("list=0/0")
+    shop.client()
+
+    response = client.get("/clients")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert client.get("/clients/1").status_code == 200
+
+
+def test_streamed_export_keeps_its_slot_until_closed(admitted, shop):
+    client = admitted("export=1/0")
+    shop.order()
+
+    streaming = client.get("/export/orders", buffered=False)
+    assert streaming.status_code == 200
+    assert client.get("/export/orders").status_code == 503
+    streaming.close()
+    assert client.get("/export/orders").status_code == 200
@@ -0,0 +1,56 @@
+import pytest
+from starlette.testclient import TestClient
+import asgi
+from database import db
+from models import Events
+
+CLIENT = {"name": "Иван", "surname": "Петров", "address": "Москва", "phone": "+79000000001", "email": "i@example.com"}
+
+
+@pytest.fixture
+def async_client(app, db_path, monkeypatch):
+    """The ASGI app on the same database as ``app``."""
+    monkeypatch.delenv("ASYNC_DB_URL", raising=False)
+    with TestClient(asgi.create_app()) as client:
+        yield client
+
+
+def test_async_driver_urls():
+    assert asgi.async_url("sqlite:///shop.db") == "sqlite+aiosqlite:///shop.db"
+    assert asgi.async_url("postgresql+psycopg2://db/shop") == "postgresql+asyncpg://db/shop"
+    assert asgi.async_url("mysql://db/shop") == "mysql://db/shop"
+
+
+def test_crud_round_trip(async_client):
+    assert async_client.post("/clients", json=CLIENT).status_code == 201
+    assert async_client.get("/clients").json()["items"][0]["email"] == "i@example.com"
+    assert async_client.patch("/clients/1", json={"address": "Казань"}).status_code == 200
+    assert async_client.get("/clients/1?fields=address").json() == {"client": {"address": "Казань"}}
+    assert async_client.delete("/clients/1").status_code == 200
+    assert async_client.get("/clients/1").status_code == 404
+
+
+def test_bodies_match_the_flask_app(client, async_client, shop):
+    shop.order()
+    for url in ("/orders", "/orders/1", "/orders?fields=id,state&order_by=-cost"):
+        assert async_client.get(url).content == client.get(url).data
+
+
+def test_writes_keep_summaries_and_events(app, client, async_client, shop):
+    order_id = shop.order()
+    assert async_client.post("/payments", json={
+        "payment_date": "2023-04-02T10:00", "order_id": order_id, "amount": 30,
+    }).status_code == 201
+
+    body = client.get("/reports/revenue?from=2023-04-01&to=2023-04-30&period=month").get_json()
+    assert body["items"] == [{"period": "2023-04-01", "payments": 1, "amount": 30}]
+    with app.app_context():
+        event = db.session.query(Events).one()
+    assert (event.entity, event.action) == ("payments", "created")
+
+
+def test_bad_requests(async_client):
+    assert async_client.post("/clients", json={"name": "Иван"}).json() == {"message": "missing fields: surname"}
+    assert async_client.get("/orders?state=lost").status_code == 400
+    assert async_client.patch("/clients/1", json={}).status_code == 400
+    assert async_client.get("/events?entity=parts").status_code == 400
@@ -0,0 +1,56 @@
+import pytest
+from routes import orders as orders_routes
+
+
+def test_order_balance(client, shop):
+    order_id = shop.order(cost=100)
+    shop.payment(order_id=order_id, amount=30)
+    shop.payment(order_id=order_id, amount=20)
+    unpaid = shop.order(cost=70.99)
+
+    assert client.get(f"/orders/{order_id}/balance").get_json()["balance"] == {
+        "order_id": order_id, "cost": 100, "paid": 50, "balance": 50,
+    }
+    assert client.get(f"/orders/{unpaid}/balance").get_json()["balance"]["paid"] == 0
+    assert client.get("/orders/1000/balance").status_code == 404
+
+
+@pytest.fixture
+def debtors(shop):
+    """Five clients; the second paid in full, the fourth owes 5 on each of two orders."""
+    owed = {}
+    for index, amounts in enumerate([[60], [100], [10], [95, 95], [1]]):
+        client_id = shop.client()
+        device_id = shop.device(client_id=client_id)
+        for amount in amounts:
+            shop.payment(order_id=shop.order(device_id=device_id, cost=100), amount=amount)
+        owed[client_id] = sum(100 - amount for amount in amounts)
+    return owed
+
+
+def walk(client, url):
+    items, pages = [], 0
+    while url:
+        body = client.get(url).get_json()
+        items += body["items"]
+        pages += 1
+        url = body["next"] and f"{url.split('&after=')[0]}&after={body['next']}"
+    return items, pages
+
+
+@pytest.mark.parametrize("scan", [1000, 1])
+def test_debtors_are_paged_by_client(client, debtors, monkeypatch, scan):
+    monkeypatch.setattr(orders_routes, "DEBTORS_SCAN", scan)
+    items, pages = walk(client, "/orders/debtors?limit=2")
+
+    expected = {id: owed for id, owed in debtors.items() if owed}
+    assert [(item["client"]["id"], item["balance"]) for item in items] == list(expected.items())
+    assert pages == 2
+    assert [order["balance"] for order in items[2]["orders"]] == [5, 5]
+
+
+def test_debtors_count_only_orders_above_min_balance(client, debtors):
+    items, _ = walk(client, "/orders/debtors?limit=10&min_balance=20")
+
+    assert [(item["client"]["id"], item["balance"]) for item in items] == [(1, 40), (3, 90), (5, 99)]
+    assert client.get("/orders/debtors?min_balance=lots").status_code == 400
@@ -0,0 +1,30 @@
+import json
+import os
+import subprocess
+import sys
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))), "bench")
+TINY = ["--clients", "20", "--employees", "2", "--devices", "40", "--orders", "80", "--payments", "100",
+        "--schedules", "40", "--requests", "20", "--concurrency", "2", "--workers", "1", "--threads", "2"]
+
+
+def bench(script, *args):
+    return subprocess.run([sys.executable, os.path.join(BENCH_DIR, script), *args],
+                          cwd=BENCH_DIR, capture_output=True, text=True, timeout=300)
+
+
+def test_suite_seeds_serves_and_compares(tmp_path):
+    output = tmp_path / "results.json"
+    run = bench("run.py", "--db-url", f"sqlite:///{tmp_path / 'bench.db'}", "--output", str(output), *TINY)
+    assert run.returncode == 0, run.stderr
+
+    results = json.loads(output.read_text())["results"]
+    assert results and all(result["statuses"] == {"200": 20} for result in results)
+    assert all(result["queries_per_request"] > 0 for result in results)
+
+    assert bench("compare.py", str(output), str(output)).returncode == 0
+    for result in results:
+        result["p95_ms"] *= 2
+    slower = tmp_path / "slower.json"
+    slower.write_text(json.dumps({"results": results}))
+    assert bench("compare.py", str(output), str(slower)).returncode != 0
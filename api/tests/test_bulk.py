@@ -0,0 +1,67 @@
+from datetime import date
+import bulk
+from database import db
+from models import DailyRevenue, Events, Payments
+
+
+def payments(app):
+    with app.app_context():
+        return db.session.query(Payments.payment_date, Payments.amount).order_by(Payments.payment_date).all()
+
+
+def test_bad_row_is_rejected_and_the_good_ones_are_kept(app, client, shop):
+    order_id = shop.order()
+    items = [
+        {"payment_date": "2023-04-02T10:00", "order_id": order_id, "amount": 10},
+        {"payment_date": "2023-04-02T10:00", "order_id": order_id, "amount": 20},
+        {"payment_date": "2023-04-02T11:00", "order_id": order_id, "amount": 30},
+    ]
+    response = client.post("/payments/bulk", json=items)
+
+    assert response.status_code == 207
+    body = response.get_json()
+    assert [result["status"] for result in body["results"]] == [201, 409, 201]
+    assert (body["succeeded"], body["failed"]) == (2, 1)
+    assert [amount for _, amount in payments(app)] == [10, 30]
+    with app.app_context():
+        # the rejected row left nothing behind in the summaries or the change feed
+        revenue = db.session.get(DailyRevenue, date(2023, 4, 2))
+        assert (revenue.payments_count, revenue.amount_total) == (2, 40)
+        assert db.session.query(Events).filter_by(entity="payments", action="created").count() == 2
+
+
+def test_request_commits_all_batches_or_none(app, client, shop, monkeypatch):
+    order_id = shop.order()
+    monkeypatch.setattr(bulk, "BATCH_SIZE", 2)
+    emitted = []
+
+    def failing_emit(model, action, rows, session=None):
+        emitted.append(rows)
+        if len(emitted) == 2:
+            raise RuntimeError("event log unavailable")
+
+    monkeypatch.setattr(bulk, "emit", failing_emit)
+    items = [
+        {"payment_date": f"2023-04-02T1{hour}:00", "order_id": order_id, "amount": 10}
+        for hour in range(4)
+    ]
+    response = client.post("/payments/bulk", json=items)
+
+    assert response.status_code == 500
+    # the first batch had been written, but the request never committed it
+    assert len(emitted) == 2
+    assert payments(app) == []
+    with app.app_context():
+        assert db.session.get(DailyRevenue, date(2023, 4, 2)) is None
+
+
+def test_bulk_update_changes_only_the_supplied_columns(app, client, shop):
+    order_id = shop.order()
+    first, second = shop.payment(order_id=order_id, amount=10), shop.payment(order_id=order_id, amount=20)
+    response = client.put("/payments/bulk", json=[{"id": first, "amount": 15}, {"id": 10 ** 6, "amount": 1}])
+
+    assert response.status_code == 207
+    assert [result["status"] for result in response.get_json()["results"]] == [200, 404]
+    with app.app_context():
+        assert db.session.get(Payments, first).amount == 15
+        assert db.session.get(Payments, second).amount == 20
@@ -0,0 +1,137 @@
+import pytest
+from werkzeug.http import generate_etag
+import cache as cache_module
+from cache import EntityCache, LRUCache, MemoryBackend, cache
+from database import db
+from models import Clients
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def shared(app):
+    """The app's cache with the in-memory stand-in for a shared backend behind it."""
+    cache.configure({"CACHE_URL": "memory://"})
+    return cache.backend
+
+
+def worker(backend):
+    """The entity cache of another worker, sharing ``backend``."""
+    other = EntityCache()
+    other.configure({})
+    other.backend = backend
+    return other
+
+
+def test_lru_counts_hits_misses_and_evictions(clock):
+    lru = LRUCache("test", size=2, ttl=10)
+    assert lru.get("a") is None
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+
+    # "b" was the least recently used entry
+    assert lru.get("b") is None
+    assert lru.stats() == {"hits": 1, "misses": 2, "evictions": 1, "size": 2, "max_size": 2, "ttl": 10}
+
+
+def test_lru_entries_expire(clock):
+    lru = LRUCache("test", size=2, ttl=10)
+    lru.set("a", 1)
+    clock.now += 9
+    assert lru.get("a") == 1
+    clock.now += 2
+    assert lru.get("a") is None
+    assert (lru.hits, lru.misses, lru.evictions, len(lru.entries)) == (1, 1, 1, 0)
+
+
+def test_memory_backend_copies_and_expires(clock):
+    backend = MemoryBackend()
+    value = {"id": 1}
+    backend.set("key", value, ttl=5)
+    value["id"] = 2
+    assert backend.get("key") == {"id": 1}
+    clock.now += 6
+    assert backend.get("key") is None
+
+
+def test_hit_runs_no_query(client, shop, statements):
+    id = shop.client()
+    assert client.get(f"/clients/{id}").status_code == 200
+    statements.clear()
+    response = client.get(f"/clients/{id}")
+
+    assert response.get_json()["client"]["id"] == id
+    assert statements == []
+    assert cache.stats()["clients"]["hits"] == 1
+
+
+def test_workers_share_loaded_entries(app, shop, shared, statements):
+    id = shop.client()
+    with app.app_context():
+        assert cache.get(Clients, id)["id"] == id
+        statements.clear()
+        assert worker(shared).get(Clients, id)["id"] == id
+    assert statements == []
+
+
+@pytest.mark.parametrize("write", [
+    lambda client, id: client.put(f"/clients/{id}", json={
+        "name": "Пётр", "surname": "Иванов", "address": "Казань", "phone": "+79001112233", "email": "p@example.com",
+    }),
+    lambda client, id: client.patch(f"/clients/{id}", json={"address": "Казань"}),
+    lambda client, id: client.put("/clients/bulk", json=[{"id": id, "address": "Казань"}]),
+], ids=["put", "patch", "bulk"])
+def test_writes_invalidate_their_keys(app, client, shop, shared, write):
+    id, other_id = shop.client(), shop.client()
+    client.get(f"/clients/{id}")
+    client.get(f"/clients/{other_id}")
+    assert write(client, id).status_code in (200, 202)
+
+    assert shared.get(cache_module._key(Clients, id)) is None
+    # only the written key goes
+    assert shared.get(cache_module._key(Clients, other_id)) is not None
+    assert client.get(f"/clients/{id}").get_json()["client"]["address"] == "Казань"
+
+
+def test_delete_invalidates_its_key(client, shop, shared):
+    id = shop.client()
+    client.get(f"/clients/{id}")
+    assert client.delete(f"/clients/{id}").status_code == 200
+
+    assert shared.get(cache_module._key(Clients, id)) is None
+    assert client.get(f"/clients/{id}").status_code == 404
+
+
+def test_other_workers_serve_their_copy_until_it_expires(app, client, shop, clock):
+    id = shop.client()
+    client.get(f"/clients/{id}")
+    with app.app_context():
+        # written by another worker, whose invalidation never reaches this LRU
+        db.session.get(Clients, id).address = "Казань"
+        db.session.commit()
+
+    response = client.get(f"/clients/{id}")
+    assert response.get_json()["client"]["address"] == "Москва"
+    # the tag describes the old body, so it cannot pin the client to it
+    assert response.headers["ETag"] == f'"{generate_etag(response.data)}"'
+    stale = response.headers["ETag"]
+
+    clock.now += cache.ttl + 1
+    response = client.get(f"/clients/{id}", headers={"If-None-Match": stale})
+    assert response.status_code == 200
+    assert response.get_json()["client"]["address"] == "Казань"
@@ -0,0 +1,53 @@
+import importlib.util
+import os
+import pytest
+from sqlalchemy import create_engine, func, select, text
+from models import Schedule
+
+DATAGEN = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))), "bench", "datagen.py")
+COUNTS = {"clients": 50, "employees": 3, "devices": 120, "orders": 300, "payments": 500, "schedules": 200}
+TABLES = {"clients": "clients", "employees": "employees", "devices": "devices", "orders": "orders",
+          "payments": "payments", "schedules": "schedule"}
+
+
+@pytest.fixture
+def datagen():
+    spec = importlib.util.spec_from_file_location("datagen", DATAGEN)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def seeded(datagen, path, seed=0):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        # small batches, so that rows cross batch boundaries
+        datagen.seed(connection, COUNTS, seed=seed, batch_size=64)
+    return engine
+
+
+def dump(engine):
+    with engine.connect() as connection:
+        return {table: connection.execute(text(f"SELECT * FROM {table} ORDER BY id")).all()
+                for table in TABLES.values()}
+
+
+def test_generated_rows_satisfy_the_schema(datagen, db_path):
+    # the unique indexes and the schedule overlap triggers are checked while inserting
+    engine = seeded(datagen, db_path)
+    with engine.connect() as connection:
+        counts = {name: connection.execute(text(f"SELECT count(*) FROM {table}")).scalar() for name, table in TABLES.items()}
+        assert counts == COUNTS
+        assert connection.execute(text("PRAGMA foreign_key_check")).all() == []
+        assert connection.execute(select(func.count()).where(Schedule.end_date <= Schedule.date)).scalar() == 0
+    engine.dispose()
+
+
+def test_same_seed_same_data(datagen, db_path, migrated_db, tmp_path):
+    other = tmp_path / "other.db"
+    other.write_bytes(migrated_db.read_bytes())
+    first, second = seeded(datagen, db_path), seeded(datagen, other)
+
+    assert dump(first) == dump(second)
+    first.dispose()
+    second.dispose()
@@ -0,0 +1,46 @@
+from werkzeug.http import generate_etag
+
+
+def test_list_is_not_modified_until_its_table_is_written(client, shop):
+    shop.client()
+    response = client.get("/clients")
+    tag = response.headers["ETag"]
+
+    assert client.get("/clients", headers={"If-None-Match": tag}).status_code == 304
+    # another query string is another representation
+    assert client.get("/clients?limit=1", headers={"If-None-Match": tag}).status_code == 200
+    # a write to an unrelated table keeps the tag
+    shop.employee()
+    assert client.get("/clients", headers={"If-None-Match": tag}).status_code == 304
+
+    client.patch("/clients/1", json={"address": "Казань"})
+    response = client.get("/clients", headers={"If-None-Match": tag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != tag
+    assert response.get_json()["items"][0]["address"] == "Казань"
+
+
+def test_entity_tag_changes_with_the_entity(client, shop):
+    id = shop.client()
+    response = client.get(f"/clients/{id}")
+    tag = response.headers["ETag"]
+    # hashed from the body, so it cannot go out with a body it does not describe
+    assert tag == f'"{generate_etag(response.data)}"'
+
+    assert client.get(f"/clients/{id}", headers={"If-None-Match": tag}).status_code == 304
+    assert client.put(f"/clients/{id}", json={
+        "name": "Пётр", "surname": "Иванов", "address": "Казань", "phone": "+79001112233", "email": "p@example.com",
+    }).status_code == 202
+    response = client.get(f"/clients/{id}", headers={"If-None-Match": tag})
+    assert response.status_code == 200
+    assert response.get_json()["client"]["name"] == "Пётр"
+
+
+def test_failed_write_keeps_the_tag(client, shop):
+    shop.client(phone="+79000000001")
+    second = shop.client()
+    tag = client.get("/clients").headers["ETag"]
+
+    # the duplicate phone is rejected and rolled back, versions included
+    assert client.patch(f"/clients/{second}", json={"phone": "+79000000001"}).status_code != 200
+    assert client.get("/clients", headers={"If-None-Match": tag}).status_code == 304
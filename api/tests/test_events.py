@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+import events
+from app import create_app
+from database import db, dispose_engines, upgrade_db
+from events import emit, stream
+from models import Events, Payments
+
+
+def log(app, *rows):
+    """Appends events the way writers with the given (tx, id) would have."""
+    with app.app_context():
+        db.session.execute(insert(Events), [
+            {"tx": tx, "id": id, "entity": "payments", "entity_id": id, "action": "created"} for tx, id in rows
+        ])
+        db.session.commit()
+
+
+async def read(feed, count):
+    """The ids of the next ``count`` events of ``feed``, and the resets among them."""
+    ids = []
+    while len(ids) < count:
+        chunk = (await anext(feed)).decode()
+        if chunk.startswith("id: "):
+            ids.append(int(chunk.split("\n")[0][4:]) if "event: reset" not in chunk else "reset")
+    return ids
+
+
+def follow(db_path, steps, **args):
+    """Streams the log while ``steps`` run: (action, events expected after it) pairs."""
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        feed = stream(engine, **args)
+        try:
+            assert (await anext(feed)).startswith(b"retry: ")
+            for action, count in steps:
+                if action:
+                    action()
+                    events.broker.publish()
+                yield await read(feed, count)
+        finally:
+            await feed.aclose()
+            await engine.dispose()
+
+    async def collect():
+        return [ids async for ids in run()]
+
+    return asyncio.run(asyncio.wait_for(collect(), 5))
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(events.broker, "poll_interval", 0.05)
+
+
+def test_stream_follows_the_log_from_its_head(client, db_path, shop):
+    order_id = shop.order()
+
+    def pay(amount):
+        return lambda: client.post("/payments", json={"payment_date": f"2023-04-02T10:{amount}", "order_id": order_id, "amount": amount})
+
+    pay(10)()
+    # the first payment was in the log before the stream opened
+    assert follow(db_path, [(pay(20), 1), (pay(30), 1)]) == [[2], [3]]
+
+
+def test_event_taken_earlier_and_committed_later_is_delivered(app, db_path):
+    log(app, (10, 5))
+    seen = follow(db_path, [
+        # id 3 went to a transaction that began writing after the one that wrote 5, and committed after it
+        (lambda: log(app, (11, 3)), 1),
+        (lambda: log(app, (12, 6)), 1),
+    ], last_id=5)
+    assert seen == [[3], [6]]
+
+
+def test_stream_resumes_in_commit_order(app, db_path):
+    log(app, (1, 1), (3, 2), (2, 3), (4, 4))
+    # 3 was delivered before 2, so resuming after 3 still sends 2
+    assert follow(db_path, [(None, 2)], last_id=3) == [[2, 4]]
+
+
+def test_trimmed_resume_point_resets_the_client(app, db_path):
+    log(app, (0, 5), (0, 6))
+    assert follow(db_path, [(None, 1)], last_id=2) == [["reset"]]
+    # nothing after last_id is missing
+    assert follow(db_path, [(None, 2)], last_id=4) == [[5, 6]]
+
+
+def test_log_is_trimmed_by_whichever_writer_takes_the_id(app, shop, monkeypatch):
+    monkeypatch.setattr(events, "TRIM_EVERY", 5)
+    monkeypatch.setattr(events.broker, "retention", 3)
+    # another process wrote the first four events
+    log(app, *[(0, id) for id in range(1, 5)])
+    with app.app_context():
+        emit(Payments, "created", [{"id": 1, "amount": 10}])
+        db.session.commit()
+        assert db.session.execute(select(Events.id).order_by(Events.id)).scalars().all() == [3, 4, 5]
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_POSTGRESQL_URL"), reason="TEST_POSTGRESQL_URL is not set")
+def test_stream_waits_for_earlier_transactions_on_postgresql(monkeypatch):
+    """Runs against a scratch PostgreSQL database."""
+    url = os.environ["TEST_POSTGRESQL_URL"]
+    monkeypatch.setenv("DB_URL", url)
+    monkeypatch.setenv("ADMISSION_ENABLED", "false")
+    app = create_app()
+    with app.app_context():
+        upgrade_db()
+    dispose_engines(app)
+    engine = create_engine(url)
+    payment = {"id": 1, "amount": 10}
+
+    async def run():
+        async_engine = create_async_engine(url.replace("postgresql://", "postgresql+asyncpg://", 1))
+        feed = stream(async_engine)
+        await anext(feed)
+        try:
+            with Session(engine) as first, Session(engine) as second:
+                emit(Payments, "created", [payment], session=first)
+                emit(Payments, "updated", [payment], session=second)
+                second.commit()
+                # the later event may not pass the earlier, still running write
+                pending = asyncio.ensure_future(anext(feed))
+                done, _ = await asyncio.wait({pending}, timeout=1)
+                assert not done
+                first.commit()
+            chunks = [(await pending).decode(), (await anext(feed)).decode()]
+            return [json.loads(chunk.split("data: ")[1])["action"] for chunk in chunks]
+        finally:
+            await feed.aclose()
+            await async_engine.dispose()
+
+    try:
+        assert asyncio.run(run()) == ["created", "updated"]
+    finally:
+        engine.dispose()
@@ -0,0 +1,57 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+import export as export_module
+
+
+def test_csv_export_has_a_header_and_every_row(client, shop):
+    for day in (2, 1):
+        shop.order(order_date=datetime(2023, 4, day), cost=10 * day)
+    response = client.get("/export/orders?fields=id,order_date,cost,state")
+
+    assert response.headers["Content-Disposition"] == "attachment; filename=orders.csv"
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [(row["id"], row["order_date"], row["cost"]) for row in rows] == [
+        ("2", "2023-04-01T00:00:00", "10.0"), ("1", "2023-04-02T00:00:00", "20.0"),
+    ]
+    assert rows[0]["state"] == "ожидание"
+
+
+def test_ndjson_export_takes_the_list_filters(client, shop):
+    for cost in (10, 20, 30):
+        shop.order(cost=cost)
+    response = client.get("/export/orders?format=ndjson&cost__gte=20&order_by=-cost&fields=id,cost")
+
+    assert response.content_type == "application/x-ndjson"
+    assert [json.loads(line) for line in response.get_data(as_text=True).splitlines()] == [
+        {"id": 3, "cost": 30}, {"id": 2, "cost": 20},
+    ]
+
+
+def test_export_streams_in_chunks(client, shop, monkeypatch):
+    monkeypatch.setattr(export_module, "CHUNK_SIZE", 64)
+    for _ in range(10):
+        shop.client()
+    response = client.get("/export/clients", buffered=False)
+
+    assert response.is_streamed
+    chunks = list(response.response)
+    response.close()
+    assert len(chunks) > 2
+    assert b"".join(chunks).decode().count("\n") == 11
+
+
+def test_gzip_export(client, shop):
+    shop.client()
+    response = client.get("/export/clients?format=ndjson", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.data))["id"] == 1
+
+
+def test_bad_exports(client):
+    assert client.get("/export/parts").status_code == 404
+    assert client.get("/export/orders?format=xml").status_code == 400
+    assert client.get("/export/orders?colour=red").status_code == 400
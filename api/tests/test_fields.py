@@ -0,0 +1,52 @@
+from datetime import datetime
+from database import db
+from models import Clients, Orders
+
+
+def test_list_rows_render_like_entities(app, client, shop):
+    shop.order(cost=70.5)
+    item = client.get("/orders").get_json()["items"][0]
+    with app.app_context():
+        # Model.json on the entity, through the same JSON provider
+        assert item == app.json.loads(app.json.dumps(db.session.get(Orders, 1).json()))
+
+
+def test_list_selects_only_the_requested_fields(client, shop, statements):
+    for day in (3, 1, 2):
+        shop.order(order_date=datetime(2023, 4, day), cost=10 * day)
+    statements.clear()
+    body = client.get("/orders?fields=state&order_by=cost&limit=2").get_json()
+
+    pending = Orders.States.pending.value
+    assert body["items"] == [{"state": pending}, {"state": pending}]
+    select = next(statement for statement in statements if "FROM orders" in statement)
+    # the sort keys come along for the cursor
+    assert select.startswith("SELECT orders.state, orders.cost, orders.id \nFROM orders")
+    next_page = client.get(f"/orders?fields=state,cost&order_by=cost&limit=2&after={body['next']}").get_json()
+    assert next_page["items"] == [{"state": pending, "cost": 30}]
+
+
+def test_entity_and_nested_documents_take_fields(client, shop):
+    order_id = shop.order()
+    shop.payment(order_id=order_id, amount=15)
+    client_id = shop.client(email="ivan@example.com")
+
+    assert client.get(f"/clients/{client_id}?fields=email,name").get_json() == {
+        "client": {"email": "ivan@example.com", "name": "Иван"},
+    }
+    order = client.get(f"/orders/{order_id}/full?fields=id,payments").get_json()["order"]
+    assert list(order) == ["id", "payments"]
+    assert [payment["amount"] for payment in order["payments"]] == [15]
+
+
+def test_unknown_field_is_rejected(client, shop):
+    shop.order()
+    for url in ("/orders?fields=id,colour", "/orders/1?fields=colour", "/orders/1/full?fields=secret"):
+        response = client.get(url)
+        assert response.status_code == 400
+        assert response.get_json()["message"].startswith("unknown field: ")
+
+
+def test_clients_list_serializes_every_column(client, shop):
+    shop.client()
+    assert set(client.get("/clients").get_json()["items"][0]) == {column.key for column in Clients.__table__.columns}
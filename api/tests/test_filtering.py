@@ -0,0 +1,56 @@
+from datetime import datetime
+import pytest
+from models import Orders
+
+
+@pytest.fixture
+def orders(shop):
+    device_id, other_device_id = shop.device(), shop.device()
+    return [
+        shop.order(device_id=device_id, order_date=datetime(2023, 4, 1), cost=50),
+        shop.order(device_id=device_id, order_date=datetime(2023, 4, 2), cost=150, state=Orders.States.completed),
+        shop.order(device_id=other_device_id, order_date=datetime(2023, 4, 3), cost=250),
+        shop.order(device_id=other_device_id, order_date=datetime(2023, 4, 4), cost=350, state=Orders.States.completed),
+    ]
+
+
+def ids(client, query):
+    response = client.get(f"/orders?{query}")
+    assert response.status_code == 200, response.get_json()
+    return [item["id"] for item in response.get_json()["items"]]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("state=completed", [2, 4]),
+    ("device_id=1&device_id=2", [1, 2, 3, 4]),
+    ("device_id__in=2,3", [3, 4]),
+    ("cost__gte=150&cost__lt=350", [2, 3]),
+    ("order_date__gt=02.04.2023", [3, 4]),
+    ("order_date__lte=2023-04-02T00:00", [1, 2]),
+    ("state=completed&order_by=-cost", [4, 2]),
+])
+def test_filters_and_sorting(client, orders, query, expected):
+    assert ids(client, query) == expected
+
+
+def test_filters_are_one_query(client, orders, statements):
+    statements.clear()
+    ids(client, "state=completed&cost__gt=200&order_by=-order_date")
+
+    selects = [statement for statement in statements if "FROM orders" in statement]
+    assert len(selects) == 1
+    assert "WHERE orders.state = ? AND orders.cost > ?" in selects[0]
+    assert "ORDER BY orders.order_date DESC, orders.id DESC" in selects[0]
+
+
+@pytest.mark.parametrize("query, message", [
+    ("colour=red", "unknown filter: colour"),
+    ("state=lost", "invalid state: lost"),
+    ("cost=lots", "invalid cost: lots"),
+    ("state__gt=pending", "unsupported operator for state: gt"),
+    ("order_date__gte=yesterday", "invalid date: yesterday"),
+    ("order_by=description", "cannot order by description"),
+])
+def test_bad_filters(client, query, message):
+    response = client.get(f"/orders?{query}")
+    assert (response.status_code, response.get_json()["message"]) == (400, message)
@@ -0,0 +1,124 @@
+import json
+from datetime import date, datetime
+from database import db
+from models import Clients, DailyRevenue, Schedule
+
+HEADER = "name,surname,address,phone,email\n"
+
+
+def csv_import(client, entity, body, **args):
+    query = "&".join(f"{key}={value}" for key, value in args.items())
+    return client.post(f"/import/{entity}?{query}", data=body.encode(), content_type="text/csv")
+
+
+def ndjson_import(client, entity, rows, **args):
+    query = "&".join(f"{key}={value}" for key, value in args.items())
+    body = "\n".join(json.dumps(row) for row in rows)
+    return client.post(f"/import/{entity}?{query}", data=body.encode(), content_type="application/x-ndjson")
+
+
+def test_report_lists_every_rejected_line(app, client, shop):
+    shop.client(email="taken@example.com")
+    response = csv_import(client, "clients", HEADER + "\n".join([
+        "Иван,Петров,Москва,+79000001001,ivan@example.com",
+        "Анна,Смирнова,Москва,+79000001002,",
+        "Пётр,Иванов,Казань,+79000001003,taken@example.com",
+        "Иван,Петров,Тверь,+79000001004,ivan@example.com",
+        "Олег,Сидоров,Москва,+79000001005,oleg@example.com,extra",
+    ]))
+
+    assert response.status_code == 207
+    report = response.get_json()
+    assert {key: report[key] for key in ("received", "inserted", "updated", "skipped", "failed")} == {
+        "received": 5, "inserted": 1, "updated": 0, "skipped": 0, "failed": 4,
+    }
+    assert report["errors"] == [
+        {"line": 2, "message": "duplicate email in the file, a later row wins"},
+        {"line": 3, "message": "missing email"},
+        {"line": 4, "message": "email already exists"},
+        {"line": 6, "message": "too many fields"},
+    ]
+    with app.app_context():
+        assert db.session.query(Clients.address).filter_by(email="ivan@example.com").scalar() == "Тверь"
+
+
+def test_conflicts_can_be_skipped_or_updated(app, client, shop):
+    id = shop.client(email="taken@example.com", phone="+79000002000")
+    rows = HEADER + "Пётр,Иванов,Казань,+79000002000,taken@example.com\n"
+
+    report = csv_import(client, "clients", rows, on_conflict="skip").get_json()
+    assert (report["inserted"], report["skipped"], report["failed"]) == (0, 1, 0)
+
+    client.get(f"/clients/{id}")
+    report = csv_import(client, "clients", rows, on_conflict="update", key="email").get_json()
+    assert (report["inserted"], report["updated"], report["failed"]) == (0, 1, 0)
+    # the cached entity went with the update
+    assert client.get(f"/clients/{id}").get_json()["client"]["address"] == "Казань"
+
+
+def test_unknown_references_and_bad_values_are_reported(client, shop):
+    client_id = shop.client()
+    response = ndjson_import(client, "devices", [
+        {"manufacturer": "Apple", "model": "iPhone", "sn": "A1", "release_date": "2020-01-01", "client_id": client_id},
+        {"manufacturer": "Apple", "model": "iPhone", "sn": "A2", "release_date": "2020-01-01", "client_id": 999},
+        {"manufacturer": "Apple", "model": "iPhone", "sn": "A3", "release_date": "soon", "client_id": client_id},
+        {"manufacturer": "Apple", "model": "iPhone", "sn": "A4", "release_date": "2020-01-01", "colour": "red"},
+    ])
+
+    report = response.get_json()
+    assert report["inserted"] == 1
+    assert report["errors"] == [
+        {"line": 2, "message": "unknown client_id"},
+        {"line": 3, "message": "invalid date: soon"},
+        {"line": 4, "message": "unknown column: colour"},
+    ]
+
+
+def test_overlapping_schedule_rows_are_rejected_per_line(app, client, shop):
+    employee_id, order_id = shop.employee(), shop.order()
+    existing = shop.schedule(employee_id=employee_id, order_id=order_id,
+                             date=datetime(2040, 1, 1, 8), end_date=datetime(2040, 1, 1, 9))
+
+    def row(start, end, **values):
+        return {"date": f"2040-01-01T{start}", "end_date": f"2040-01-01T{end}",
+                "employee_id": employee_id, "order_id": order_id, **values}
+
+    response = ndjson_import(client, "schedules", [
+        row("10:00", "12:00"),
+        row("11:00", "13:00"),
+        row("08:30", "09:30"),
+        row("13:00", "14:00"),
+    ])
+    report = response.get_json()
+    assert report["inserted"] == 2
+    assert report["errors"] == [
+        {"line": 1, "message": "overlaps a later row for the same employee"},
+        {"line": 3, "message": "employee is busy at this time"},
+    ]
+
+    # an entry the file replaces does not block the file
+    report = ndjson_import(client, "schedules", [row("08:30", "09:30", id=existing)],
+                           on_conflict="update", key="id").get_json()
+    assert (report["updated"], report["failed"]) == (1, 0)
+    with app.app_context():
+        assert db.session.get(Schedule, existing).date == datetime(2040, 1, 1, 8, 30)
+
+
+def test_imported_payments_are_summarized(app, client, shop):
+    order_id = shop.order()
+    response = ndjson_import(client, "payments", [
+        {"payment_date": "2023-04-02T10:00", "order_id": order_id, "amount": 10},
+        {"payment_date": "2023-04-02T11:00", "order_id": order_id, "amount": 15},
+    ])
+
+    assert response.status_code == 200
+    with app.app_context():
+        revenue = db.session.get(DailyRevenue, date(2023, 4, 2))
+        assert (revenue.payments_count, revenue.amount_total) == (2, 25)
+
+
+def test_bad_requests(client):
+    assert csv_import(client, "clients", HEADER, format="xml").status_code == 400
+    assert csv_import(client, "clients", HEADER, on_conflict="replace").status_code == 400
+    assert csv_import(client, "clients", HEADER, on_conflict="update", key="name").status_code == 400
+    assert csv_import(client, "parts", HEADER).status_code == 404
@@ -0,0 +1,49 @@
+import dataclasses
+import decimal
+from datetime import date, datetime
+import pytest
+import json_provider
+from json_provider import dump_bytes
+from models import Orders
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+
+
+VALUE = {
+    "b": [datetime(2023, 4, 1, 10, 30), date(2023, 4, 2)],
+    "a": {"state": Orders.States.completed, "amount": decimal.Decimal("10.50"), "name": "Иван"},
+    "point": Point(1),
+}
+EXPECTED = (
+    '{"a":{"amount":"10.50","name":"Иван","state":"%s"},'
+    '"b":["2023-04-01T10:30:00","2023-04-02"],"point":{"x":1}}\n' % Orders.States.completed.value
+).encode()
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(json_provider, "orjson", None)
+    elif json_provider.orjson is None:
+        pytest.skip("orjson is not installed")
+
+
+def test_both_encoders_write_the_same_bytes(encoder):
+    assert dump_bytes(VALUE) == EXPECTED
+
+
+def test_unknown_types_are_refused(encoder):
+    with pytest.raises(TypeError):
+        dump_bytes({"value": object()})
+
+
+def test_responses_use_iso_dates_and_enum_values(client, shop):
+    shop.order(order_date=datetime(2023, 4, 1, 9, 15), state=Orders.States.completed)
+    response = client.get("/orders/1")
+
+    assert response.data.endswith(b"\n")
+    order = response.get_json()["order"]
+    assert (order["order_date"], order["state"]) == ("2023-04-01T09:15:00", Orders.States.completed.value)
@@ -0,0 +1,43 @@
+from prometheus_client import REGISTRY
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_requests_are_counted_per_endpoint(client, shop):
+    shop.client()
+    labels = {"endpoint": "clients_blueprint.get_clients", "method": "GET"}
+    before = sample("http_requests_total", status="200", **labels), sample("http_request_duration_seconds_count", **labels)
+
+    client.get("/clients")
+    client.get("/clients")
+    client.get("/clients?limit=none")
+
+    assert sample("http_requests_total", status="200", **labels) - before[0] == 2
+    assert sample("http_requests_total", status="400", **labels) >= 1
+    assert sample("http_request_duration_seconds_count", **labels) - before[1] == 3
+
+
+def test_sql_statements_are_counted_per_request(client, shop, statements):
+    id = shop.client()
+    client.get(f"/clients/{id}")
+    endpoint = {"endpoint": "clients_blueprint.update_client"}
+    before = sample("db_statements_total", **endpoint), sample("db_statements_per_request_count", **endpoint)
+    statements.clear()
+
+    client.put(f"/clients/{id}", json={
+        "name": "Пётр", "surname": "Иванов", "address": "Казань", "phone": "+79001112233", "email": "p@example.com",
+    })
+
+    assert sample("db_statements_total", **endpoint) - before[0] == len(statements) > 0
+    assert sample("db_statements_per_request_count", **endpoint) - before[1] == 1
+
+
+def test_metrics_endpoint_is_not_counted(client):
+    before = sample("http_requests_total", endpoint="metrics", method="GET", status="200")
+    response = client.get("/metrics")
+
+    assert response.content_type.startswith("text/plain")
+    assert b"# TYPE http_request_duration_seconds histogram" in response.data
+    assert sample("http_requests_total", endpoint="metrics", method="GET", status="200") == before == 0
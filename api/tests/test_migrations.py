@@ -0,0 +1,32 @@
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import inspect, text
+from database import MIGRATIONS_DIR, db, include_object
+
+
+def test_migrations_match_the_models(app):
+    with app.app_context(), db.engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={"include_object": include_object})
+        assert compare_metadata(context, db.metadata) == []
+
+
+def test_migrations_downgrade_and_upgrade_again(app):
+    with app.app_context():
+        downgrade(directory=MIGRATIONS_DIR, revision="base")
+        assert inspect(db.engine).get_table_names() == ["alembic_version"]
+        upgrade(directory=MIGRATIONS_DIR)
+        assert "events" in inspect(db.engine).get_table_names()
+
+
+@pytest.mark.parametrize("query, index", [
+    ("SELECT * FROM payments WHERE order_id = 1", "ix_payments_order_id"),
+    ("SELECT * FROM orders WHERE device_id = 1", "ix_orders_device_id"),
+    ("SELECT * FROM orders ORDER BY order_date, id LIMIT 10", "ix_orders_order_date_id"),
+    ("SELECT * FROM schedule WHERE employee_id = 1 AND date < '2023-05-01'", "ix_schedule_employee_id_date"),
+])
+def test_access_paths_use_their_indexes(app, query, index):
+    with app.app_context():
+        plan = " ".join(row[-1] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {query}")))
+    assert f"USING INDEX {index}" in plan or f"USING COVERING INDEX {index}" in plan
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+
+def selects(statements):
+    return [statement for statement in statements if statement.lstrip().upper().startswith("SELECT")]
+
+
+def add_orders(shop, count):
+    employee_id = shop.employee()
+    for day in range(count):
+        order_id = shop.order()
+        shop.payment(order_id=order_id, amount=40)
+        shop.payment(order_id=order_id, amount=60)
+        shop.schedule(order_id=order_id, employee_id=employee_id, date=datetime(2023, 5, day + 1, 10))
+
+
+def test_order_detail_is_one_document(client, shop):
+    add_orders(shop, 1)
+    response = client.get("/orders/1/full")
+
+    assert response.status_code == 200
+    order = response.get_json()["order"]
+    assert order["device"]["client"]["id"] == order["device"]["client_id"]
+    assert sorted(payment["amount"] for payment in order["payments"]) == [40, 60]
+    assert len(order["schedules"]) == 1
+    assert client.get("/orders/2/full").status_code == 404
+
+
+def test_order_list_queries_do_not_grow_with_the_page(client, shop, statements):
+    add_orders(shop, 1)
+    statements.clear()
+    client.get("/orders/full")
+    one = len(selects(statements))
+    add_orders(shop, 9)
+    statements.clear()
+    response = client.get("/orders/full")
+
+    assert len(response.get_json()["items"]) == 10
+    assert len(selects(statements)) == one
@@ -0,0 +1,65 @@
+from datetime import datetime
+import pytest
+from pagination import decode_cursor, encode_cursor
+from models import Orders
+
+
+def walk(client, url):
+    items, pages = [], 0
+    while url:
+        body = client.get(url).get_json()
+        items += body["items"]
+        pages += 1
+        url = body["next"] and f"{url.split('&after=')[0]}&after={body['next']}"
+    return items, pages
+
+
+@pytest.fixture
+def orders(shop):
+    """Seven orders; several share a date, so the id breaks the ties."""
+    device_id = shop.device()
+    return [shop.order(device_id=device_id, order_date=datetime(2023, 4, day), cost=cost)
+            for day, cost in ((3, 50), (1, 70), (3, 10), (2, 70), (1, 30), (3, 90), (2, 20))]
+
+
+def test_pages_cover_every_row_once(client, orders):
+    items, pages = walk(client, "/orders?limit=3")
+
+    assert pages == 3
+    # ordered by (order_date, id) by default
+    assert [item["id"] for item in items] == [2, 5, 4, 7, 1, 3, 6]
+
+
+@pytest.mark.parametrize("order_by, expected", [
+    ("-order_date", [6, 3, 1, 7, 4, 5, 2]),
+    ("cost", [3, 7, 5, 1, 2, 4, 6]),
+    ("-cost", [6, 4, 2, 1, 5, 7, 3]),
+    ("-id", [7, 6, 5, 4, 3, 2, 1]),
+])
+def test_sorted_pages_continue_after_their_cursor(client, orders, order_by, expected):
+    items, _ = walk(client, f"/orders?limit=2&order_by={order_by}")
+    assert [item["id"] for item in items] == expected
+
+
+def test_rows_written_behind_the_cursor_do_not_shift_the_next_page(client, shop, orders):
+    first = client.get("/orders?limit=3").get_json()
+    shop.order(order_date=datetime(2023, 3, 1))
+    second = client.get(f"/orders?limit=3&after={first['next']}").get_json()
+
+    assert [item["id"] for item in second["items"]] == [7, 1, 3]
+
+
+def test_cursor_round_trips_dates():
+    values = decode_cursor(encode_cursor([datetime(2023, 4, 1, 10), 5]), [Orders.order_date, Orders.id])
+    assert values == [datetime(2023, 4, 1, 10), 5]
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=many", "after=garbage", f"after={encode_cursor([1])}"])
+def test_bad_page_parameters(client, query):
+    assert client.get(f"/orders?{query}").status_code == 400
+
+
+def test_limit_is_capped(app, client, orders):
+    app.config["MAX_PAGE_SIZE"] = 4
+    body = client.get("/orders?limit=100").get_json()
+    assert len(body["items"]) == 4 and body["next"]
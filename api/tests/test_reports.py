@@ -0,0 +1,87 @@
+from datetime import datetime
+from flask_migrate import upgrade
+from sqlalchemy import text
+from app import create_app
+from database import MIGRATIONS_DIR, db, dispose_engines, upgrade_db
+from models import DailyOrders, DailyRevenue, Orders
+from reports import rebuild
+
+
+def summaries(app):
+    with app.app_context():
+        revenue = {
+            row.day.isoformat(): (row.payments_count, row.amount_total)
+            for row in db.session.query(DailyRevenue) if row.payments_count
+        }
+        orders = {
+            (row.day.isoformat(), row.state): (row.orders_count, row.cost_total)
+            for row in db.session.query(DailyOrders) if row.orders_count
+        }
+    return revenue, orders
+
+
+def test_writes_keep_the_summaries_current(app, client, shop):
+    assert client.post("/orders", json={
+        "order_date": "2023-04-01T09:00", "device_id": shop.device(), "description": "Замена АКБ",
+        "cost": 100, "state": "pending",
+    }).status_code == 201
+    order_id = 1
+    assert client.post("/payments", json={"payment_date": "2023-04-02T10:00", "order_id": order_id, "amount": 30}).status_code == 201
+    assert client.post("/payments", json={"payment_date": "2023-04-02T11:00", "order_id": order_id, "amount": 20}).status_code == 201
+    assert client.patch("/payments/2", json={"payment_date": "2023-04-03T11:00", "amount": 25}).status_code == 200
+    assert client.patch(f"/orders/{order_id}", json={"state": "completed"}).status_code == 200
+
+    revenue, orders = summaries(app)
+    assert revenue == {"2023-04-02": (1, 30), "2023-04-03": (1, 25)}
+    assert orders == {("2023-04-01", "completed"): (1, 100)}
+    body = client.get("/reports/revenue?from=2023-04-01&to=2023-04-30&period=month").get_json()
+    assert body["items"] == [{"period": "2023-04-01", "payments": 2, "amount": 55}]
+
+    assert client.delete("/payments/1").status_code == 200
+    assert summaries(app)[0] == {"2023-04-03": (1, 25)}
+
+
+def test_rebuild_recomputes_drifted_summaries_in_batches(app, shop):
+    order_id = shop.order(order_date=datetime(2023, 4, 1), cost=100)
+    shop.order(order_date=datetime(2023, 4, 9), cost=50, state=Orders.States.completed)
+    for day, amount in ((2, 10), (2, 15), (8, 5)):
+        shop.payment(order_id=order_id, payment_date=datetime(2023, 4, day, 12, amount), amount=amount)
+    with app.app_context():
+        db.session.add(DailyRevenue(day=datetime(2022, 1, 1).date(), payments_count=7, amount_total=70))
+        db.session.add(DailyRevenue(day=datetime(2023, 4, 2).date(), payments_count=1, amount_total=1))
+        db.session.commit()
+        rebuild(days=3)
+
+    revenue, orders = summaries(app)
+    assert revenue == {"2023-04-02": (2, 25), "2023-04-08": (1, 5)}
+    assert orders == {("2023-04-01", "pending"): (1, 100), ("2023-04-09", "completed"): (1, 50)}
+
+
+def test_rebuild_bumps_the_report_versions(app, client, shop):
+    shop.payment(amount=10)
+    tag = client.get("/reports/revenue").headers["ETag"]
+    with app.app_context():
+        rebuild()
+    assert client.get("/reports/revenue", headers={"If-None-Match": tag}).status_code == 200
+
+
+def test_upgrade_fills_summaries_the_migrations_leave_empty(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_URL", f"sqlite:///{tmp_path / 'old.db'}")
+    app = create_app()
+    with app.app_context():
+        # a database from before the report versions, with rows its writers never summarized
+        upgrade(directory=MIGRATIONS_DIR, revision="a4c9e2b7d613")
+        db.session.execute(text(
+            "INSERT INTO clients VALUES (1, 'Иван', 'Петров', 'Москва', '+79000000001', 'a@example.com')"
+        ))
+        db.session.execute(text("INSERT INTO devices VALUES (1, 'Apple', 'iPhone', 'SN1', '2020-01-01 00:00:00', NULL, 1)"))
+        db.session.execute(text(
+            "INSERT INTO orders VALUES (1, '2023-04-01 10:00:00', 1, 'Замена АКБ', 100, 'pending')"
+        ))
+        db.session.execute(text("INSERT INTO payments VALUES (1, '2023-04-02 10:00:00', 1, 40)"))
+        db.session.commit()
+        upgrade_db()
+    revenue, orders = summaries(app)
+    dispose_engines(app)
+    assert revenue == {"2023-04-02": (1, 40)}
+    assert orders == {("2023-04-01", "pending"): (1, 100)}
@@ -0,0 +1,56 @@
+import shutil
+import sqlite3
+import pytest
+from sqlalchemy import select, update
+from database import db
+from models import Clients
+
+
+@pytest.fixture
+def db_path(db_path, tmp_path, monkeypatch):
+    """The primary, with a replica next to it that has drifted from it."""
+    replica = tmp_path / "replica.db"
+    shutil.copy(db_path, replica)
+    with sqlite3.connect(replica) as connection:
+        connection.execute(
+            "INSERT INTO clients VALUES (1, 'Реплика', 'Петров', 'Москва', '+79000000001', 'r@example.com')"
+        )
+    monkeypatch.setenv("DB_READ_URLS", f"sqlite:///{replica}")
+    return db_path
+
+
+def bind_url(clause):
+    return str(db.session.get_bind(clause=clause).url)
+
+
+def test_get_requests_read_from_the_replica(app, client, shop):
+    shop.client(name="Первичный")
+
+    assert [item["name"] for item in client.get("/clients").get_json()["items"]] == ["Реплика"]
+    # writes land on the primary
+    assert client.patch("/clients/1", json={"address": "Казань"}).status_code == 202
+    assert [item["address"] for item in client.get("/clients").get_json()["items"]] == ["Москва"]
+    with app.app_context():
+        assert db.session.get(Clients, 1).address == "Казань"
+
+
+def test_request_reads_its_own_writes_from_the_primary(app, db_path):
+    primary = f"sqlite:///{db_path}"
+    read = select(Clients)
+    with app.test_request_context("/clients", method="GET"):
+        assert bind_url(read).endswith("replica.db")
+        db.session.execute(update(Clients).where(Clients.id == 1).values(address="Казань"))
+        assert bind_url(read) == primary
+
+    with app.test_request_context("/clients/1", method="GET"):
+        assert bind_url(read).endswith("replica.db")
+        db.session.add(Clients(name="Иван", surname="Петров", address="Москва", phone="+79000000002", email="i@example.com"))
+        db.session.flush()
+        assert bind_url(read) == primary
+
+    with app.test_request_context("/clients/1", method="GET"):
+        assert bind_url(read.with_for_update()) == primary
+        assert bind_url(read) == primary
+
+    with app.test_request_context("/clients", method="POST"):
+        assert bind_url(read) == primary
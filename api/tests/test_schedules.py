@@ -0,0 +1,103 @@
+import os
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+from app import create_app
+from database import db, dispose_engines, upgrade_db
+from models import Employees, Orders, Schedule
+from routes import schedules as schedules_routes
+from scheduling import constraint_error
+
+
+@pytest.fixture
+def booked(client, shop):
+    """Employee 1 is booked on 2040-01-01 from 10:00 to 12:00."""
+    employee_id, order_id = shop.employee(), shop.order()
+    assert client.post("/schedules", json={
+        "date": "2040-01-01T10:00", "end_date": "2040-01-01T12:00", "employee_id": employee_id, "order_id": order_id,
+    }).status_code == 201
+    return employee_id, order_id
+
+
+def entry(employee_id, order_id, start, end):
+    return {"date": f"2040-01-01T{start}", "end_date": f"2040-01-01T{end}", "employee_id": employee_id, "order_id": order_id}
+
+
+def test_overlapping_entry_is_refused(client, booked):
+    assert client.post("/schedules", json=entry(*booked, "11:00", "13:00")).status_code == 409
+    # touching ranges do not overlap
+    assert client.post("/schedules", json=entry(*booked, "12:00", "13:00")).status_code == 201
+    assert client.patch("/schedules/2", json={"date": "2040-01-01T11:30"}).status_code == 409
+
+
+@pytest.mark.parametrize("write", [
+    lambda client, booked: client.post("/schedules", json=entry(*booked, "11:00", "13:00")),
+    lambda client, booked: client.put("/schedules/2", json=entry(*booked, "11:00", "13:00")),
+    lambda client, booked: client.patch("/schedules/2", json={"date": "2040-01-01T11:00"}),
+], ids=["post", "put", "patch"])
+def test_constraint_refuses_what_the_check_lets_through(client, booked, monkeypatch, write):
+    assert client.post("/schedules", json=entry(*booked, "14:00", "15:00")).status_code == 201
+    # two requests racing past has_conflict: the database has the last word
+    monkeypatch.setattr(schedules_routes, "has_conflict", lambda *args, **kwargs: False)
+    response = write(client, booked)
+
+    assert response.status_code == 409
+    assert response.get_json() == {"message": "employee is busy at this time"}
+
+
+def test_other_constraint_violations_are_not_conflicts(client, booked):
+    employee_id, _ = booked
+    response = client.post("/schedules", json=entry(employee_id, None, "14:00", "15:00"))
+
+    assert response.status_code == 400
+    assert response.get_json() == {"message": "invalid schedule"}
+
+
+class Diag:
+    def __init__(self, constraint_name):
+        self.constraint_name = constraint_name
+
+
+class PostgresError(Exception):
+    def __init__(self, pgcode, constraint_name):
+        super().__init__(f"violates constraint \"{constraint_name}\"")
+        self.pgcode = pgcode
+        self.diag = Diag(constraint_name)
+
+
+@pytest.mark.parametrize("pgcode, constraint, expected", [
+    ("23P01", "ex_schedule_employee_overlap", ("employee is busy at this time", 409)),
+    ("23503", "schedule_employee_id_fkey", ("employee not found", 404)),
+    ("23503", "schedule_order_id_fkey", ("order not found", 404)),
+    ("23514", "ck_schedule_end_date", ("invalid schedule", 400)),
+])
+def test_postgresql_errors_are_told_apart_by_constraint(pgcode, constraint, expected):
+    error = IntegrityError("INSERT INTO schedule ...", {}, PostgresError(pgcode, constraint))
+    assert constraint_error(error) == expected
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_POSTGRESQL_URL"), reason="TEST_POSTGRESQL_URL is not set")
+def test_exclusion_constraint_on_postgresql(monkeypatch):
+    """Runs against a scratch PostgreSQL database that has at least one order."""
+    monkeypatch.setenv("DB_URL", os.environ["TEST_POSTGRESQL_URL"])
+    monkeypatch.setenv("ADMISSION_ENABLED", "false")
+    app = create_app()
+    with app.app_context():
+        upgrade_db()
+        employee = Employees(name="Анна", surname="Смирнова", post="мастер")
+        db.session.add(employee)
+        db.session.commit()
+        employee_id = employee.id
+        order_id = db.session.execute(select(func.min(Orders.id))).scalar()
+    monkeypatch.setattr(schedules_routes, "has_conflict", lambda *args, **kwargs: False)
+    client = app.test_client()
+    try:
+        assert client.post("/schedules", json=entry(employee_id, order_id, "10:00", "12:00")).status_code == 201
+        assert client.post("/schedules", json=entry(employee_id, order_id, "11:00", "13:00")).status_code == 409
+        assert client.post("/schedules", json=entry(employee_id, -1, "13:00", "14:00")).get_json() == {"message": "order not found"}
+    finally:
+        with app.app_context():
+            db.session.execute(delete(Schedule).where(Schedule.employee_id == employee_id))
+            db.session.execute(delete(Employees).where(Employees.id == employee_id))
+            db.session.commit()
+        dispose_engines(app)
@@ -0,0 +1,43 @@
+import pytest
+
+
+def names(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.get_json()
+    return [item["surname"] for item in response.get_json()["items"]]
+
+
+@pytest.fixture
+def clients(shop):
+    for surname in ("Смирнов", "Смирнова", "Кузнецов", "Петров"):
+        shop.client(surname=surname)
+
+
+def test_substring_matches_come_first(client, clients):
+    assert names(client, "/clients/search?q=мирнов") == ["Смирнов", "Смирнова"]
+    assert names(client, "/clients/search?q=Смирнова") == ["Смирнова", "Смирнов"]
+
+
+def test_misspelled_query_still_finds_the_client(client, clients):
+    assert names(client, "/clients/search?q=Кузнетцов")[0] == "Кузнецов"
+
+
+def test_index_follows_writes(client, clients):
+    client.patch("/clients/4", json={"surname": "Соколов"})
+    client.delete("/clients/1")
+
+    assert names(client, "/clients/search?q=Соколов") == ["Соколов"]
+    assert names(client, "/clients/search?q=Петров") == []
+    assert names(client, "/clients/search?q=Смирнов") == ["Смирнова"]
+
+
+def test_devices_are_found_by_serial_number(client, shop):
+    shop.device(sn="C02XK1ABJGH5")
+    shop.device(sn="F17ZZ9QWERTY")
+    items = client.get("/devices/search?q=XK1AB&fields=sn").get_json()["items"]
+    assert items[0] == {"sn": "C02XK1ABJGH5"}
+
+
+def test_short_queries_are_rejected(client):
+    response = client.get("/clients/search?q=ab")
+    assert (response.status_code, response.get_json()["message"]) == (400, "q must be at least 3 characters")
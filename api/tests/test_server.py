@@ -0,0 +1,68 @@
+import os
+import runpy
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+import pytest
+from database import db, dispose_engines, engine_options
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def test_pool_options_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+
+    options = engine_options("postgresql://db/shop")
+    assert (options["pool_size"], options["max_overflow"], options["pool_pre_ping"]) == (3, 10, False)
+    # the pools of sqlite take no sizing
+    assert "pool_size" not in engine_options("sqlite://")
+
+
+def test_forked_worker_opens_its_own_connections(app):
+    with app.app_context():
+        engine = db.engine
+        with engine.connect() as connection:
+            inherited = connection.connection.dbapi_connection
+    # what post_fork does in each worker of a preloaded app
+    dispose_engines(app, close=False)
+    with app.app_context(), db.engine.connect() as connection:
+        assert connection.connection.dbapi_connection is not inherited
+
+
+def test_config_reads_the_environment(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    monkeypatch.setenv("PRELOAD_APP", "false")
+    config = runpy.run_path(os.path.join(API_DIR, "gunicorn.conf.py"))
+
+    assert (config["workers"], config["worker_class"], config["preload_app"]) == (3, "gthread", False)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="gunicorn needs fork")
+def test_preloaded_workers_serve_requests(db_path, tmp_path):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    env = dict(os.environ, DB_URL=f"sqlite:///{db_path}", BIND=f"127.0.0.1:{port}", WEB_CONCURRENCY="2",
+               ADMISSION_ENABLED="false", SWAGGER_CACHE_DIR=str(tmp_path))
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+                              cwd=API_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 20
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/clients", timeout=2) as response:
+                    assert response.status == 200
+                    break
+            except OSError:
+                assert time.monotonic() < deadline, "gunicorn did not start"
+                time.sleep(0.2)
+        # several requests, so that both workers and their threads take some
+        for _ in range(10):
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/orders?limit=1", timeout=5) as response:
+                assert response.status == 200
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
@@ -0,0 +1,102 @@
+import gzip
+import importlib.util
+import json
+import os
+import statistics
+import pytest
+import swagger
+from app import create_app
+
+BOOT_TIME = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))), "bench", "boot_time.py")
+
+
+@pytest.fixture
+def boot_time():
+    spec = importlib.util.spec_from_file_location("boot_time", BOOT_TIME)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Counts the spec builds, which parse every docstring."""
+    calls = []
+    build = swagger.build
+
+    def counting_build(app):
+        calls.append(app)
+        return build(app)
+
+    monkeypatch.setattr(swagger, "build", counting_build)
+    return calls
+
+
+def cached_files(app):
+    return sorted(name for name in os.listdir(app.config["SWAGGER_CACHE_DIR"]) if name.startswith("swagger-"))
+
+
+def test_spec_is_built_once_and_cached_on_disk(app, builds):
+    response = app.test_client().get("/swagger.json")
+    spec = response.get_json()
+
+    assert spec["info"]["title"] == "Repair Shop API"
+    assert "/orders/debtors" in spec["paths"]
+    assert cached_files(app) == [f"swagger-{swagger.source_hash(app)}.json.gz"]
+    app.test_client().get("/swagger.json")
+    assert len(builds) == 1
+
+
+def test_new_worker_reuses_the_cached_spec(app, builds):
+    body = app.test_client().get("/swagger.json").data
+    # another worker started from the same source only reads the file
+    worker = create_app()
+
+    assert worker.test_client().get("/swagger.json").data == body
+    assert len(builds) == 1
+
+
+def test_changed_docstring_rebuilds_the_spec(app, builds, monkeypatch):
+    app.test_client().get("/swagger.json")
+    view = app.view_functions["orders_blueprint.get_debtors"]
+    monkeypatch.setattr(view, "__doc__", view.__doc__.replace("Получение клиентов", "Список клиентов"))
+    worker = create_app()
+    spec = worker.test_client().get("/swagger.json").get_json()
+
+    assert len(builds) == 2
+    assert spec["paths"]["/orders/debtors"]["get"]["summary"].startswith("Список клиентов")
+    assert len(cached_files(app)) == 2
+
+
+def test_corrupt_cache_file_is_rebuilt(app, builds):
+    app.test_client().get("/swagger.json")
+    path = os.path.join(app.config["SWAGGER_CACHE_DIR"], cached_files(app)[0])
+    with open(path, "wb") as file:
+        file.write(b"not gzip")
+
+    assert create_app().test_client().get("/swagger.json").status_code == 200
+    assert len(builds) == 2
+    with open(path, "rb") as file:
+        assert json.loads(gzip.decompress(file.read()))["info"]["title"] == "Repair Shop API"
+
+
+def test_spec_is_served_gzipped_and_tagged(client):
+    response = client.get("/swagger.json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.data))["swagger"] == "2.0"
+
+    tag = response.headers["ETag"]
+    assert client.get("/swagger.json", headers={"Accept-Encoding": "gzip", "If-None-Match": tag}).status_code == 304
+    # the plain body is different bytes under a different tag
+    assert client.get("/swagger.json", headers={"If-None-Match": tag}).status_code == 200
+
+
+def test_boot_stays_within_budget(boot_time, tmp_path):
+    env = dict(os.environ, DB_URL="sqlite://", SWAGGER_CACHE_DIR=str(tmp_path))
+    # builds the cache, as the image build does
+    boot_time.boot(env)
+    runs = [boot_time.boot(env)[0] for _ in range(3)]
+
+    assert statistics.median(run["ready"] * 1000 for run in runs) < boot_time.BUDGET_MS
+    # the spec comes from the cache, not from the docstrings
+    assert statistics.median(run["first_swagger"] * 1000 for run in runs) < 50
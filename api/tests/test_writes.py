@@ -0,0 +1,48 @@
+from database import db
+from models import Clients, Events
+
+
+def client_statements(statements):
+    return [statement.split(" ")[0] for statement in statements if "clients" in statement.split("WHERE")[0]]
+
+
+def test_patch_changes_only_the_given_fields_in_one_update(app, client, shop, statements):
+    id = shop.client(address="Москва", phone="+79000000001")
+    statements.clear()
+
+    assert client.patch(f"/clients/{id}", json={"address": "Казань"}).status_code == 202
+    # no SELECT before the UPDATE
+    assert client_statements(statements) == ["UPDATE"]
+    with app.app_context():
+        row = db.session.get(Clients, id)
+        assert (row.address, row.phone) == ("Казань", "+79000000001")
+
+
+def test_delete_is_one_statement(client, shop, statements):
+    id = shop.client()
+    statements.clear()
+
+    assert client.delete(f"/clients/{id}").status_code == 200
+    assert client_statements(statements) == ["DELETE"]
+    # the missing row answers as it always has
+    assert client.delete(f"/clients/{id}").status_code == 204
+
+
+def test_patched_order_comes_back_for_its_event(app, client, shop):
+    order_id = shop.order(cost=100)
+    assert client.patch(f"/orders/{order_id}", json={"cost": 120}).status_code == 200
+
+    with app.app_context():
+        event = db.session.query(Events).order_by(Events.id.desc()).first()
+    assert (event.entity, event.entity_id, event.action) == ("orders", order_id, "updated")
+    assert '"cost":120' in event.data.replace(" ", "")
+
+
+def test_bad_updates(client, shop):
+    id = shop.client()
+    assert client.patch("/clients/1000", json={"address": "Казань"}).status_code == 404
+    response = client.patch(f"/clients/{id}", json={"colour": "red"})
+    assert (response.status_code, response.get_json()["message"]) == (400, "nothing to update")
+    response = client.put(f"/clients/{id}", json={"name": "Пётр"})
+    assert response.status_code == 400
+    assert response.get_json()["message"].startswith("missing fields: ")
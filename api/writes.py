@@ -0,0 +1,102 @@
+from datetime import datetime
+from sqlalchemy import delete, select, update
+from database import db
+from pagination import InvalidQuery
+from filtering import parse_datetime
+from reports import record_changes, SUMMARIZED_MODELS
+from events import emit, EVENT_MODELS
+
+
+def writable_columns(model):
+    return [column for column in model.__table__.columns if not column.primary_key]
+
+
+def column_values(columns, item):
+    """Picks the supplied ``columns`` out of a request body, parsing dates."""
+    values = {}
+    for column in columns:
+        if column.key in item:
+            value = item[column.key]
+            if value is not None and column.type.python_type is datetime:
+                value = parse_datetime(value)
+            values[column.key] = value
+    return values
+
+
+def item_values(model, item, partial=False):
+    """
+    Validates the body of a PUT (every required column) or, with
+    ``partial``, of a PATCH (any non-empty subset) and returns the values.
+    """
+    if not isinstance(item, dict):
+        raise InvalidQuery("expected an object")
+    columns = writable_columns(model)
+    values = column_values(columns, item)
+    if partial and not values:
+        raise InvalidQuery("nothing to update")
+    if not partial:
+        missing = [
+            column.key for column in columns
+            if not column.nullable and column.default is None and values.get(column.key) is None
+        ]
+        if missing:
+            raise InvalidQuery("missing fields: " + ", ".join(missing))
+    return values
+
+
+def update_row(model, id, values, session=None):
+    """
+    Updates the row ``id`` with a single UPDATE and returns False when there
+    is no such row. For models with report summaries the old and new versions
+    come back through RETURNING; on PostgreSQL the old one is read from a
+    self-join in the same statement, elsewhere with a SELECT before it.
+    Models with a change feed get the new version back for the event.
+    ``session`` defaults to the request session.
+    """
+    session = session or db.session
+    table = model.__table__
+    statement = update(table).where(table.c.id == id).values(values)
+    if model not in SUMMARIZED_MODELS:
+        if model not in EVENT_MODELS:
+            return session.execute(statement).rowcount == 1
+        added = session.execute(statement.returning(*table.c)).first()
+        if added is None:
+            return False
+        emit(model, "updated", [added], session=session)
+        return True
+    if session.get_bind().dialect.name == "postgresql":
+        # the FROM side sees the row as it was before this statement
+        old = table.alias("old")
+        statement = statement.where(old.c.id == table.c.id).returning(
+            *table.c, *[column.label(f"old_{column.key}") for column in old.c]
+        )
+        row = session.execute(statement).first()
+        if row is None:
+            return False
+        mapping = row._mapping
+        removed = {column.key: mapping[f"old_{column.key}"] for column in table.c}
+        added = {column.key: mapping[column] for column in table.c}
+    else:
+        removed = session.execute(select(*table.c).where(table.c.id == id)).first()
+        if removed is None:
+            return False
+        added = session.execute(statement.returning(*table.c)).first()
+    record_changes(model, removed=[removed], added=[added], session=session)
+    emit(model, "updated", [added], session=session)
+    return True
+
+
+def delete_row(model, id, session=None):
+    """Deletes the row ``id`` with a single DELETE and returns False when there is no such row."""
+    session = session or db.session
+    table = model.__table__
+    statement = delete(table).where(table.c.id == id)
+    if model not in SUMMARIZED_MODELS and model not in EVENT_MODELS:
+        return session.execute(statement).rowcount == 1
+    row = session.execute(statement.returning(*table.c)).first()
+    if row is None:
+        return False
+    if model in SUMMARIZED_MODELS:
+        record_changes(model, removed=[row], session=session)
+    emit(model, "deleted", [row], session=session)
+    return True
@@ -0,0 +1,85 @@
+"""
+Profiles worker boot: starts fresh interpreters that import the app, call
+create_app() and serve the first /swagger.json, and prints the median times
+and the slowest imports (from python -X importtime). Exits with status 1
+when the median time to a ready app exceeds --budget-ms, so it can gate CI.
+
+    python bench/boot_time.py --runs 5 --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+API_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "api")
+# median time from interpreter start to an app ready to serve (api/tests/test_swagger.py holds it too)
+BUDGET_MS = 1500.0
+
+WORKER = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+ready = time.perf_counter()
+app.test_client().get("/swagger.json")
+served = time.perf_counter()
+print(json.dumps({"import": imported - started, "create_app": ready - imported,
+                  "ready": ready - started, "first_swagger": served - ready}))
+"""
+
+
+def boot(env, importtime=False):
+    command = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", WORKER]
+    result = subprocess.run(command, cwd=API_DIR, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def slowest_imports(stderr, count):
+    # lines look like "import time: self [us] | cumulative | imported package";
+    # a package is charged with its outermost import, which includes what it pulls in
+    packages = {}
+    for line in stderr.splitlines():
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            package = parts[2].strip().split(".")[0]
+            packages[package] = max(packages.get(package, 0), int(parts[1]))
+    return sorted(((cumulative, package) for package, cumulative in packages.items()), reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default="sqlite://")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="maximum median time to a ready app")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DB_URL=args.db_url, SWAGGER_CACHE_DIR=directory)
+        # the first boot builds the swagger cache, like the image build does
+        cold, _ = boot(env)
+        runs = [boot(env)[0] for _ in range(args.runs)]
+        _, stderr = boot(env, importtime=True)
+
+    print(f"{'phase':16} {'median ms':>10} {'max ms':>10}")
+    for phase in ("import", "create_app", "ready", "first_swagger"):
+        values = [run[phase] * 1000 for run in runs]
+        print(f"{phase:16} {statistics.median(values):10.1f} {max(values):10.1f}")
+    print(f"first /swagger.json without the cache: {cold['first_swagger'] * 1000:.1f} ms")
+    print("\nslowest imports (cumulative ms):")
+    for microseconds, module in slowest_imports(stderr, args.top):
+        print(f"  {microseconds / 1000:8.1f}  {module}")
+
+    ready = statistics.median(run["ready"] * 1000 for run in runs)
+    if ready > args.budget_ms:
+        print(f"\nboot takes {ready:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+    print(f"\nboot takes {ready:.0f} ms, within the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
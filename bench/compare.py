@@ -0,0 +1,45 @@
+"""
+Compares two result files written by bench/run.py and flags scenarios whose
+p95 latency or throughput got worse by more than --threshold percent.
+
+    python bench/compare.py baseline.json candidate.json
+"""
+import argparse
+import json
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with open(args.baseline) as file:
+        baseline = {result["name"]: result for result in json.load(file)["results"]}
+    with open(args.candidate) as file:
+        candidate = {result["name"]: result for result in json.load(file)["results"]}
+
+    regressions = 0
+    print(f"{'scenario':24} {'p95 ms':>19} {'change':>8} {'rps':>19} {'change':>8}")
+    for name, new in candidate.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        p95_change = _change(old["p95_ms"], new["p95_ms"])
+        rps_change = _change(old["throughput_rps"], new["throughput_rps"])
+        regressed = p95_change > args.threshold or rps_change < -args.threshold
+        regressions += regressed
+        print(f"{name:24} {old['p95_ms']:9.2f}{new['p95_ms']:10.2f} {p95_change:+7.1f}% "
+              f"{old['throughput_rps']:9.1f}{new['throughput_rps']:10.1f} {rps_change:+7.1f}%"
+              f"{'  REGRESSION' if regressed else ''}")
+    sys.exit(1 if regressions else 0)
+
+
+def _change(old, new):
+    return (new - old) / old * 100 if old else 0.0
+
+
+if __name__ == "__main__":
+    main()
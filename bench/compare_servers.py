@@ -0,0 +1,110 @@
+"""
+Runs the same requests against the Flask blueprints under gunicorn and the
+ASGI variant under uvicorn, both pointed at the same database.
+
+    python bench/compare_servers.py --rows 5000 --requests 2000 --concurrency 64
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from load import run, wait_ready
+
+API_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "api")
+sys.path.insert(0, API_DIR)
+
+ENDPOINTS = [
+    "/orders?limit=100",
+    "/orders/1",
+    "/orders?state=pending&limit=100",
+    "/clients?limit=100",
+    "/payments?limit=100",
+]
+
+
+def seed(db_url, rows):
+    os.environ["DB_URL"] = db_url
+    from sqlalchemy import insert
+    from app import create_app
+    from database import db, upgrade_db
+    from models import Clients, Devices, Orders, Payments
+
+    app = create_app()
+    with app.app_context():
+        upgrade_db()
+        if db.session.query(Orders.id).first() is not None:
+            return
+        start = datetime(2023, 1, 1)
+        db.session.execute(insert(Clients), [
+            {"name": f"name{i}", "surname": f"surname{i}", "address": "address",
+             "phone": f"+375{i:09d}", "email": f"client{i}@example.com"}
+            for i in range(rows)
+        ])
+        db.session.execute(insert(Devices), [
+            {"manufacturer": "HP", "model": "620", "sn": f"SN{i:010d}",
+             "release_date": start, "client_id": i + 1}
+            for i in range(rows)
+        ])
+        db.session.execute(insert(Orders), [
+            {"order_date": start + timedelta(minutes=i), "device_id": i + 1, "description": "repair",
+             "cost": float(i % 200), "state": ("pending", "in_progress", "completed")[i % 3]}
+            for i in range(rows)
+        ])
+        db.session.execute(insert(Payments), [
+            {"payment_date": start + timedelta(minutes=i), "order_id": i + 1, "amount": float(i % 200)}
+            for i in range(rows)
+        ])
+        db.session.commit()
+
+
+def start(command, env):
+    return subprocess.Popen(command, cwd=API_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default="sqlite:///" + os.path.join(tempfile.gettempdir(), "repair_shop_bench.db"))
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    seed(args.db_url, args.rows)
+    # the ASGI app has no admission control, so the Flask one runs without it too
+    env = dict(os.environ, DB_URL=args.db_url, ADMISSION_ENABLED="false")
+    servers = {
+        "wsgi": (["gunicorn", "-c", "gunicorn.conf.py", "--bind", "127.0.0.1:5101",
+                  "--workers", str(args.workers), "--access-logfile", "/dev/null"], "http://127.0.0.1:5101"),
+        "asgi": (["uvicorn", "--factory", "asgi:create_app", "--host", "127.0.0.1", "--port", "5102",
+                  "--workers", str(args.workers), "--no-access-log"], "http://127.0.0.1:5102"),
+    }
+    results = {"db_url": args.db_url, "rows": args.rows, "servers": {}}
+    for name, (command, base_url) in servers.items():
+        process = start(command, env)
+        try:
+            wait_ready(base_url, "/orders/1")
+            results["servers"][name] = [
+                run(base_url, path, args.requests, args.concurrency) for path in ENDPOINTS
+            ]
+        finally:
+            process.terminate()
+            process.wait()
+
+    print(f"{'endpoint':40} {'server':6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for index, path in enumerate(ENDPOINTS):
+        for name in servers:
+            result = results["servers"][name][index]
+            print(f"{path:40} {name:6} {result['throughput_rps']:9.1f} {result['p50_ms']:9.2f} "
+                  f"{result['p95_ms']:9.2f} {result['p99_ms']:9.2f}")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compares Flask's default JSON provider with the app's FastJSONProvider on a
+page of orders, payments and schedules as the list endpoints return it
+(dicts from Model.json() with datetimes and enum values).
+
+    python bench/json_speed.py --rows 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+API_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "api")
+STATES = ("ожидание", "в работе", "завершен")
+
+
+def rows(count):
+    start = datetime(2023, 1, 1)
+    for i in range(1, count + 1):
+        moment = start + timedelta(seconds=random.randrange(10 ** 8), microseconds=random.randrange(10 ** 6))
+        yield {
+            "id": i,
+            "order_date": moment,
+            "device_id": random.randrange(1, 10 ** 5),
+            "description": "Не включается после обновления",
+            "cost": round(random.uniform(10, 600), 2),
+            "state": random.choice(STATES),
+            "payment_date": moment + timedelta(days=1),
+            "schedule_date": moment + timedelta(days=2),
+        }
+
+
+def measure(app, provider, body, repeat):
+    with app.app_context():
+        provider.response(body)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            size = len(provider.response(body).get_data())
+        return (time.perf_counter() - started) / repeat, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sys.path.insert(0, API_DIR)
+    from flask import Flask
+    from flask.json.provider import DefaultJSONProvider
+    from json_provider import FastJSONProvider, orjson
+
+    random.seed(args.seed)
+    body = {"items": list(rows(args.rows)), "next": None}
+    results = {}
+    for name, provider_class in (("default", DefaultJSONProvider), ("fast", FastJSONProvider)):
+        app = Flask(__name__)
+        results[name] = measure(app, provider_class(app), body, args.repeat)
+        elapsed, size = results[name]
+        print(f"{name:8} {elapsed * 1000:8.1f} ms per response {size / 1024:8.0f} KiB "
+              f"{args.rows / elapsed:12,.0f} rows/s")
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'json (orjson is not installed)'}, "
+          f"speedup {results['default'][0] / results['fast'][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
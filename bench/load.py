@@ -0,0 +1,91 @@
+import http.client
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def wait_ready(base_url, path="/", timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = connect(base_url)
+            connection.request("GET", path)
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{base_url} did not start in {timeout}s")
+
+
+def run(base_url, path, requests, concurrency, method="GET", body=None, headers=None):
+    """
+    Sends ``requests`` requests to ``path`` from ``concurrency`` threads, each
+    with its own keep-alive connection, and returns latency/throughput stats.
+    ``path`` may be a callable taking the request number, e.g. to spread
+    point reads over many ids.
+    """
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies, statuses, sizes = [], {}, []
+    headers = dict(headers or {}, **({"Content-Type": "application/json"} if body else {}))
+
+    def worker():
+        connection = connect(base_url)
+        while True:
+            number = next(counter)
+            if number >= requests:
+                break
+            started = time.perf_counter()
+            try:
+                connection.request(method, path(number) if callable(path) else path, body=body, headers=headers)
+                response = connection.getresponse()
+                payload = response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = connect(base_url)
+                payload, status = b"", "error"
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+                sizes.append(len(payload))
+        connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    duration = time.perf_counter() - started
+    return {
+        "path": getattr(path, "template", path),
+        "method": method,
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "throughput_rps": len(latencies) / duration if duration else None,
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+        "mean_bytes": sum(sizes) / len(sizes) if sizes else None,
+        "statuses": {str(status): count for status, count in statuses.items()},
+    }
+
+
+def connect(base_url):
+    parts = urlsplit(base_url)
+    return http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)